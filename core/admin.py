@@ -1,3 +1,42 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from core.models import Customer, Loan, ScoringPolicy
+from core.policy import activate_policy
+
+
+@admin.register(Customer)
+class CustomerAdmin(admin.ModelAdmin):
+    list_display = ['customer_id', 'first_name', 'last_name', 'phone_number', 'monthly_income', 'approved_limit']
+
+
+@admin.register(Loan)
+class LoanAdmin(admin.ModelAdmin):
+    list_display = ['loan_id', 'customer', 'loan_amount', 'interest_rate', 'tenure', 'start_date', 'end_date']
+    list_select_related = ['customer']
+    raw_id_fields = ['customer']
+
+
+@admin.register(ScoringPolicy)
+class ScoringPolicyAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'is_active', 'approve_above', 'mid_band_floor', 'low_band_floor', 'emi_income_cap',
+                    'created_at', 'activated_at']
+    readonly_fields = ['is_active', 'created_at', 'activated_at']
+    actions = ['activate']
+
+    def save_model(self, request, obj, form, change):
+        # a saved policy is a version: edits are saved as a new, inactive one
+        if change:
+            obj.pk = None
+            obj._state.adding = True
+            obj.is_active = False
+            obj.activated_at = None
+        super().save_model(request, obj, form, change)
+
+    @admin.action(description='Activate the selected policy')
+    def activate(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, 'Select exactly one policy to activate.', messages.ERROR)
+            return
+        policy = queryset.get()
+        activate_policy(policy)
+        self.message_user(request, f'{policy} is now active.')
@@ -0,0 +1,107 @@
+"""
+Archival of closed loans.
+
+Loans whose end_date has passed never become active again, yet every
+eligibility check, score rebuild and loan total scans them. The
+archive_closed_loans task (CELERY_BEAT_SCHEDULE) moves them in batches into
+ArchivedLoan, keeping the Loan table to the live book. What they added to
+the credit profile is folded into per-customer, per-start-year LoanRollup
+rows, which profile_queryset, the loan totals and core.vectorized add back
+in, so scores do not change when loans are archived.
+
+Archived loans keep their loan_id: loan/<id>/, loan/<id>/schedule/ and
+customer-loans read both tables.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import ArchivedLoan, Loan, LoanRollup
+
+ARCHIVE_BATCH_SIZE = 5000
+ARCHIVED_FIELDS = (
+    'loan_id', 'customer_id', 'loan_amount', 'interest_rate', 'tenure', 'monthly_installment',
+    'emis_paid_on_time', 'start_date', 'end_date',
+)
+
+
+def _add_to_rollups(loans):
+    totals = {}
+    for loan in loans:
+        key = (loan.customer_id, loan.start_date.year)
+        count, on_time, volume = totals.get(key, (0, 0, Decimal('0')))
+        totals[key] = (count + 1, on_time + (loan.emis_paid_on_time == 1), volume + loan.loan_amount)
+
+    existing = {
+        (rollup.customer_id, rollup.start_year): rollup
+        for rollup in LoanRollup.objects.select_for_update().filter(customer_id__in={c for c, _ in totals})
+    }
+    created, updated = [], []
+    for (customer_id, start_year), (count, on_time, volume) in totals.items():
+        rollup = existing.get((customer_id, start_year))
+        if rollup is None:
+            created.append(LoanRollup(
+                customer_id=customer_id, start_year=start_year,
+                loan_count=count, on_time_count=on_time, total_loan_volume=volume,
+            ))
+        else:
+            rollup.loan_count += count
+            rollup.on_time_count += on_time
+            rollup.total_loan_volume += volume
+            updated.append(rollup)
+    LoanRollup.objects.bulk_create(created)
+    LoanRollup.objects.bulk_update(updated, ['loan_count', 'on_time_count', 'total_loan_volume'])
+
+
+def archive_batch(today, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive up to batch_size loans that ended before today, in one transaction; returns how many."""
+    with transaction.atomic():
+        loans = list(
+            Loan.objects.select_for_update(skip_locked=True)
+            .filter(end_date__lt=today).order_by('loan_id')[:batch_size]
+        )
+        if not loans:
+            return 0
+        ArchivedLoan.objects.bulk_create(
+            [ArchivedLoan(**{field: getattr(loan, field) for field in ARCHIVED_FIELDS}) for loan in loans]
+        )
+        _add_to_rollups(loans)
+        # a plain DELETE: no loan_deleted signal (the rollups keep the scores as
+        # they were) and no SET_NULL on the applications still pointing at them
+        Loan.objects.filter(pk__in=[loan.pk for loan in loans])._raw_delete(Loan.objects.db)
+    return len(loans)
+
+
+def archive_closed_loans(today=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive every loan that ended before today; returns how many were moved."""
+    today = today or timezone.localdate()
+    archived = 0
+    while True:
+        moved = archive_batch(today, batch_size)
+        archived += moved
+        if moved < batch_size:
+            return archived
+
+
+def customer_loans(customer_id, active=None, after=None, today=None):
+    """
+    A customer's loans, live and archived, as one queryset ordered by
+    loan_id; active=True/False keeps the active or the closed ones and
+    `after` starts past a loan_id. A UNION unless active=True, so read it
+    with values() (as FastSerializer does) rather than as model instances.
+    """
+    today = today or timezone.localdate()
+    loans = Loan.objects.filter(customer_id=customer_id)
+    if after is not None:
+        loans = loans.filter(loan_id__gt=after)
+    if active:
+        # archived loans are all closed
+        return loans.filter(end_date__gte=today).order_by('loan_id')
+    if active is False:
+        loans = loans.filter(end_date__lt=today)
+
+    archived = ArchivedLoan.objects.filter(customer_id=customer_id)
+    if after is not None:
+        archived = archived.filter(loan_id__gt=after)
+    return loans.order_by().union(archived.order_by(), all=True).order_by('loan_id')
@@ -0,0 +1,191 @@
+"""
+Async versions of the hot read paths, for ASGI deployments.
+
+Same inputs, outputs and status codes as CheckEligibilityView, LoanDetailView
+and CustomerLoansView, but written against Django's async ORM so a worker
+keeps serving other requests while one waits on the database. DRF's APIView
+is sync-only, so these are plain Django views returning JsonResponse.
+"""
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import Throttled
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.archive import customer_loans
+from core.audit import DECISION_AUDITS, decision_record
+from core.cache import aget_cached_entry
+from core.credit import evaluate_eligibility
+from core.db_routers import AsyncReplicaReadMixin
+from core.instrumentation import timed
+from core.models import ArchivedLoan, Customer, Loan
+from core.policy import acurrent_rules
+from core.fast_serializers import fast_serializer
+from core.throttling import ELIGIBILITY_LIMITER, Overloaded, throttle_wait
+from core.serializers import (
+    CustomerLoansQuerySerializer,
+    EligibilityInputSerializer,
+    LoanDetailSerializer,
+    LoanSerializer,
+)
+from core.views import CustomerLoansView
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
+
+
+class AsyncAPIView(View):
+    http_method_names = ['get', 'post', 'options']
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # like APIView: the API is authenticated per request, not by session cookie
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def parse_json(self, request):
+        """Return (data, error_response)."""
+        try:
+            return json.loads(request.body or b'{}'), None
+        except ValueError as e:
+            return None, json_response({'detail': f'JSON parse error - {e}'}, status=400)
+
+
+class AsyncCheckEligibilityView(AsyncReplicaReadMixin, AsyncAPIView):
+    throttle_scope = 'check-eligibility'
+
+    async def post(self, request):
+        # same bucket and limiter as CheckEligibilityView; the cache and request.user are sync
+        wait = await sync_to_async(throttle_wait)(self.throttle_scope, request)
+        if wait:
+            return self.retry_later(Throttled(wait), wait)
+        if not ELIGIBILITY_LIMITER.acquire():
+            return self.retry_later(Overloaded(settings.ADMISSION_RETRY_AFTER), settings.ADMISSION_RETRY_AFTER)
+        try:
+            return await self.evaluate(request)
+        finally:
+            ELIGIBILITY_LIMITER.release()
+
+    def retry_later(self, exc, wait):
+        response = json_response({'detail': str(exc.detail)}, status=exc.status_code)
+        response['Retry-After'] = str(math.ceil(wait))
+        return response
+
+    async def evaluate(self, request):
+        data, error = self.parse_json(request)
+        if error:
+            return error
+        input_serializer = EligibilityInputSerializer(data=data)
+        with timed():
+            valid = input_serializer.is_valid()
+        if not valid:
+            return json_response(input_serializer.errors, status=400)
+
+        data = input_serializer.validated_data
+        loan_amount = data['loan_amount']
+        interest_rate = data['interest_rate']
+        tenure = data['tenure']
+
+        if loan_amount <= 0 or interest_rate <= 0 or tenure <= 0:
+            return json_response({
+                "error": "Loan amount, interest rate, and tenure must all be greater than zero."
+            }, status=400)
+
+        rules = await acurrent_rules()
+        try:
+            entry = await aget_cached_entry(data['customer_id'], rules)
+        except Customer.DoesNotExist:
+            return json_response({'error': 'Customer not found.'}, status=404)
+
+        score = (entry['credit_score'], entry['reason'])
+        try:
+            result = evaluate_eligibility(entry['profile'], loan_amount, interest_rate, tenure, rules, score=score)
+        except (ValueError, OverflowError) as e:
+            return json_response({'error': f"Error calculating EMI: {e}"}, status=400)
+
+        record = decision_record('async-check-eligibility', entry['profile'], score, loan_amount, interest_rate, tenure, result)
+        if record is not None and DECISION_AUDITS.add(record):
+            # queueing or writing the batch is blocking I/O
+            await sync_to_async(DECISION_AUDITS.flush)()
+        return json_response(result)
+
+
+class AsyncLoanDetailView(AsyncReplicaReadMixin, AsyncAPIView):
+    async def get(self, request, loan_id):
+        with timed():
+            serializer = fast_serializer(LoanDetailSerializer)
+            rows = (
+                await serializer.arows(Loan.objects.filter(loan_id=loan_id))
+                or await serializer.arows(ArchivedLoan.objects.filter(loan_id=loan_id))
+            )
+        if not rows:
+            return json_response({'detail': f"No {Loan._meta.object_name} matches the given query."}, status=404)
+        return json_response(rows[0])
+
+
+class AsyncCustomerLoansView(AsyncReplicaReadMixin, AsyncAPIView):
+    """Async CustomerLoansView: same parameters, paging and streaming."""
+    small_history = CustomerLoansView.small_history
+    default_limit = CustomerLoansView.default_limit
+    stream_chunk_size = CustomerLoansView.stream_chunk_size
+
+    async def get(self, request, customer_id):
+        query = CustomerLoansQuerySerializer(data=request.GET.dict())
+        if not query.is_valid():
+            return json_response(query.errors, status=400)
+        params = query.validated_data
+
+        if not await Customer.objects.filter(customer_id=customer_id).aexists():
+            return json_response({'error': 'Customer not found.'}, status=404)
+
+        loans = customer_loans(customer_id, active=params.get('active'), after=params.get('cursor'))
+        fields = params.get('fields')
+        serializer = fast_serializer(LoanSerializer, tuple(fields) if fields else None)
+
+        if params.get('stream'):
+            return self.stream(loans, serializer)
+
+        if not params:
+            with timed():
+                first = await serializer.arows(loans[:self.small_history + 1], key='loan_id')
+            if len(first) <= self.small_history:
+                return json_response([data for _, data in first])
+            return self.page(first[:self.default_limit + 1], self.default_limit)
+
+        limit = params.get('limit', self.default_limit)
+        with timed():
+            rows = await serializer.arows(loans[:limit + 1], key='loan_id')
+        return self.page(rows, limit)
+
+    def page(self, rows, limit):
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return json_response({
+            'results': [data for _, data in rows],
+            'next_cursor': rows[-1][0] if has_more else None,
+        })
+
+    def stream(self, loans, serializer):
+        encoder = JSONEncoder()
+        chunk_size = self.stream_chunk_size
+
+        async def chunks():
+            yield '['
+            batch = []
+            separator = ''
+            async for row in serializer.aiter_rows(loans, chunk_size):
+                batch.append(row)
+                if len(batch) == chunk_size:
+                    yield separator + encoder.encode(batch)[1:-1]
+                    separator = ','
+                    batch = []
+            if batch:
+                yield separator + encoder.encode(batch)[1:-1]
+            yield ']'
+
+        return StreamingHttpResponse(chunks(), content_type='application/json')
@@ -0,0 +1,255 @@
+"""
+Decision audit log: every eligibility decision, as DecisionAudit rows.
+
+Writing a row per decision would put an INSERT on the eligibility hot path,
+so decisions are buffered in process memory and written in batches. Once
+DECISION_AUDIT_BATCH_SIZE records are buffered the request that adds the
+last one hands the batch to the write_decision_audits Celery task, which
+bulk_creates it. A flusher thread in each process (started by the first
+add()) does the same once the oldest record is DECISION_AUDIT_FLUSH_SECONDS
+old, so a quiet process holds decisions in memory no longer than that.
+
+Memory is bounded by DECISION_AUDIT_MAX_BUFFERED. If the broker is
+unreachable, the flushing request writes the batch itself, which slows
+producers down rather than losing records. Only when the database also fails
+and the buffer is full are the oldest records dropped; they are counted on
+/metrics/.
+
+A decision with a non-finite number (NaN, infinity) is not recorded, since
+no column could hold it. A batch the database rejects for its data rather
+than for being unavailable is written record by record, and only the
+records that fail are dropped (also counted).
+
+On graceful shutdown the buffer is written straight to the database: at
+interpreter exit, on Celery worker process shutdown and from gunicorn's
+worker_exit hook.
+"""
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from decimal import Decimal
+
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, connections, transaction
+from django.utils import timezone
+
+from core import instrumentation
+from core.models import CreditScore, DecisionAudit
+
+logger = logging.getLogger(__name__)
+
+# longest the flusher sleeps before looking at the settings again
+FLUSHER_TICK_SECONDS = 1.0
+
+
+# errors from the records themselves; anything else (the database is down) fails the batch
+RECORD_ERRORS = (DataError, IntegrityError, ValidationError, TypeError, ValueError)
+
+
+def _plain(value):
+    return value if isinstance(value, int) else str(value)
+
+
+def _finite(value):
+    if isinstance(value, Decimal):
+        return value.is_finite()
+    return not isinstance(value, float) or math.isfinite(value)
+
+
+def decision_record(source, profile, score, loan_amount, interest_rate, tenure, result):
+    """
+    JSON-safe DecisionAudit fields for one evaluate_eligibility() result, or
+    None (and a warning) when a number in it is NaN or infinite.
+    """
+    numbers = [
+        loan_amount, interest_rate, result.get('corrected_interest_rate'), result['monthly_installment'],
+        *(getattr(profile, name) for name in CreditScore.COMPONENTS),
+    ]
+    if not all(_finite(number) for number in numbers):
+        logger.warning('Not auditing a %s decision for customer %s: non-finite values',
+                       source, profile.customer.customer_id)
+        return None
+    return {
+        'created_at': timezone.now().isoformat(),
+        'source': source,
+        'customer_id': profile.customer.customer_id,
+        'loan_amount': loan_amount,
+        'interest_rate': interest_rate,
+        'tenure': tenure,
+        # Decimal sums as strings, which the JSON task payload keeps exact
+        **{name: _plain(getattr(profile, name)) for name in CreditScore.COMPONENTS},
+        'credit_score': score[0],
+        'approval': result['approval'],
+        'corrected_interest_rate': result.get('corrected_interest_rate'),
+        'monthly_installment': result['monthly_installment'],
+        'reason': result['reason'],
+        'policy_version': result['policy_version'],
+    }
+
+
+def write_records(records):
+    """
+    bulk_create DecisionAudit rows from decision_record() dicts; returns how
+    many were written. When the batch is rejected for its data, each record
+    is written on its own and the ones that fail are dropped.
+    """
+    # all or nothing, so a retried batch is not written twice
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                DecisionAudit.objects.bulk_create(
+                    [DecisionAudit(**record) for record in records], batch_size=settings.DECISION_AUDIT_BATCH_SIZE,
+                )
+            return len(records)
+        except RECORD_ERRORS:
+            logger.warning('Decision audit batch of %d rejected; writing records one by one', len(records))
+        written = 0
+        for record in records:
+            try:
+                with transaction.atomic():
+                    DecisionAudit.objects.bulk_create([DecisionAudit(**record)])
+                written += 1
+            except RECORD_ERRORS:
+                logger.exception('Dropped unwritable decision audit record: %r', record)
+    DECISION_AUDITS.dropped += len(records) - written
+    return written
+
+
+class AuditBuffer:
+    def __init__(self):
+        self.records = deque()
+        self.oldest = None
+        self.lock = threading.Lock()
+        self.flushed = 0
+        self.written_inline = 0
+        self.dropped = 0
+        self.flusher_pid = None
+
+    def add(self, record):
+        """Buffer a record; returns True when the caller should flush()."""
+        if self.flusher_pid != os.getpid():
+            self.start_flusher()
+        with self.lock:
+            if not self.records:
+                self.oldest = time.monotonic()
+            self.records.append(record)
+            return (
+                len(self.records) >= settings.DECISION_AUDIT_BATCH_SIZE
+                or time.monotonic() - self.oldest >= settings.DECISION_AUDIT_FLUSH_SECONDS
+            )
+
+    def start_flusher(self):
+        """Start this process's flusher thread; threads do not survive a fork, so once per pid."""
+        with self.lock:
+            if self.flusher_pid == os.getpid():
+                return
+            self.flusher_pid = os.getpid()
+        threading.Thread(target=self.flush_periodically, name='decision-audit-flusher', daemon=True).start()
+
+    def flush_periodically(self):
+        while True:
+            limit = settings.DECISION_AUDIT_FLUSH_SECONDS
+            oldest = self.oldest
+            age = time.monotonic() - oldest if oldest is not None else 0
+            if oldest is None or age < limit:
+                time.sleep(min(limit - age, FLUSHER_TICK_SECONDS))
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Decision audit flush failed')
+            finally:
+                # an inline write opened a connection for this thread
+                connections.close_all()
+
+    def take(self):
+        with self.lock:
+            records, self.records = list(self.records), deque()
+            self.oldest = None
+        return records
+
+    def put_back(self, records):
+        """Return records a failed flush took; the oldest go once the buffer is full."""
+        with self.lock:
+            self.records.extendleft(reversed(records))
+            overflow = len(self.records) - settings.DECISION_AUDIT_MAX_BUFFERED
+            for _ in range(max(overflow, 0)):
+                self.records.popleft()
+            self.dropped += max(overflow, 0)
+            if self.records and self.oldest is None:
+                self.oldest = time.monotonic()
+        if overflow > 0:
+            logger.error('Dropped %d decision audit records: buffer full and writes failing', overflow)
+
+    def flush(self, inline=False):
+        """
+        Hand the buffered records to write_decision_audits, or write them
+        here with inline=True or when the broker cannot take them.
+        """
+        records = self.take()
+        if not records:
+            return 0
+        if not inline:
+            from core.tasks import write_decision_audits
+
+            try:
+                # no publish retries: a request is waiting on this
+                write_decision_audits.apply_async((records,), retry=False)
+                self.flushed += len(records)
+                return len(records)
+            except Exception:
+                logger.warning('Could not queue %d decision audit records; writing them inline', len(records))
+        try:
+            write_records(records)
+        except Exception:
+            logger.exception('Could not write %d decision audit records', len(records))
+            self.put_back(records)
+            return 0
+        self.flushed += len(records)
+        self.written_inline += len(records)
+        return len(records)
+
+    def __len__(self):
+        return len(self.records)
+
+
+DECISION_AUDITS = AuditBuffer()
+
+
+def record_decision(record):
+    if record is not None and DECISION_AUDITS.add(record):
+        DECISION_AUDITS.flush()
+
+
+def flush_on_shutdown(*args, **kwargs):
+    DECISION_AUDITS.flush(inline=True)
+
+
+atexit.register(flush_on_shutdown)
+worker_process_shutdown.connect(flush_on_shutdown, weak=False)
+
+
+def render_audit_metrics():
+    return [
+        '# HELP decision_audit_buffered Decision audit records waiting to be written.',
+        '# TYPE decision_audit_buffered gauge',
+        f'decision_audit_buffered {len(DECISION_AUDITS)}',
+        '# HELP decision_audit_flushed_total Decision audit records handed to the writer task or written.',
+        '# TYPE decision_audit_flushed_total counter',
+        f'decision_audit_flushed_total {DECISION_AUDITS.flushed}',
+        '# HELP decision_audit_written_inline_total Records the flushing process wrote itself (broker down, shutdown).',
+        '# TYPE decision_audit_written_inline_total counter',
+        f'decision_audit_written_inline_total {DECISION_AUDITS.written_inline}',
+        '# HELP decision_audit_dropped_total Records dropped: buffer full with writes failing, or unwritable.',
+        '# TYPE decision_audit_dropped_total counter',
+        f'decision_audit_dropped_total {DECISION_AUDITS.dropped}',
+    ]
+
+
+instrumentation.metric_collectors.append(render_audit_metrics)
@@ -0,0 +1,184 @@
+"""
+Helpers shared by the benchmark management commands: request scenarios for
+the core endpoints, an in-process driver (Django test client, with query
+counts) and a concurrent HTTP driver, latency percentiles and baseline
+comparison.
+"""
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+ENDPOINTS = ['register-customer', 'check-eligibility', 'create-loan', 'loan-detail', 'customer-loans']
+# read paths that also have an async view, routed as 'async-<endpoint>'
+ASYNC_ENDPOINTS = ['check-eligibility', 'loan-detail', 'customer-loans']
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Scenario:
+    """Builds (method, path, json_body) requests for an endpoint from the seeded ids."""
+
+    def __init__(self, customer_ids, loan_ids, seed=0):
+        if not customer_ids or not loan_ids:
+            raise ValueError("The database has no customers or loans; run seed_portfolio first.")
+        self.customer_ids = customer_ids
+        self.loan_ids = loan_ids
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counter = 0
+
+    def request(self, endpoint):
+        """`endpoint` is a URL name; 'async-' names reuse the sync request body."""
+        kind = endpoint.removeprefix('async-')
+        with self.lock:
+            self.counter += 1
+            counter = self.counter
+            customer_id = self.random.choice(self.customer_ids)
+            loan_id = self.random.choice(self.loan_ids)
+            amount = self.random.randrange(50000, 1000000, 1000)
+            rate = self.random.choice([8, 10, 12, 14, 16, 18])
+            tenure = self.random.choice([6, 12, 24, 36, 60])
+
+        if kind == 'register-customer':
+            income = 20000 + counter % 200 * 1000
+            return 'POST', reverse(endpoint), {
+                'first_name': 'Bench', 'last_name': f'User{counter}', 'age': 30,
+                'phone_number': f'8{time.time_ns() % 10**9:09d}', 'monthly_income': income,
+            }
+        if kind == 'check-eligibility':
+            return 'POST', reverse(endpoint), {
+                'customer_id': customer_id, 'loan_amount': amount, 'interest_rate': rate, 'tenure': tenure,
+            }
+        if kind == 'create-loan':
+            return 'POST', reverse(endpoint), {
+                'customer_id': customer_id, 'loan_amount': amount, 'interest_rate': rate, 'tenure': tenure,
+            }
+        if kind == 'loan-detail':
+            return 'GET', reverse(endpoint, args=[loan_id]), None
+        if kind == 'customer-loans':
+            return 'GET', reverse(endpoint, args=[customer_id]), None
+        raise ValueError(f"Unknown endpoint {endpoint}")
+
+
+def run_in_process(scenario, endpoint, requests):
+    """Drive an endpoint through the Django test client; returns a result dict."""
+    # measure the endpoint, not the per-client throttle every request here shares
+    with override_settings(THROTTLE_ENABLED=False):
+        return _run_in_process(scenario, endpoint, requests)
+
+
+def _run_in_process(scenario, endpoint, requests):
+    client = Client()
+    latencies, queries, errors = [], [], 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        method, path, body = scenario.request(endpoint)
+        with CaptureQueriesContext(connection) as captured:
+            t0 = time.perf_counter()
+            if method == 'GET':
+                response = client.get(path)
+            else:
+                response = client.post(path, data=json.dumps(body), content_type='application/json')
+            latencies.append(time.perf_counter() - t0)
+        queries.append(len(captured))
+        if response.status_code >= 500:
+            errors += 1
+    return summarize(endpoint, latencies, time.perf_counter() - started, errors, queries)
+
+
+def run_http(scenario, endpoint, requests, base_url, concurrency, timeout=30):
+    """Drive an endpoint over HTTP with `concurrency` worker threads."""
+    base_url = base_url.rstrip('/')
+
+    def one(_):
+        method, path, body = scenario.request(endpoint)
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(
+            base_url + path, data=data, method=method, headers={'Content-Type': 'application/json'}
+        )
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                failed = False
+        except urllib.error.HTTPError as e:
+            e.read()
+            failed = e.code >= 500
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            failed = True
+        return time.perf_counter() - t0, failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    return summarize(endpoint, [r[0] for r in results], elapsed, sum(r[1] for r in results))
+
+
+def summarize(endpoint, latencies, elapsed, errors, queries=None):
+    result = {
+        'endpoint': endpoint,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+    if queries is not None:
+        result['queries_per_request'] = round(sum(queries) / len(queries), 2) if queries else 0.0
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return human readable regressions of `results` against a saved baseline:
+    p95 latency or throughput worse by more than `tolerance` (a fraction),
+    or more queries per request.
+    """
+    previous = {r['endpoint']: r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result['endpoint'])
+        if not before:
+            continue
+        name = result['endpoint']
+        if before['p95_ms'] and result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} ms -> {result['p95_ms']} ms")
+        if before['throughput_rps'] and result['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_rps']} -> {result['throughput_rps']} req/s")
+        if result.get('queries_per_request', 0) > before.get('queries_per_request', math.inf):
+            regressions.append(
+                f"{name}: queries/request {before['queries_per_request']} -> {result['queries_per_request']}"
+            )
+    return regressions
+
+
+def format_table(results):
+    lines = [
+        f"{'endpoint':<20}{'reqs':>7}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}"
+    ]
+    for r in results:
+        queries = r.get('queries_per_request')
+        lines.append(
+            f"{r['endpoint']:<20}{r['requests']:>7}{r['errors']:>8}{r['throughput_rps']:>10}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{'' if queries is None else queries:>9}"
+        )
+    return '\n'.join(lines)
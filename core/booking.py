@@ -0,0 +1,221 @@
+"""
+Loan booking: the only write path that creates loans for requests.
+
+book_loan() locks the customer row, so concurrent bookings for the same
+customer run one after another and each sees the debt the previous one
+added. Row locks are always taken in the order customer -> credit score ->
+idempotency key, so concurrent bookings cannot deadlock.
+"""
+import hashlib
+import json
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.cache import invalidate_profiles
+from core.loan_math import calculate_emi, end_date
+from core.models import Customer, IdempotencyKey, Loan
+from core.scores import rebuild_credit_scores
+
+# Loan.monthly_installment has max_digits=10, decimal_places=2
+MAX_INSTALLMENT = Decimal(10 ** 8)
+
+
+class ExposureLimitExceeded(Exception):
+    pass
+
+
+def book_loan(customer_id, loan_amount, interest_rate, tenure, start_date=None):
+    """
+    Create a loan if the customer's current debt plus loan_amount stays
+    within approved_limit. Raises Customer.DoesNotExist,
+    ExposureLimitExceeded or ValidationError.
+    """
+    start_date = start_date or timezone.localdate()
+    with transaction.atomic():
+        customer = Customer.objects.select_for_update().get(customer_id=customer_id)
+        # current_debt is refreshed by the loan signals inside the booking transaction
+        if customer.current_debt + float(loan_amount) > customer.approved_limit:
+            raise ExposureLimitExceeded(
+                f"Current debt {customer.current_debt:.2f} plus {float(loan_amount):.2f} "
+                f"exceeds the approved limit of {customer.approved_limit:.2f}."
+            )
+        loan = Loan(
+            customer=customer,
+            loan_amount=loan_amount,
+            interest_rate=interest_rate,
+            tenure=tenure,
+            monthly_installment=Decimal(str(calculate_emi(loan_amount, interest_rate, tenure))),
+            emis_paid_on_time=0,
+            start_date=start_date,
+            end_date=end_date(start_date, tenure),
+        )
+        loan.full_clean()  # model-level validations
+        loan.save()
+    return loan
+
+
+def request_fingerprint(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _replay(stored, fingerprint):
+    if stored.request_hash != fingerprint:
+        return 422, {'error': 'Idempotency-Key was already used with a different request.'}, True
+    return stored.response_status, stored.response_body, True
+
+
+def run_idempotent(endpoint, key, data, run):
+    """
+    Run `run` (returning (status, body, loan)) at most once per (endpoint, key).
+
+    The key is stored with the response in run's transaction. A retry gets the
+    stored response back; a concurrent duplicate blocks on the unique key,
+    rolls back its own writes and replays the winner's response. Returns
+    (status, body, replayed).
+    """
+    fingerprint = request_fingerprint(data)
+    stored = IdempotencyKey.objects.filter(endpoint=endpoint, key=key).first()
+    if stored is not None:
+        return _replay(stored, fingerprint)
+
+    try:
+        with transaction.atomic():
+            status, body, loan = run()
+            IdempotencyKey.objects.create(
+                endpoint=endpoint, key=key, request_hash=fingerprint,
+                response_status=status, response_body=body, loan=loan,
+            )
+    except IntegrityError:
+        stored = IdempotencyKey.objects.filter(endpoint=endpoint, key=key).first()
+        if stored is None:
+            raise
+        return _replay(stored, fingerprint)
+    return status, body, False
+
+
+def parse_loan_request(item):
+    """Validate one loan request dict in memory; returns (values, errors)."""
+    if not isinstance(item, dict):
+        return None, {'non_field_errors': ['Expected an object.']}
+    values, errors = {}, {}
+    for field in ('customer_id', 'loan_amount', 'interest_rate', 'tenure'):
+        if item.get(field) in (None, ''):
+            errors[field] = ['This field is required.']
+    if errors:
+        return None, errors
+
+    try:
+        values['customer_id'] = int(item['customer_id'])
+    except (TypeError, ValueError):
+        errors['customer_id'] = ['A valid integer is required.']
+    try:
+        amount = Decimal(str(item['loan_amount'])).quantize(Decimal('0.01'))
+        if amount <= 0 or amount >= 10 ** 10:
+            errors['loan_amount'] = ['Must be greater than zero and below 10000000000.']
+        values['loan_amount'] = amount
+    except (ArithmeticError, ValueError):
+        errors['loan_amount'] = ['A valid number is required.']
+    try:
+        values['interest_rate'] = float(item['interest_rate'])
+        if not 0 < values['interest_rate'] < 100:
+            errors['interest_rate'] = ['Must be greater than zero and below 100.']
+    except (TypeError, ValueError):
+        errors['interest_rate'] = ['A valid number is required.']
+    try:
+        values['tenure'] = int(item['tenure'])
+        if not 0 < values['tenure'] <= 600:
+            errors['tenure'] = ['Must be between 1 and 600 months.']
+    except (TypeError, ValueError):
+        errors['tenure'] = ['A valid integer is required.']
+
+    start_date = item.get('start_date')
+    if start_date:
+        values['start_date'] = parse_date(start_date) if isinstance(start_date, str) else None
+        if values['start_date'] is None:
+            errors['start_date'] = ['Date has wrong format. Use YYYY-MM-DD.']
+    else:
+        values['start_date'] = timezone.localdate()
+    return (None, errors) if errors else (values, None)
+
+
+def book_loans(items, batch_size=1000):
+    """
+    Book a batch of loan requests in one transaction; returns one result
+    dict per item, in order. Invalid rows, unknown customers and loans that
+    would push a customer over approved_limit are reported and skipped; the
+    rest are inserted with bulk_create.
+
+    Customers are locked in primary key order with one query, so concurrent
+    batches wait for each other instead of deadlocking.
+    """
+    parsed = [parse_loan_request(item) for item in items]
+    results = [None] * len(items)
+    for index, (values, errors) in enumerate(parsed):
+        if errors:
+            results[index] = {'index': index, 'status': 400, 'errors': errors}
+
+    valid = [(index, values) for index, (values, _) in enumerate(parsed) if values]
+    today = timezone.localdate()
+
+    with transaction.atomic():
+        customer_ids = sorted({values['customer_id'] for _, values in valid})
+        customers = {
+            customer.customer_id: customer
+            for customer in Customer.objects.select_for_update().filter(customer_id__in=customer_ids)
+            .order_by('customer_id').only('customer_id', 'current_debt', 'approved_limit')
+        }
+        debt = {customer_id: customer.current_debt for customer_id, customer in customers.items()}
+
+        loans, booked = [], []
+        for index, values in valid:
+            customer = customers.get(values['customer_id'])
+            if customer is None:
+                results[index] = {'index': index, 'status': 404, 'error': 'Customer not found.'}
+                continue
+            amount = values['loan_amount']
+            if debt[customer.customer_id] + float(amount) > customer.approved_limit:
+                results[index] = {'index': index, 'status': 400, 'error': (
+                    f"Current debt {debt[customer.customer_id]:.2f} plus {float(amount):.2f} "
+                    f"exceeds the approved limit of {customer.approved_limit:.2f}."
+                )}
+                continue
+            installment = Decimal(str(calculate_emi(amount, values['interest_rate'], values['tenure'])))
+            if installment >= MAX_INSTALLMENT:
+                results[index] = {'index': index, 'status': 400, 'error': 'Monthly installment is too large.'}
+                continue
+            loan_end_date = end_date(values['start_date'], values['tenure'])
+            if loan_end_date >= today:
+                # only active loans count toward current_debt
+                debt[customer.customer_id] += float(amount)
+            loans.append(Loan(
+                customer_id=customer.customer_id,
+                loan_amount=amount,
+                interest_rate=values['interest_rate'],
+                tenure=values['tenure'],
+                monthly_installment=installment,
+                emis_paid_on_time=0,
+                start_date=values['start_date'],
+                end_date=loan_end_date,
+            ))
+            booked.append(index)
+
+        # bulk_create sends no signals: refresh the denormalized totals and scores set-based
+        Loan.objects.bulk_create(loans, batch_size=batch_size)
+        touched = {loan.customer_id for loan in loans}
+        if touched:
+            Customer.objects.filter(customer_id__in=touched).refresh_loan_totals()
+            rebuild_credit_scores(touched)
+            invalidate_profiles(touched)
+
+    for index, loan in zip(booked, loans):
+        results[index] = {
+            'index': index,
+            'status': 201,
+            'loan_id': loan.loan_id,
+            'monthly_installment': str(loan.monthly_installment),
+            'end_date': loan.end_date.isoformat(),
+        }
+    return results
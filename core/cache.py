@@ -0,0 +1,137 @@
+"""
+Per-customer credit profile cache.
+
+Entries hold the CreditProfile aggregates plus the derived credit score, as
+read from the materialized CreditScore rows (core.scores), and live for
+CREDIT_PROFILE_CACHE_TTL seconds. Keys include the current date, so
+a profile computed yesterday (when other loans were active or the year was
+different) is never served today, and the scoring policy version the score
+was computed under (core.policy). Writes invalidate entries through the
+signals in core.signals; bulk loaders call invalidate_profiles themselves.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.policy import current_rules
+from core.scores import aget_materialized_entry, get_materialized_entries, get_materialized_entry
+
+KEY_PREFIX = 'credit_profile'
+STAT_KEYS = {name: f'{KEY_PREFIX}:stats:{name}' for name in ('hits', 'misses', 'invalidations')}
+
+
+def _ttl():
+    return getattr(settings, 'CREDIT_PROFILE_CACHE_TTL', 300)
+
+
+def profile_key(customer_id, today=None, version=None):
+    today = today or timezone.localdate()
+    version = current_rules().version if version is None else version
+    return f'{KEY_PREFIX}:{today.isoformat()}:v{version}:{customer_id}'
+
+
+def _count(name, amount=1):
+    if not amount:
+        return
+    key = STAT_KEYS[name]
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        if not cache.add(key, amount, timeout=None):
+            cache.incr(key, amount)
+
+
+async def _acount(name):
+    key = STAT_KEYS[name]
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+def get_cached_entry(customer_id, rules=None):
+    """
+    Return {'profile', 'credit_score', 'reason'}, scored under `rules`
+    (default: current_rules()); raises Customer.DoesNotExist.
+    """
+    rules = rules or current_rules()
+    key = profile_key(customer_id, version=rules.version)
+    entry = cache.get(key)
+    if entry is not None:
+        _count('hits')
+        return entry
+
+    _count('misses')
+    entry = get_materialized_entry(customer_id, rules)
+    cache.set(key, entry, _ttl())
+    return entry
+
+
+async def aget_cached_entry(customer_id, rules):
+    """Async get_cached_entry for the ASGI views; rules from acurrent_rules()."""
+    key = profile_key(customer_id, version=rules.version)
+    entry = await cache.aget(key)
+    if entry is not None:
+        await _acount('hits')
+        return entry
+
+    await _acount('misses')
+    entry = await aget_materialized_entry(customer_id, rules)
+    await cache.aset(key, entry, _ttl())
+    return entry
+
+
+def get_cached_profile(customer_id):
+    return get_cached_entry(customer_id)['profile']
+
+
+def get_cached_profiles(customer_ids, rules=None):
+    """Batch version of get_cached_profile: one get_many plus one query for the misses."""
+    today = timezone.localdate()
+    rules = rules or current_rules()
+    keys = {customer_id: profile_key(customer_id, today, rules.version) for customer_id in set(customer_ids)}
+    found = cache.get_many(keys.values())
+
+    profiles = {}
+    missing = []
+    for customer_id, key in keys.items():
+        if key in found:
+            profiles[customer_id] = found[key]['profile']
+        else:
+            missing.append(customer_id)
+    _count('hits', len(profiles))
+    _count('misses', len(missing))
+
+    if missing:
+        loaded = get_materialized_entries(missing, rules)
+        cache.set_many({keys[customer_id]: entry for customer_id, entry in loaded.items()}, _ttl())
+        profiles.update((customer_id, entry['profile']) for customer_id, entry in loaded.items())
+    return profiles
+
+
+def invalidate_profiles(customer_ids):
+    """
+    Drop cached profiles now and again when the surrounding transaction
+    commits, so a concurrent miss cannot re-cache pre-commit data.
+    """
+    customer_ids = set(customer_ids)
+    if not customer_ids:
+        return
+
+    def delete():
+        today = timezone.localdate()
+        cache.delete_many([profile_key(customer_id, today) for customer_id in customer_ids])
+
+    delete()
+    transaction.on_commit(delete)
+    _count('invalidations', len(customer_ids))
+
+
+def cache_stats():
+    values = cache.get_many(STAT_KEYS.values())
+    stats = {name: values.get(key, 0) for name, key in STAT_KEYS.items()}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    return stats
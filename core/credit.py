@@ -0,0 +1,213 @@
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from functools import cached_property
+
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.loan_math import calculate_emi
+from core.models import Customer, LoanRollup, rollup_expressions
+
+
+@dataclass(frozen=True)
+class ScoringRules:
+    """
+    Thresholds, corrected rates and limits used by the eligibility rules.
+    The active set comes from a ScoringPolicy (core.policy); these defaults
+    are version 0, used while no policy is active.
+    """
+    approve_above: int = 50             # score above this: approved as asked
+    mid_band_floor: int = 30            # (mid_band_floor, approve_above]: needs mid_band_min_rate
+    low_band_floor: int = 10            # (low_band_floor, mid_band_floor]: needs low_band_min_rate
+    mid_band_min_rate: float = 12
+    mid_band_rate: float = 16
+    low_band_min_rate: float = 16
+    low_band_rate: float = 20
+    emi_income_cap: float = 0.5         # share of monthly income EMIs may take
+    limit_income_multiple: float = 36   # approved limit of a new customer, in monthly incomes...
+    limit_rounding: int = 100000        # ...rounded to a multiple of this
+    version: int = 0                    # ScoringPolicy these came from
+
+    def approved_limit(self, monthly_income):
+        return round((self.limit_income_multiple * monthly_income) / self.limit_rounding) * self.limit_rounding
+
+    def band(self, credit_score):
+        """
+        (approve, min_rate, corrected_rate, reason) for a credit score:
+        min_rate is None outside the rate correction bands, where an
+        application at or below it gets corrected_rate instead.
+        """
+        if credit_score > self.approve_above:
+            return True, None, None, ""
+        if self.mid_band_floor < credit_score <= self.approve_above:
+            return (
+                False, self.mid_band_min_rate, self.mid_band_rate,
+                f"Credit score low; interest rate adjusted to {self.mid_band_rate:g}%.",
+            )
+        if self.low_band_floor < credit_score <= self.mid_band_floor:
+            return (
+                False, self.low_band_min_rate, self.low_band_rate,
+                f"Credit score very low; interest rate adjusted to {self.low_band_rate:g}%.",
+            )
+        return False, None, None, "Credit score too low for approval."
+
+    # Compiled once per rules object, so an evaluation is a table lookup
+    # rather than a walk through the bands and string formatting.
+    @cached_property
+    def bands(self):
+        """band() for every score from 0 to 100."""
+        return tuple(self.band(credit_score) for credit_score in range(101))
+
+    @cached_property
+    def total_emi_reason(self):
+        return f"Total EMIs exceed {self.emi_income_cap:.0%} of income."
+
+    @cached_property
+    def emi_reason(self):
+        return f"EMI exceeds {self.emi_income_cap:.0%} of income."
+
+
+DEFAULT_RULES = ScoringRules()
+
+
+@dataclass
+class CreditProfile:
+    """Aggregated loan history of one customer, as used by the eligibility rules."""
+    customer: Customer
+    loan_count: int
+    on_time_count: int
+    current_year_loans: int
+    total_loan_volume: Decimal
+    active_principal: Decimal
+    active_emi_total: Decimal
+
+    @property
+    def on_time_ratio(self):
+        if not self.loan_count:
+            return 1
+        return self.on_time_count / self.loan_count
+
+
+def profile_queryset(today=None):
+    """
+    Customers annotated with their credit profile aggregates.
+
+    All loan aggregates are conditional aggregates over one LEFT JOIN on
+    `loans`, so fetching any number of profiles costs a single query.
+    Archived loans (core.archive) are added in from their LoanRollup rows.
+    """
+    today = today or timezone.localdate()
+    active = Q(loans__end_date__gte=today)
+    zero = Value(Decimal('0'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    archived = rollup_expressions(LoanRollup, today)
+
+    return Customer.objects.annotate(
+        loan_count=Count('loans') + archived['loan_count'],
+        # emis_paid_on_time=True matches loans whose counter equals 1, same as the old view
+        on_time_count=Count('loans', filter=Q(loans__emis_paid_on_time=True)) + archived['on_time_count'],
+        # a date range rather than __year, so the (customer, start_date) index applies
+        current_year_loans=Count('loans', filter=Q(
+            loans__start_date__gte=date(today.year, 1, 1), loans__start_date__lt=date(today.year + 1, 1, 1)
+        )) + archived['current_year_loans'],
+        total_loan_volume=Coalesce(Sum('loans__loan_amount'), zero) + archived['total_loan_volume'],
+        active_principal=Coalesce(Sum('loans__loan_amount', filter=active), zero),
+        active_emi_total=Coalesce(Sum('loans__monthly_installment', filter=active), zero),
+    )
+
+
+def _to_profile(customer):
+    return CreditProfile(
+        customer=customer,
+        loan_count=customer.loan_count,
+        on_time_count=customer.on_time_count,
+        current_year_loans=customer.current_year_loans,
+        total_loan_volume=customer.total_loan_volume,
+        active_principal=customer.active_principal,
+        active_emi_total=customer.active_emi_total,
+    )
+
+
+def get_credit_profile(customer_id, today=None):
+    """Return the CreditProfile for one customer; raises Customer.DoesNotExist."""
+    return _to_profile(profile_queryset(today).get(customer_id=customer_id))
+
+
+def get_credit_profiles(customer_ids, today=None):
+    """Return {customer_id: CreditProfile} for all existing customers in customer_ids."""
+    customers = profile_queryset(today).filter(customer_id__in=set(customer_ids))
+    return {customer.customer_id: _to_profile(customer) for customer in customers}
+
+
+def score_profile(profile, rules=DEFAULT_RULES):
+    """Return (credit_score, reason) for a profile, before looking at the new loan."""
+    customer = profile.customer
+    reason = ""
+
+    if profile.active_principal > customer.approved_limit:
+        credit_score = 0
+        reason = "Current loans exceed approved limit."
+    else:
+        credit_score = min(100, int(
+            profile.on_time_ratio * 50 +
+            (1 / (profile.loan_count + 1)) * 30 +
+            (10 if profile.current_year_loans > 0 else 0) +
+            (10 if customer.approved_limit > profile.total_loan_volume else 0)
+        ))
+
+    if profile.active_emi_total > rules.emi_income_cap * customer.monthly_income:
+        credit_score = 0
+        reason = rules.total_emi_reason
+
+    return credit_score, reason
+
+
+def evaluate_eligibility(profile, loan_amount, interest_rate, tenure, rules=DEFAULT_RULES, score=None):
+    """
+    Apply the approval, rate correction and EMI rules to one application.
+
+    Pure function of its inputs: returns the eligibility response body and
+    touches neither the database nor the request. `score` is an already
+    computed score_profile(profile, rules) result, e.g. from the profile cache.
+    Raises ValueError or OverflowError if the EMI cannot be computed.
+    """
+    customer = profile.customer
+    credit_score, reason = score if score is not None else score_profile(profile, rules)
+
+    # Loan approval rules
+    approval, min_rate, corrected_rate, band_reason = (
+        rules.bands[credit_score] if 0 <= credit_score <= 100 else rules.band(credit_score)
+    )
+    corrected_interest_rate = interest_rate
+
+    if min_rate is not None:
+        if interest_rate > min_rate:
+            approval = True
+        else:
+            corrected_interest_rate = corrected_rate
+            reason = band_reason
+    elif not approval and not reason:
+        reason = band_reason
+
+    emi = calculate_emi(loan_amount, corrected_interest_rate, tenure)
+
+    if emi > rules.emi_income_cap * customer.monthly_income:
+        return {
+            'approval': False,
+            'reason': rules.emi_reason,
+            'monthly_installment': emi,
+            'policy_version': rules.version,
+        }
+
+    return {
+        'customer_id': customer.customer_id,
+        'approval': approval,
+        'interest_rate': interest_rate,
+        'corrected_interest_rate': corrected_interest_rate,
+        'tenure': tenure,
+        'monthly_installment': emi,
+        'credit_score': credit_score,
+        'reason': reason,
+        'policy_version': rules.version,
+    }
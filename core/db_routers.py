@@ -0,0 +1,142 @@
+"""
+Read replica routing.
+
+Everything goes to `default` unless a view opts in with ReplicaReadMixin
+(or AsyncReplicaReadMixin, or a replica_reads() block). Inside, reads go to
+one of DATABASE_REPLICAS until the first write; from then on the rest of
+the request reads from the primary, so it sees its own writes. Reads inside
+a transaction on the primary stay there too.
+
+Replicas lag behind the primary, so ReplicaPinningMiddleware also sends a
+client's reads to the primary for REPLICA_PIN_SECONDS after a successful
+request that wrote (e.g. create-loan followed by loan/<id>/). Requests that
+only read, like the POST eligibility checks, do not pin.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_pin'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_pinned = ContextVar('pinned_to_primary', default=False)
+# {'wrote': bool} for the request ReplicaPinningMiddleware is handling; a dict
+# so writes made in sync_to_async threads are seen too
+_request_writes = ContextVar('request_writes', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def replica_reads():
+    """Send reads in this block to a replica until the block writes."""
+    reads, pinned = _replica_reads.set(True), _pinned.set(_pinned.get())
+    try:
+        yield
+    finally:
+        _replica_reads.reset(reads)
+        _pinned.reset(pinned)
+
+
+def pin_to_primary():
+    """Read from the primary for the rest of the current replica_reads() block."""
+    if _replica_reads.get():
+        _pinned.set(True)
+
+
+def note_write():
+    """Record that the current request wrote, so its client gets pinned."""
+    writes = _request_writes.get()
+    if writes is not None:
+        writes['wrote'] = True
+
+
+class ReplicaReadMixin:
+    """Runs a DRF view's handler with replica_reads()."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class AsyncReplicaReadMixin:
+    """ReplicaReadMixin for the async views."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        with replica_reads():
+            return await super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or _pinned.get() or not replicas():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        # also asked for select_for_update() reads
+        pin_to_primary()
+        note_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
+
+
+class ReplicaPinningMiddleware:
+    """Pins a client to the primary for a while after a successful request that wrote."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        writes = {'wrote': False}
+        tokens = _pinned.set(PIN_COOKIE in request.COOKIES), _request_writes.set(writes)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.reset(tokens)
+        return self.finish(response, writes)
+
+    async def __acall__(self, request):
+        writes = {'wrote': False}
+        tokens = _pinned.set(PIN_COOKIE in request.COOKIES), _request_writes.set(writes)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.reset(tokens)
+        return self.finish(response, writes)
+
+    def reset(self, tokens):
+        pinned, writes = tokens
+        _pinned.reset(pinned)
+        _request_writes.reset(writes)
+
+    def finish(self, response, writes):
+        if writes['wrote'] and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
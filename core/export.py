@@ -0,0 +1,235 @@
+"""
+Portfolio export: customers with their credit metrics, and loans, as CSV or
+Parquet.
+
+Rows come from values_list().iterator(chunk_size), which reads through a
+server-side cursor on PostgreSQL, and each chunk is written out before the
+next one is fetched, so memory stays flat however large the tables are.
+Parquet gets one row group per chunk.
+
+The customer metrics come from the materialized CreditScore rows. A row
+that is missing, from an earlier day or from another scoring policy version
+is recomputed from the loans for the export (core.scores), one query per
+chunk that has any, so every exported score is as of today under the
+current policy.
+"""
+import csv
+import io
+
+from django.utils import timezone
+
+from core.ingestion import chunked
+from core.models import ArchivedLoan, Customer, Loan
+from core.policy import current_rules
+from core.scores import get_materialized_entries
+
+EXPORT_CHUNK_SIZE = 5000
+
+# (column, lookup or None for a derived column, Parquet type)
+CUSTOMER_COLUMNS = [
+    ('customer_id', 'customer_id', 'int64'),
+    ('first_name', 'first_name', 'string'),
+    ('last_name', 'last_name', 'string'),
+    ('phone_number', 'phone_number', 'string'),
+    ('age', 'age', 'int64'),
+    ('monthly_income', 'monthly_income', 'float64'),
+    ('approved_limit', 'approved_limit', 'float64'),
+    ('current_debt', 'current_debt', 'float64'),
+    ('num_loans', 'num_loans', 'int64'),
+    ('active_loan_emi', 'active_loan_emi', 'decimal'),
+    ('on_time_count', 'credit_score__on_time_count', 'int64'),
+    ('current_year_loans', 'credit_score__current_year_loans', 'int64'),
+    ('total_loan_volume', 'credit_score__total_loan_volume', 'decimal'),
+    ('credit_score', 'credit_score__score', 'int64'),
+    ('score_reason', 'credit_score__reason', 'string'),
+    ('score_as_of', 'credit_score__as_of', 'date'),
+    ('policy_version', 'credit_score__policy_version', 'int64'),
+    ('available_limit', None, 'float64'),
+    ('emi_headroom', None, 'float64'),
+]
+
+LOAN_COLUMNS = [
+    ('loan_id', 'loan_id', 'int64'),
+    ('customer_id', 'customer_id', 'int64'),
+    ('loan_amount', 'loan_amount', 'decimal'),
+    ('interest_rate', 'interest_rate', 'float64'),
+    ('tenure', 'tenure', 'int64'),
+    ('monthly_installment', 'monthly_installment', 'decimal'),
+    ('emis_paid_on_time', 'emis_paid_on_time', 'int64'),
+    ('start_date', 'start_date', 'date'),
+    ('end_date', 'end_date', 'date'),
+]
+
+
+def _score_values(entry, today, rules):
+    """The CreditScore columns for a get_materialized_entries() entry."""
+    profile = entry['profile']
+    return {
+        'credit_score__on_time_count': profile.on_time_count,
+        'credit_score__current_year_loans': profile.current_year_loans,
+        'credit_score__total_loan_volume': profile.total_loan_volume,
+        'credit_score__score': entry['credit_score'],
+        'credit_score__reason': entry['reason'],
+        'credit_score__as_of': today,
+        'credit_score__policy_version': rules.version,
+    }
+
+
+def _current_scores(rows, index, today, rules):
+    """rows, with the CreditScore columns recomputed where the stored score is stale."""
+    customer_id, as_of, version = (
+        index[name] for name in ('customer_id', 'credit_score__as_of', 'credit_score__policy_version')
+    )
+    stale = {row[customer_id] for row in rows if (row[as_of], row[version]) != (today, rules.version)}
+    if not stale:
+        return rows
+    entries = get_materialized_entries(stale, rules)
+    current = []
+    for row in rows:
+        if row[customer_id] in entries:
+            row = list(row)
+            for lookup, value in _score_values(entries[row[customer_id]], today, rules).items():
+                row[index[lookup]] = value
+            row = tuple(row)
+        current.append(row)
+    return current
+
+
+def _customer_rows(chunk_size):
+    lookups = [lookup for _, lookup, _ in CUSTOMER_COLUMNS if lookup]
+    index = {lookup: i for i, lookup in enumerate(lookups)}
+    income, limit, debt, emi = (
+        index[name] for name in ('monthly_income', 'approved_limit', 'current_debt', 'active_loan_emi')
+    )
+    today = timezone.localdate()
+    rules = current_rules()
+    rows = Customer.objects.order_by('customer_id').values_list(*lookups).iterator(chunk_size=chunk_size)
+    for chunk in chunked(rows, chunk_size):
+        for row in _current_scores(chunk, index, today, rules):
+            yield row + (
+                round(row[limit] - row[debt], 2),
+                round(rules.emi_income_cap * row[income] - float(row[emi]), 2),
+            )
+
+
+def _loan_rows(model):
+    def rows(chunk_size):
+        lookups = [lookup for _, lookup, _ in LOAN_COLUMNS]
+        return model.objects.order_by('loan_id').values_list(*lookups).iterator(chunk_size=chunk_size)
+    return rows
+
+
+DATASETS = {
+    'customers': (CUSTOMER_COLUMNS, _customer_rows),
+    'loans': (LOAN_COLUMNS, _loan_rows(Loan)),
+    # closed loans moved out of the loans table by core.archive
+    'archived_loans': (LOAN_COLUMNS, _loan_rows(ArchivedLoan)),
+}
+
+
+def header(dataset):
+    return [name for name, _, _ in DATASETS[dataset][0]]
+
+
+def iter_chunks(dataset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Lists of up to chunk_size row tuples, in primary key order."""
+    _, rows = DATASETS[dataset]
+    return chunked(rows(chunk_size), chunk_size)
+
+
+def csv_chunks(dataset, chunk_size=EXPORT_CHUNK_SIZE):
+    """The CSV file as one string per chunk, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header(dataset))
+    for chunk in iter_chunks(dataset, chunk_size):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_csv(dataset, f, chunk_size=EXPORT_CHUNK_SIZE):
+    """Write the dataset to an open text file; returns the row count."""
+    writer = csv.writer(f)
+    writer.writerow(header(dataset))
+    written = 0
+    for chunk in iter_chunks(dataset, chunk_size):
+        writer.writerows(chunk)
+        written += len(chunk)
+    return written
+
+
+def parquet_schema(dataset):
+    import pyarrow as pa
+
+    types = {
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'string': pa.string(),
+        'decimal': pa.decimal128(14, 2),
+        'date': pa.date32(),
+    }
+    return pa.schema([(name, types[kind]) for name, _, kind in DATASETS[dataset][0]])
+
+
+def _write_row_groups(dataset, sink, chunk_size):
+    """Write the dataset to sink, yielding the row count after each row group."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema(dataset)
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in iter_chunks(dataset, chunk_size):
+            columns = zip(*chunk)
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema,
+            ))
+            yield len(chunk)
+
+
+def write_parquet(dataset, sink, chunk_size=EXPORT_CHUNK_SIZE):
+    """Write the dataset to sink (a path or binary file); returns the row count."""
+    return sum(_write_row_groups(dataset, sink, chunk_size))
+
+
+class _Drain(io.RawIOBase):
+    """Write-only stream whose contents are handed on as they are written."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+def parquet_chunks(dataset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    The Parquet file as bytes, one row group at a time. Raises ImportError
+    right away, not halfway through a response, when pyarrow is missing.
+    """
+    import pyarrow  # noqa: F401
+
+    def chunks():
+        drain = _Drain()
+        for _ in _write_row_groups(dataset, drain, chunk_size):
+            yield drain.take()
+        # the footer is written when the writer closes
+        yield drain.take()
+
+    return chunks()
@@ -0,0 +1,286 @@
+"""
+Streaming readers and bulk loaders for the customer and loan data files.
+
+Rows are read lazily from .xlsx (openpyxl read-only mode) or .csv files and
+written with one bulk upsert per chunk, so memory stays bounded by the chunk
+size and not by the size of the sheet.
+"""
+import csv
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from core.cache import invalidate_profiles
+from core.scores import rebuild_credit_scores
+from core.models import ArchivedLoan, Customer, Loan
+
+CUSTOMER_COLUMNS = {
+    'Customer ID': 'customer_id',
+    'First Name': 'first_name',
+    'Last Name': 'last_name',
+    'Phone Number': 'phone_number',
+    'Age': 'age',
+    'Monthly Salary': 'monthly_income',
+    'Approved Limit': 'approved_limit',
+    'Current Debt': 'current_debt',
+}
+
+LOAN_COLUMNS = {
+    'Loan ID': 'loan_id',
+    'Customer ID': 'customer_id',
+    'Loan Amount': 'loan_amount',
+    'Tenure': 'tenure',
+    'Interest Rate': 'interest_rate',
+    'Monthly payment': 'monthly_installment',
+    'EMIs paid on Time': 'emis_paid_on_time',
+    'Date of Approval': 'start_date',
+    'End Date': 'end_date',
+}
+
+
+class RowError(ValueError):
+    pass
+
+
+def iter_rows(path, start=0, stop=None):
+    """
+    Yield (row_number, {header: value}) for data rows start..stop of a sheet.
+
+    row_number is 1-based and counts data rows only, so it is stable across
+    chunked reads of the same file.
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        with open(path, newline='') as f:
+            reader = csv.reader(f)
+            header = [h.strip() for h in next(reader)]
+            for number, values in islice(enumerate(reader, start=1), start, stop):
+                yield number, dict(zip(header, values))
+        return
+
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h).strip() for h in next(rows)]
+        rows = (values for values in rows if any(v is not None for v in values))
+        for number, values in islice(enumerate(rows, start=1), start, stop):
+            yield number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    # openpyxl reads whole numbers (ids, phone numbers) as floats
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def write_rows(path, rows):
+    """Write (row_number, row) pairs to a CSV file that iter_rows() reads back as the same rows."""
+    header = list(dict.fromkeys(column for _, row in rows for column in row))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows([_cell(row.get(column)) for column in header] for _, row in rows)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _value(row, column, convert, default=None):
+    value = row.get(column)
+    if value is None or value == '':
+        if default is not None:
+            return default
+        raise RowError(f"'{column}' is missing")
+    try:
+        return convert(value)
+    except (TypeError, ValueError, InvalidOperation):
+        raise RowError(f"'{column}' has invalid value {value!r}")
+
+
+def _int(value):
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(value)
+    return int(number)
+
+
+def _decimal(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+def _text(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def customer_from_row(row):
+    customer = Customer(
+        customer_id=_value(row, 'Customer ID', _int),
+        first_name=_value(row, 'First Name', _text),
+        last_name=_value(row, 'Last Name', _text),
+        phone_number=_value(row, 'Phone Number', _text),
+        age=_value(row, 'Age', _int),
+        monthly_income=_value(row, 'Monthly Salary', float),
+        approved_limit=_value(row, 'Approved Limit', float),
+        current_debt=_value(row, 'Current Debt', float, default=0.0),
+    )
+    if customer.monthly_income <= 0:
+        raise RowError("'Monthly Salary' must be positive")
+    return customer
+
+
+def loan_from_row(row):
+    loan = Loan(
+        loan_id=_value(row, 'Loan ID', _int),
+        customer_id=_value(row, 'Customer ID', _int),
+        loan_amount=_value(row, 'Loan Amount', _decimal),
+        tenure=_value(row, 'Tenure', _int),
+        interest_rate=_value(row, 'Interest Rate', float),
+        monthly_installment=_value(row, 'Monthly payment', _decimal),
+        emis_paid_on_time=_value(row, 'EMIs paid on Time', _int, default=0),
+        start_date=_value(row, 'Date of Approval', _date),
+        end_date=_value(row, 'End Date', _date),
+    )
+    if loan.loan_amount <= 0 or loan.tenure <= 0:
+        raise RowError("'Loan Amount' and 'Tenure' must be positive")
+    return loan
+
+
+def _parse(rows, parse, key):
+    """Parse a chunk; later rows win over earlier rows with the same primary key."""
+    objects, rejected = {}, []
+    for number, row in rows:
+        try:
+            obj = parse(row)
+        except RowError as e:
+            rejected.append((number, str(e)))
+            continue
+        objects[getattr(obj, key)] = (number, obj)
+    return list(objects.values()), rejected
+
+
+def load_customers(rows):
+    """Upsert one chunk of (row_number, row) customer rows; returns (loaded, rejected)."""
+    parsed, rejected = _parse(rows, customer_from_row, 'customer_id')
+    for _, customer in parsed:
+        customer.set_search_fields()
+    # phone numbers are unique (unique_customer_phone): a row reusing another
+    # customer's number is rejected instead of failing the whole chunk
+    owners = dict(
+        Customer.objects.filter(phone_normalized__in={customer.phone_normalized for _, customer in parsed})
+        .exclude(phone_normalized='').values_list('phone_normalized', 'customer_id')
+    )
+    customers = []
+    for number, customer in parsed:
+        phone = customer.phone_normalized
+        owner = owners.setdefault(phone, customer.customer_id) if phone else customer.customer_id
+        if owner != customer.customer_id:
+            rejected.append((number, f"phone number belongs to customer {owner}"))
+        else:
+            customers.append(customer)
+    with transaction.atomic():
+        Customer.objects.bulk_create(
+            customers,
+            update_conflicts=True,
+            unique_fields=['customer_id'],
+            update_fields=[f for f in CUSTOMER_COLUMNS.values() if f != 'customer_id'],
+        )
+        # bulk_create sends no signals; current_debt is derived from the loans
+        customer_ids = [customer.customer_id for customer in customers]
+        Customer.objects.filter(customer_id__in=customer_ids).refresh_loan_totals()
+        rebuild_credit_scores(customer_ids)
+        invalidate_profiles(customer_ids)
+    return len(customers), rejected
+
+
+def load_loans(rows):
+    """
+    Upsert one chunk of (row_number, row) loan rows; returns (loaded, rejected).
+
+    Rows for customers that do not exist are rejected instead of failing the
+    whole chunk on the foreign key, and so are rows for archived loans
+    (core.archive), which would otherwise come back as a second copy.
+    """
+    parsed, rejected = _parse(rows, loan_from_row, 'loan_id')
+    known = set(
+        Customer.objects.filter(customer_id__in={loan.customer_id for _, loan in parsed})
+        .values_list('customer_id', flat=True)
+    )
+    archived = set(
+        ArchivedLoan.objects.filter(loan_id__in={loan.loan_id for _, loan in parsed})
+        .values_list('loan_id', flat=True)
+    )
+    valid = []
+    for number, loan in parsed:
+        if loan.loan_id in archived:
+            rejected.append((number, f"loan {loan.loan_id} is archived"))
+        elif loan.customer_id in known:
+            valid.append(loan)
+        else:
+            rejected.append((number, f"customer {loan.customer_id} does not exist"))
+
+    with transaction.atomic():
+        # a re-imported loan may have changed customer; its previous owner's totals and score move too
+        previous_owners = set(
+            Loan.objects.select_for_update().filter(loan_id__in={loan.loan_id for loan in valid})
+            .values_list('customer_id', flat=True)
+        )
+        Loan.objects.bulk_create(
+            valid,
+            update_conflicts=True,
+            unique_fields=['loan_id'],
+            update_fields=[f for f in LOAN_COLUMNS.values() if f != 'loan_id'],
+        )
+        customer_ids = {loan.customer_id for loan in valid} | previous_owners
+        Customer.objects.filter(customer_id__in=customer_ids).refresh_loan_totals()
+        rebuild_credit_scores(customer_ids)
+        invalidate_profiles(customer_ids)
+    return len(valid), rejected
+
+
+def _loan_sequence_sql():
+    # sequence_reset_sql only looks at the live table, and archived loans
+    # keep their loan_ids (core.archive), so they must never be handed out again
+    qn = connection.ops.quote_name
+    top = 'GREATEST({})'.format(', '.join(
+        f"(SELECT MAX({qn('loan_id')}) FROM {qn(model._meta.db_table)})" for model in (Loan, ArchivedLoan)
+    ))
+    return (
+        f"SELECT setval(pg_get_serial_sequence('{qn(Loan._meta.db_table)}', 'loan_id'), "
+        f"COALESCE({top}, 1), {top} IS NOT NULL)"
+    )
+
+
+def reset_sequences(*models):
+    """Move the AutoField sequences past the explicitly imported (and archived) primary keys."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if Loan in models and connection.vendor == 'postgresql':
+        statements.append(_loan_sequence_sql())
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
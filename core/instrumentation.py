@@ -0,0 +1,290 @@
+"""
+Per-request and per-task instrumentation: DB query count, DB time,
+serializer time and total time.
+
+Enabled with INSTRUMENTATION_ENABLED in settings. When it is off the
+middleware removes itself at startup (MiddlewareNotUsed), the Celery signal
+handlers are never connected and timed() returns after one contextvar
+lookup. Histograms live in process memory, so each gunicorn worker exposes
+its own series on /metrics/. Celery workers serve no HTTP: each prefork
+pool process serves its task series at /metrics on CELERY_METRICS_PORT plus
+its pool index instead (serve_metrics).
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+_current = ContextVar('instrumentation_stats', default=None)
+
+logger = logging.getLogger(__name__)
+
+
+def enabled():
+    return getattr(settings, 'INSTRUMENTATION_ENABLED', False)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labels):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[label] for label in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.series.get(key)
+            if counts is None:
+                # bucket counts, then sum and count
+                counts = self.series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = {key: list(counts) for key, counts in self.series.items()}
+        for key, counts in sorted(series.items()):
+            labels = ','.join(f'{name}="{value}"' for name, value in zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="+Inf"}} {counts[-1]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {counts[-2]}')
+            lines.append(f'{self.name}_count{{{labels}}} {counts[-1]}')
+        return lines
+
+    def reset(self):
+        with self.lock:
+            self.series.clear()
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Total time per request.', DURATION_BUCKETS, ['view', 'method', 'status'])
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries per request.', QUERY_BUCKETS, ['view'])
+REQUEST_DB_DURATION = Histogram(
+    'http_request_db_duration_seconds', 'Time spent in database queries per request.', DURATION_BUCKETS, ['view'])
+REQUEST_SERIALIZER_DURATION = Histogram(
+    'http_request_serializer_duration_seconds', 'Time spent serializing and rendering per request.',
+    DURATION_BUCKETS, ['view'])
+TASK_DURATION = Histogram(
+    'celery_task_duration_seconds', 'Total time per Celery task.', DURATION_BUCKETS, ['task', 'state'])
+TASK_DB_QUERIES = Histogram(
+    'celery_task_db_queries', 'Database queries per Celery task.', QUERY_BUCKETS, ['task'])
+TASK_DB_DURATION = Histogram(
+    'celery_task_db_duration_seconds', 'Time spent in database queries per Celery task.', DURATION_BUCKETS, ['task'])
+
+HISTOGRAMS = [
+    REQUEST_DURATION, REQUEST_DB_QUERIES, REQUEST_DB_DURATION, REQUEST_SERIALIZER_DURATION,
+    TASK_DURATION, TASK_DB_QUERIES, TASK_DB_DURATION,
+]
+
+# extra text-format lines for the metrics endpoint, e.g. gauges kept elsewhere
+metric_collectors = []
+
+
+class Stats:
+    __slots__ = ('started', 'queries', 'db_time', 'serializer_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def track_queries(self, stack):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+
+
+class timed:
+    """
+    Add the time spent in the block to the current request's serializer
+    time. Queries run inside the block (e.g. a values() fetch) stay DB time.
+    """
+
+    __slots__ = ('stats', 'started', 'db_time')
+
+    def __enter__(self):
+        self.stats = _current.get()
+        if self.stats is not None:
+            self.started = time.perf_counter()
+            self.db_time = self.stats.db_time
+
+    def __exit__(self, *exc_info):
+        stats = self.stats
+        if stats is not None:
+            stats.serializer_time += time.perf_counter() - self.started - (stats.db_time - self.db_time)
+
+
+class InstrumentationMiddleware:
+    # async-capable, so ASGI requests to async views never hop to a thread here
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = Stats()
+        token = _current.set(stats)
+        try:
+            with ExitStack() as stack:
+                stats.track_queries(stack)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = Stats()
+        token = _current.set(stats)
+        # connections are per thread; the async ORM runs queries in the request's sync thread
+        stack = ExitStack()
+        await sync_to_async(stats.track_queries)(stack)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        total = time.perf_counter() - stats.started
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+
+        REQUEST_DURATION.observe(total, view=view, method=request.method, status=response.status_code)
+        REQUEST_DB_QUERIES.observe(stats.queries, view=view)
+        REQUEST_DB_DURATION.observe(stats.db_time, view=view)
+        REQUEST_SERIALIZER_DURATION.observe(stats.serializer_time, view=view)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"',
+            f'serializer;dur={stats.serializer_time * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF Response is rendered after the view returns; count rendering as serializer time
+        stats = _current.get()
+        if stats is not None:
+            render = response.render
+
+            def timed_render():
+                with timed():
+                    return render()
+            response.render = timed_render
+        return response
+
+
+_tasks = {}
+
+
+def _task_prerun(task_id=None, task=None, **kwargs):
+    stats = Stats()
+    stack = ExitStack()
+    stats.track_queries(stack)
+    _tasks[task_id] = (stats, stack)
+
+
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    entry = _tasks.pop(task_id, None)
+    if entry is None:
+        return
+    stats, stack = entry
+    stack.close()
+    TASK_DURATION.observe(time.perf_counter() - stats.started, task=task.name, state=state or 'UNKNOWN')
+    TASK_DB_QUERIES.observe(stats.queries, task=task.name)
+    TASK_DB_DURATION.observe(stats.db_time, task=task.name)
+
+
+def _serve_worker_metrics(**kwargs):
+    from billiard.process import current_process
+
+    # pool indexes are reused when a child is replaced, so ports stay stable
+    port = settings.CELERY_METRICS_PORT + (getattr(current_process(), 'index', None) or 0)
+    try:
+        serve_metrics(port)
+    except OSError:
+        logger.warning('Could not serve Celery metrics on port %d', port, exc_info=True)
+
+
+def connect_celery_signals():
+    from celery.signals import task_postrun, task_prerun, worker_process_init
+
+    task_prerun.connect(_task_prerun, weak=False, dispatch_uid='core.instrumentation.task_prerun')
+    task_postrun.connect(_task_postrun, weak=False, dispatch_uid='core.instrumentation.task_postrun')
+    worker_process_init.connect(
+        _serve_worker_metrics, weak=False, dispatch_uid='core.instrumentation.worker_process_init'
+    )
+
+
+def render_metrics():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    for collector in metric_collectors:
+        lines += collector()
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, host=''):
+    """Serve render_metrics() over HTTP from a daemon thread, for processes without /metrics/."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
+
+
+def reset_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
@@ -0,0 +1,95 @@
+"""
+Loan arithmetic: EMI, end dates and amortization schedules.
+
+A schedule depends only on (amount, rate, tenure), so it is computed once
+with NumPy for all months at the same time and kept in an LRU cache. Cached
+arrays are read-only; due dates are added per loan by schedule_rows().
+"""
+import calendar
+import math
+from functools import lru_cache
+
+import numpy as np
+
+SCHEDULE_CACHE_SIZE = 4096
+
+
+def add_months(start, months):
+    """Same day `months` later, clamped to the end of shorter months."""
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return start.replace(year=year, month=month, day=min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def end_date(start_date, tenure):
+    """Date of the last installment: one per month after start_date."""
+    return add_months(start_date, int(tenure))
+
+
+def calculate_emi(principal, annual_rate, tenure):
+    """Monthly installment on compound interest, rounded to paise."""
+    P = float(principal)
+    r = float(annual_rate) / (12 * 100)
+    n = int(tenure)
+
+    emi = (P * r * math.pow(1 + r, n)) / (math.pow(1 + r, n) - 1) if r > 0 else P / n
+    return round(emi, 2)
+
+
+def amortization_schedule(principal, annual_rate, tenure):
+    """
+    Return (payment, principal, interest, balance) arrays, one entry per
+    month. Installments are the paise-rounded EMI; the last one absorbs the
+    rounding so the balance ends at exactly zero.
+    """
+    if int(tenure) <= 0:
+        raise ValueError("Tenure must be at least one month.")
+    return _schedule(round(float(principal), 2), float(annual_rate), int(tenure))
+
+
+@lru_cache(maxsize=SCHEDULE_CACHE_SIZE)
+def _schedule(principal, annual_rate, tenure):
+    emi = calculate_emi(principal, annual_rate, tenure)
+    r = annual_rate / (12 * 100)
+    months = np.arange(1, tenure + 1)
+
+    if r > 0:
+        growth = np.power(1 + r, months)
+        balance = principal * growth - emi * (growth - 1) / r
+    else:
+        balance = principal - emi * months
+    opening = np.concatenate(([principal], balance[:-1]))
+    interest = opening * r
+    payment = np.full(tenure, emi)
+    # the last installment pays off whatever the rounded EMI left over
+    payment[-1] = opening[-1] + interest[-1]
+    balance[-1] = 0.0
+    principal_part = payment - interest
+
+    arrays = tuple(np.round(a, 2) for a in (payment, principal_part, interest, np.maximum(balance, 0)))
+    for array in arrays:
+        array.flags.writeable = False
+    return arrays
+
+
+def schedule_rows(principal, annual_rate, tenure, start_date):
+    """The schedule as JSON-ready dicts with due dates."""
+    payment, principal_part, interest, balance = amortization_schedule(principal, annual_rate, tenure)
+    return [
+        {
+            'installment': month,
+            'due_date': add_months(start_date, month).isoformat(),
+            'payment': p,
+            'principal': pr,
+            'interest': i,
+            'balance': b,
+        }
+        for month, p, pr, i, b in zip(
+            range(1, len(payment) + 1), payment.tolist(), principal_part.tolist(),
+            interest.tolist(), balance.tolist()
+        )
+    ]
+
+
+def schedule_cache_info():
+    return _schedule.cache_info()
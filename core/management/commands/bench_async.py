@@ -0,0 +1,73 @@
+import json
+import platform
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarking import ASYNC_ENDPOINTS, Scenario, run_http
+from core.models import Customer, Loan
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the sync read endpoints on a WSGI server with their async/ variants on an ASGI server, '
+        'at increasing client concurrency. Start both servers with the same worker count, e.g. '
+        '"gunicorn -w 4 credit_approval_system.wsgi" and '
+        '"gunicorn -w 4 -k uvicorn.workers.UvicornWorker -b :8001 credit_approval_system.asgi".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', required=True, help='Base URL of the WSGI server')
+        parser.add_argument('--asgi-url', required=True, help='Base URL of the ASGI server')
+        parser.add_argument('--endpoints', default=','.join(ASYNC_ENDPOINTS),
+                            help=f"Comma separated subset of: {', '.join(ASYNC_ENDPOINTS)}")
+        parser.add_argument('--concurrency', default='1,8,32,128',
+                            help='Comma separated client concurrency levels')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and level')
+        parser.add_argument('--workers', type=int, help='Worker count both servers run with (recorded in the report)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--save', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        endpoints = [e.strip() for e in options['endpoints'].split(',') if e.strip()]
+        unknown = set(endpoints) - set(ASYNC_ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError("--concurrency must be comma separated integers.")
+
+        customer_ids = list(Customer.objects.values_list('customer_id', flat=True)[:100000])
+        loan_ids = list(Loan.objects.values_list('loan_id', flat=True)[:100000])
+        try:
+            scenario = Scenario(customer_ids, loan_ids, options['seed'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"{'endpoint':<20}{'clients':>8}{'wsgi req/s':>12}{'asgi req/s':>12}"
+            f"{'wsgi p95':>10}{'asgi p95':>10}{'errors':>9}"
+        )
+        rows = []
+        for endpoint in endpoints:
+            for level in levels:
+                wsgi = run_http(scenario, endpoint, options['requests'], options['wsgi_url'], level)
+                asgi = run_http(scenario, f'async-{endpoint}', options['requests'], options['asgi_url'], level)
+                rows.append({'endpoint': endpoint, 'concurrency': level, 'wsgi': wsgi, 'asgi': asgi})
+                self.stdout.write(
+                    f"{endpoint:<20}{level:>8}{wsgi['throughput_rps']:>12}{asgi['throughput_rps']:>12}"
+                    f"{wsgi['p95_ms']:>10}{asgi['p95_ms']:>10}{wsgi['errors'] + asgi['errors']:>9}"
+                )
+
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump({
+                    'created_at': datetime.now(timezone.utc).isoformat(),
+                    'python': platform.python_version(),
+                    'workers': options['workers'],
+                    'wsgi_url': options['wsgi_url'],
+                    'asgi_url': options['asgi_url'],
+                    'results': rows,
+                }, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results saved to {options['save']}"))
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.booking import book_loan, book_loans
+from core.models import Customer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare booking loans one by one (create-loan) with book_loans (create-loan/bulk) in loans/sec'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=10000, help='Loans per bulk batch')
+        parser.add_argument('--customers', type=int, default=1000, help='Synthetic customers the loans spread over')
+        parser.add_argument('--single', type=int, default=500, help='Loans booked one by one for the baseline')
+
+    def handle(self, *args, **options):
+        # the synthetic data only lives inside this transaction
+        try:
+            with transaction.atomic():
+                self.run(options['loans'], options['customers'], options['single'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, count, customer_count, single):
+        customers = Customer.objects.bulk_create([
+            Customer(
+                first_name='Bench', last_name=f'Bulk {i}', phone_number=f'7{i:09d}', age=40,
+                monthly_income=1000000, approved_limit=10 ** 9,
+            )
+            for i in range(customer_count)
+        ], batch_size=1000)
+        ids = [customer.customer_id for customer in customers]
+        items = [
+            {'customer_id': ids[i % len(ids)], 'loan_amount': 50000 + i % 1000, 'interest_rate': 10.5, 'tenure': 24}
+            for i in range(count)
+        ]
+
+        started = time.perf_counter()
+        for item in items[:single]:
+            book_loan(item['customer_id'], item['loan_amount'], item['interest_rate'], item['tenure'])
+        single_rate = single / (time.perf_counter() - started) if single else 0
+
+        started = time.perf_counter()
+        results = book_loans(items)
+        elapsed = time.perf_counter() - started
+        created = sum(1 for result in results if result['status'] == 201)
+
+        self.stdout.write(f"{connection.vendor}, {count} loans over {customer_count} customers")
+        self.stdout.write(f"{'path':<12}{'loans':>8}{'seconds':>10}{'loans/sec':>12}")
+        if single:
+            self.stdout.write(f"{'one by one':<12}{single:>8}{single / single_rate:>10.3f}{single_rate:>12.0f}")
+        self.stdout.write(f"{'bulk':<12}{created:>8}{elapsed:>10.3f}{created / elapsed:>12.0f}")
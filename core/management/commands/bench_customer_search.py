@@ -0,0 +1,59 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmarking import percentile
+from core.fast_serializers import fast_serializer
+from core.models import Customer
+from core.search import search_customers
+from core.serializers import CustomerSearchResultSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Time customer lookups by phone and by name prefix against the current table '
+        '(add customers first with e.g. seed_portfolio --customers 2000000 --loans-per-customer 0).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lookups', type=int, default=1000)
+        parser.add_argument('--limit', type=int, default=20, help='Page size, as in customers/search/')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        total = Customer.objects.count()
+        if not total:
+            raise CommandError('No customers to search; seed some first.')
+        rng = random.Random(options['seed'])
+        last_id = Customer.objects.order_by('-customer_id').values_list('customer_id', flat=True).first()
+        samples = []
+        while len(samples) < min(options['lookups'], total):
+            # random existing customers, without loading the whole table
+            customer = (
+                Customer.objects.filter(customer_id__gte=rng.randint(1, last_id))
+                .order_by('customer_id').values('phone_number', 'first_name', 'last_name').first()
+            )
+            if customer:
+                samples.append(customer)
+
+        serializer = fast_serializer(CustomerSearchResultSerializer)
+        cases = [
+            ('phone', lambda c: search_customers(phone=c['phone_number'])),
+            ('name prefix', lambda c: search_customers(name=f"{c['first_name']} {c['last_name'][:2]}")),
+        ]
+        self.stdout.write(f"{connection.vendor}, {total} customers, {len(samples)} lookups per case")
+        self.stdout.write(f"{'lookup':<14}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for label, query in cases:
+            plan = query(samples[0])[:options['limit']].explain()
+            self.stdout.write(f"  {label} plan: {' | '.join(line.strip() for line in plan.splitlines())}")
+            timings = []
+            for customer in samples:
+                started = time.perf_counter()
+                serializer.rows(query(customer)[:options['limit'] + 1])
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(
+                f"{label:<14}{sum(timings) / len(timings) * 1000:>10.3f}{percentile(timings, 50) * 1000:>10.3f}"
+                f"{percentile(timings, 95) * 1000:>10.3f}{percentile(timings, 99) * 1000:>10.3f}"
+            )
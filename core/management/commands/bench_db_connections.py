@@ -0,0 +1,84 @@
+import copy
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+
+from core.benchmarking import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure what a request pays for its database connection: a fresh connection per request '
+        '(CONN_MAX_AGE=0), a persistent connection, and a pool checkout when DB_POOL is on.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        iterations = options['iterations']
+        connection = connections[alias]
+
+        results = [
+            ('new connection', self.time_new_connections(connection, alias, iterations)),
+            ('persistent', self.time_persistent(connection, iterations)),
+        ]
+        if getattr(connection, 'pool', None) is not None:
+            results.append(('pool checkout', self.time_pool_checkout(connection, iterations)))
+
+        self.stdout.write(f"{connection.vendor} ({connection.settings_dict.get('HOST') or 'local'}), "
+                          f"{iterations} iterations of connect-if-needed + SELECT 1")
+        self.stdout.write(f"{'mode':<16}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for label, timings in results:
+            self.stdout.write(
+                f"{label:<16}{sum(timings) / len(timings) * 1000:>10.3f}"
+                f"{percentile(timings, 50) * 1000:>10.3f}{percentile(timings, 95) * 1000:>10.3f}"
+            )
+        saved = (sum(results[0][1]) - sum(results[1][1])) / iterations
+        self.stdout.write(self.style.SUCCESS(
+            f"Persistent connections save {saved * 1000:.3f} ms per request "
+            f"({saved * 1000:.2f} worker-seconds every second at 1000 req/s)."
+        ))
+
+    def time_new_connections(self, connection, alias, iterations):
+        # a separate wrapper without the pool, so this is a real connect every time
+        settings_dict = copy.deepcopy(connection.settings_dict)
+        settings_dict.get('OPTIONS', {}).pop('pool', None)
+        backend = load_backend(settings_dict['ENGINE'])
+        timings = []
+        for _ in range(iterations):
+            wrapper = backend.DatabaseWrapper(settings_dict, alias)
+            started = time.perf_counter()
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            timings.append(time.perf_counter() - started)
+            wrapper.close()
+        return timings
+
+    def time_persistent(self, connection, iterations):
+        connection.ensure_connection()
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    def time_pool_checkout(self, connection, iterations):
+        timings = []
+        for _ in range(iterations):
+            # close() hands the connection back to the pool
+            connection.close()
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            timings.append(time.perf_counter() - started)
+        return timings
@@ -0,0 +1,97 @@
+import json
+import logging
+import platform
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.benchmarking import ENDPOINTS, Scenario, compare, format_table, run_http, run_in_process
+from core.models import Customer, Loan
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the core endpoints: p50/p95/p99 latency, throughput and (in-process) queries per request. '
+        'Seed data first with seed_portfolio.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS),
+                            help=f"Comma separated subset of: {', '.join(ENDPOINTS)}")
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--url', help='Base URL of a running server; drives it over HTTP instead of the test client')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent HTTP clients (with --url)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep-writes', action='store_true',
+                            help='Keep customers/loans created by the in-process run (rolled back by default)')
+        parser.add_argument('--save', help='Write results as a JSON baseline to this file')
+        parser.add_argument('--compare', help='Compare against a baseline saved with --save; exit 1 on regression')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed relative p95/throughput change before --compare flags it')
+
+    def handle(self, *args, **options):
+        endpoints = [e.strip() for e in options['endpoints'].split(',') if e.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+        customer_ids = list(Customer.objects.values_list('customer_id', flat=True)[:100000])
+        loan_ids = list(Loan.objects.values_list('loan_id', flat=True)[:100000])
+        try:
+            scenario = Scenario(customer_ids, loan_ids, options['seed'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['url']:
+            results = [
+                run_http(scenario, endpoint, options['requests'], options['url'], options['concurrency'])
+                for endpoint in endpoints
+            ]
+        else:
+            results = self.run_in_process(scenario, endpoints, options['requests'], options['keep_writes'])
+
+        self.stdout.write(format_table(results))
+
+        report = {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'mode': 'http' if options['url'] else 'in-process',
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'customers': len(customer_ids),
+            'loans': len(loan_ids),
+            'concurrency': options['concurrency'] if options['url'] else 1,
+            'results': results,
+        }
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['save']}"))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            regressions = compare(results, baseline, options['tolerance'])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(f"  regression: {regression}"))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions against {options['compare']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}."))
+
+    def run_in_process(self, scenario, endpoints, requests, keep_writes):
+        # rejected requests (e.g. over-limit loans) are expected; keep the 4xx warnings out of the report
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        results = []
+        try:
+            with transaction.atomic():
+                for endpoint in endpoints:
+                    results.append(run_in_process(scenario, endpoint, requests))
+                if not keep_writes:
+                    raise Rollback
+        except Rollback:
+            pass
+        return results
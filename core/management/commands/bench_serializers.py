@@ -0,0 +1,76 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from core.fast_serializers import fast_serializer
+from core.models import Customer, Loan
+from core.serializers import LoanDetailSerializer, LoanSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare DRF ModelSerializer and the fast read serializers on a synthetic loan history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=5000, help='Loans in the synthetic history')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per serializer (best is reported)')
+
+    def handle(self, *args, **options):
+        # the synthetic data only lives inside this transaction
+        try:
+            with transaction.atomic():
+                self.run(options['loans'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, count, repeat):
+        customer = Customer.objects.create(
+            first_name='Bench', last_name='Customer', phone_number='0000000000', age=40,
+            monthly_income=1000000, approved_limit=36000000,
+        )
+        today = date.today()
+        Loan.objects.bulk_create([
+            Loan(
+                customer=customer, loan_amount=Decimal(100000 + i), interest_rate=10.5, tenure=24,
+                monthly_installment=Decimal('4637.45'), emis_paid_on_time=i % 24,
+                start_date=today - timedelta(days=i % 900), end_date=today + timedelta(days=i % 700),
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        loans = Loan.objects.filter(customer=customer).order_by('loan_id')
+        renderer = JSONRenderer()
+
+        cases = [
+            # .all() so every run queries the database, like a request would
+            ('customer-loans list', lambda: LoanSerializer(loans.all(), many=True).data,
+             lambda: fast_serializer(LoanSerializer).rows(loans.all())),
+            ('loan detail x500', lambda: [
+                LoanDetailSerializer(loan).data for loan in loans.select_related('customer')[:500]
+            ], lambda: fast_serializer(LoanDetailSerializer).rows(loans.all()[:500])),
+        ]
+        for label, drf, fast in cases:
+            if renderer.render(drf()) != renderer.render(fast()):
+                self.stderr.write(self.style.ERROR(f"{label}: outputs differ"))
+                continue
+            drf_time = self.best_of(drf, repeat)
+            fast_time = self.best_of(fast, repeat)
+            self.stdout.write(
+                f"{label:<22} {count:>7} loans  drf {drf_time * 1000:8.1f} ms  "
+                f"fast {fast_time * 1000:8.1f} ms  speedup {drf_time / fast_time:5.1f}x"
+            )
+
+    def best_of(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
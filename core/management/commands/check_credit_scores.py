@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache import invalidate_profiles
+from core.scores import find_inconsistent_scores, rebuild_credit_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare every materialized CreditScore with a full recomputation from the customer's loans. "
+        "Exits 1 when any differ, unless --fix rebuilds them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rebuild the rows that differ')
+        parser.add_argument('--show', type=int, default=20, help='Mismatches to print')
+
+    def handle(self, *args, **options):
+        mismatched = []
+        for customer_id, diff in find_inconsistent_scores():
+            if len(mismatched) < options['show']:
+                fields = ', '.join(f"{name} {stored} != {expected}" for name, (stored, expected) in diff.items())
+                self.stdout.write(f"  customer {customer_id}: {fields}")
+            mismatched.append(customer_id)
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('All credit scores match a full recomputation.'))
+            return
+        if not options['fix']:
+            raise CommandError(f"{len(mismatched)} credit scores differ from a full recomputation.")
+
+        rebuild_credit_scores(mismatched)
+        invalidate_profiles(mismatched)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(mismatched)} credit scores."))
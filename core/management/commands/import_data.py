@@ -1,47 +1,57 @@
-from django.core.management.base import BaseCommand
-import pandas as pd
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ingestion import chunked, iter_rows, load_customers, load_loans, reset_sequences
 from core.models import Customer, Loan
 
+DATA_DIR = settings.BASE_DIR / 'credit_approval_system'
+
+
 class Command(BaseCommand):
-    help = 'Import customer and loan data from Excel files'
-
-    def handle(self, *args, **kwargs):
-        customer_file = r"C:\Users\yuvraj\Desktop\credit-approval-system\credit_approval_system\credit_approval_system\customer_data.xlsx"
-        loan_file = r"C:\Users\yuvraj\Desktop\credit-approval-system\credit_approval_system\credit_approval_system\loan_data.xlsx"
-
-        customer_df = pd.read_excel(customer_file)
-        customer_df.columns = customer_df.columns.str.strip()
-
-        for _, row in customer_df.iterrows():
-            Customer.objects.update_or_create(
-                customer_id=row['Customer ID'],
-                defaults={
-                    'first_name': row['First Name'],
-                    'last_name': row['Last Name'],
-                    'phone_number': row['Phone Number'],
-                    'age': row['Age'],
-                    'monthly_income': row['Monthly Salary'],
-                    'approved_limit': row['Approved Limit'],
-                    'current_debt': row.get('Current Debt', 0),
-                }
-            )
-        self.stdout.write(self.style.SUCCESS('Successfully imported customers'))
-
-        loan_df = pd.read_excel(loan_file)
-        loan_df.columns = loan_df.columns.str.strip()
-
-        for _, row in loan_df.iterrows():
-            Loan.objects.update_or_create(
-                loan_id=row['Loan ID'],
-                defaults={
-                    'customer_id': row['Customer ID'],
-                    'loan_amount': row['Loan Amount'],
-                    'tenure': row['Tenure'],
-                    'interest_rate': row['Interest Rate'],
-                    'monthly_installment': row['Monthly payment'],
-                    'emis_paid_on_time': row['EMIs paid on Time'],
-                    'start_date': row['Date of Approval'],
-                    'end_date': row['End Date'],
-                }
-            )
-        self.stdout.write(self.style.SUCCESS('Successfully imported loans'))
+    help = 'Import customer and loan data from Excel or CSV files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', default=str(DATA_DIR / 'customer_data.xlsx'),
+                            help='Customer sheet (.xlsx or .csv)')
+        parser.add_argument('--loans', default=str(DATA_DIR / 'loan_data.xlsx'),
+                            help='Loan sheet (.xlsx or .csv)')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Rows per bulk upsert')
+        parser.add_argument('--skip-customers', action='store_true')
+        parser.add_argument('--skip-loans', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be positive.')
+
+        if not options['skip_customers']:
+            self.load('customers', options['customers'], load_customers, options['chunk_size'])
+        if not options['skip_loans']:
+            self.load('loans', options['loans'], load_loans, options['chunk_size'])
+
+        reset_sequences(Customer, Loan)
+
+    def load(self, label, path, loader, chunk_size):
+        started = time.perf_counter()
+        loaded, rejected = 0, []
+        try:
+            for chunk in chunked(iter_rows(path), chunk_size):
+                chunk_loaded, chunk_rejected = loader(chunk)
+                loaded += chunk_loaded
+                rejected.extend(chunk_rejected)
+        except FileNotFoundError:
+            raise CommandError(f"File not found: {path}")
+
+        elapsed = time.perf_counter() - started
+        rate = (loaded + len(rejected)) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully imported {loaded} {label} in {elapsed:.2f}s ({rate:,.0f} rows/sec)"
+        ))
+        if rejected:
+            self.stdout.write(self.style.WARNING(f"Rejected {len(rejected)} {label} rows:"))
+            for number, reason in rejected[:20]:
+                self.stdout.write(f"  row {number}: {reason}")
+            if len(rejected) > 20:
+                self.stdout.write(f"  ... and {len(rejected) - 20} more")
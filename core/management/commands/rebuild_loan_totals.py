@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Q
+
+from core.cache import invalidate_profiles
+from core.models import Customer
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify and rebuild the denormalized loan totals on Customer (num_loans, active_loan_principal, "
+        "active_loan_emi, current_debt). Run daily: loans stop counting as active after their end_date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report customers whose stored totals are stale; exit 1 if any')
+
+    def handle(self, *args, **options):
+        stale = Customer.objects.with_computed_loan_totals().filter(
+            ~Q(num_loans=F('computed_num_loans'))
+            | ~Q(active_loan_principal=F('computed_active_loan_principal'))
+            | ~Q(active_loan_emi=F('computed_active_loan_emi'))
+        )
+        stale_ids = list(stale.values_list('customer_id', flat=True))
+
+        if options['check']:
+            for customer_id in stale_ids[:20]:
+                self.stdout.write(f"  customer {customer_id} has stale loan totals")
+            if stale_ids:
+                raise CommandError(f"{len(stale_ids)} customers have stale loan totals.")
+            self.stdout.write(self.style.SUCCESS('All customer loan totals are up to date.'))
+            return
+
+        updated = Customer.objects.all().refresh_loan_totals()
+        invalidate_profiles(stale_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt loan totals for {updated} customers ({len(stale_ids)} were stale)."
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ScoringPolicy
+from core.policy import activate_policy, current_rules
+
+
+class Command(BaseCommand):
+    help = (
+        'List scoring policies, or switch the active one. Every process picks up a switch '
+        'within SCORING_POLICY_CHECK_SECONDS; policies are created and edited in the admin.'
+    )
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument('--activate', type=int, metavar='VERSION', help='Policy to make active')
+        group.add_argument('--builtin', action='store_true', help='Go back to the built-in rules (version 0)')
+
+    def handle(self, *args, **options):
+        if options['activate'] is not None:
+            policy = ScoringPolicy.objects.filter(pk=options['activate']).first()
+            if policy is None:
+                raise CommandError(f"Scoring policy {options['activate']} does not exist.")
+            activate_policy(policy)
+        elif options['builtin']:
+            activate_policy(None)
+
+        for policy in ScoringPolicy.objects.order_by('pk'):
+            rules = ', '.join(f'{name}={getattr(policy, name):g}' for name in ScoringPolicy.RULE_FIELDS)
+            marker = '*' if policy.is_active else ' '
+            self.stdout.write(f"{marker} {policy.pk:>4}  {policy.name or '-'}  {rules}")
+        self.stdout.write(f"Active version: {current_rules().version}")
@@ -0,0 +1,89 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.loan_math import add_months, calculate_emi
+from core.scores import rebuild_credit_scores
+from core.ingestion import reset_sequences
+from core.models import Customer, Loan
+from core.policy import current_rules
+
+
+class Command(BaseCommand):
+    help = 'Add a synthetic portfolio (customers x loans per customer) for benchmarks; use flush to start over'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000)
+        parser.add_argument('--loans-per-customer', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible portfolios')
+
+    def handle(self, *args, **options):
+        if options['customers'] <= 0 or options['loans_per_customer'] < 0:
+            raise CommandError('--customers must be positive and --loans-per-customer not negative.')
+
+        rng = random.Random(options['seed'])
+        self.rules = current_rules()
+        batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            first_id = (Customer.objects.order_by('-customer_id').values_list('customer_id', flat=True).first() or 0) + 1
+            customer_ids = range(first_id, first_id + options['customers'])
+            for start in range(0, len(customer_ids), batch_size):
+                Customer.objects.bulk_create([
+                    self.customer(rng, customer_id) for customer_id in customer_ids[start:start + batch_size]
+                ])
+
+            loans = []
+            for customer_id in customer_ids:
+                for _ in range(options['loans_per_customer']):
+                    loans.append(self.loan(rng, customer_id))
+                    if len(loans) >= batch_size:
+                        Loan.objects.bulk_create(loans)
+                        loans = []
+            Loan.objects.bulk_create(loans)
+
+            Customer.objects.filter(customer_id__in=customer_ids).refresh_loan_totals()
+            rebuild_credit_scores(customer_ids)
+            reset_sequences(Customer, Loan)
+
+        elapsed = time.perf_counter() - started
+        total_loans = options['customers'] * options['loans_per_customer']
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['customers']} customers and {total_loans} loans in {elapsed:.1f}s"
+        ))
+
+    def customer(self, rng, customer_id):
+        income = rng.randrange(15000, 300000, 1000)
+        return Customer(
+            customer_id=customer_id,
+            first_name=f'Seed{customer_id}',
+            last_name=rng.choice(['Sharma', 'Patel', 'Garcia', 'Smith', 'Khan', 'Iyer', 'Rao', 'Singh']),
+            phone_number=f'9{customer_id:09d}',
+            age=rng.randint(21, 70),
+            monthly_income=income,
+            approved_limit=self.rules.approved_limit(income),
+        )
+
+    def loan(self, rng, customer_id):
+        amount = rng.randrange(50000, 2000000, 10000)
+        rate = round(rng.uniform(7, 20), 2)
+        tenure = rng.choice([6, 12, 24, 36, 60, 120])
+        start = date.today() - timedelta(days=rng.randint(0, 3650))
+        end = add_months(start, tenure)
+        elapsed_months = max(0, min(tenure, (min(date.today(), end) - start).days // 30))
+        return Loan(
+            customer_id=customer_id,
+            loan_amount=Decimal(amount),
+            interest_rate=rate,
+            tenure=tenure,
+            monthly_installment=Decimal(str(calculate_emi(amount, rate, tenure))),
+            emis_paid_on_time=rng.randint(0, elapsed_months),
+            start_date=start,
+            end_date=end,
+        )
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Customer',
+            fields=[
+                ('customer_id', models.AutoField(primary_key=True, serialize=False)),
+                ('first_name', models.CharField(max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('phone_number', models.CharField(max_length=15)),
+                ('age', models.IntegerField()),
+                ('monthly_income', models.FloatField()),
+                ('approved_limit', models.FloatField()),
+                ('current_debt', models.FloatField(default=0.0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Loan',
+            fields=[
+                ('loan_id', models.AutoField(primary_key=True, serialize=False)),
+                ('loan_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('interest_rate', models.FloatField()),
+                ('tenure', models.IntegerField()),
+                ('monthly_installment', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('emis_paid_on_time', models.IntegerField(default=0)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loans', to='core.customer')),
+            ],
+        ),
+    ]
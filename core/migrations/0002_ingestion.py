@@ -0,0 +1,50 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('customer_file', models.FileField(blank=True, upload_to='ingestion/')),
+                ('loan_file', models.FileField(blank=True, upload_to='ingestion/')),
+                ('chunk_size', models.IntegerField(default=5000)),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('completed', 'completed'), ('failed', 'failed')], default='pending', max_length=10)),
+                ('phase', models.CharField(choices=[('customers', 'customers'), ('loans', 'loans')], default='customers', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IngestionChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('customers', 'customers'), ('loans', 'loans')], max_length=10)),
+                ('start_row', models.IntegerField()),
+                ('stop_row', models.IntegerField()),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], default='pending', max_length=10)),
+                ('rows_loaded', models.IntegerField(default=0)),
+                ('rows_rejected', models.IntegerField(default=0)),
+                ('rejected_rows', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='core.ingestionjob')),
+            ],
+            options={
+                'ordering': ['job', 'kind', 'start_row'],
+                'constraints': [models.UniqueConstraint(fields=('job', 'kind', 'start_row'), name='unique_ingestion_chunk')],
+            },
+        ),
+    ]
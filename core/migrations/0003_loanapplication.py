@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_ingestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanApplication',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('loan_amount', models.FloatField()),
+                ('interest_rate', models.FloatField()),
+                ('tenure', models.IntegerField()),
+                ('create_loan', models.BooleanField(default=False)),
+                ('callback_url', models.URLField(blank=True)),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('processing', 'processing'), ('approved', 'approved'), ('rejected', 'rejected'), ('failed', 'failed')], default='pending', max_length=10)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('webhook_delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applications', to='core.customer')),
+                ('loan', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='application', to='core.loan')),
+            ],
+        ),
+    ]
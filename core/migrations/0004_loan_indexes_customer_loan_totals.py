@@ -0,0 +1,53 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:08
+
+from django.db import migrations, models
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from core.models import loan_total_expressions
+
+
+def populate_loan_totals(apps, schema_editor):
+    Customer = apps.get_model('core', 'Customer')
+    Loan = apps.get_model('core', 'Loan')
+    expressions = loan_total_expressions(Loan, timezone.localdate())
+    Customer.objects.update(current_debt=Cast(expressions['active_loan_principal'], FloatField()), **expressions)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_loanapplication'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='active_loan_emi',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='active_loan_principal',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='num_loans',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'end_date'], name='loan_customer_end_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'start_date'], name='loan_customer_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'emis_paid_on_time'], name='loan_customer_on_time_idx'),
+        ),
+        migrations.RunPython(populate_loan_totals, migrations.RunPython.noop),
+    ]
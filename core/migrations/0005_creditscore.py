@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_loan_indexes_customer_loan_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditScore',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='credit_score', serialize=False, to='core.customer')),
+                ('loan_count', models.IntegerField(default=0)),
+                ('on_time_count', models.IntegerField(default=0)),
+                ('current_year_loans', models.IntegerField(default=0)),
+                ('total_loan_volume', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('active_principal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('active_emi_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('score', models.IntegerField(default=0)),
+                ('reason', models.CharField(blank=True, max_length=100)),
+                ('as_of', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
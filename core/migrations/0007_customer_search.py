@@ -0,0 +1,67 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:33
+
+from django.db import migrations, models
+
+from core.models import normalize_name, normalize_phone
+
+BATCH_SIZE = 5000
+
+
+def populate_search_fields(apps, schema_editor):
+    Customer = apps.get_model('core', 'Customer')
+    customers = Customer.objects.only('phone_number', 'first_name', 'last_name').order_by('pk')
+    batch = []
+    for customer in customers.iterator(chunk_size=BATCH_SIZE):
+        customer.phone_normalized = normalize_phone(customer.phone_number)
+        customer.search_name = normalize_name(customer.first_name, customer.last_name)
+        batch.append(customer)
+        if len(batch) == BATCH_SIZE:
+            Customer.objects.bulk_update(batch, ['phone_normalized', 'search_name'])
+            batch = []
+    Customer.objects.bulk_update(batch, ['phone_normalized', 'search_name'])
+
+
+def create_trigram_index(apps, schema_editor):
+    # substring name search on PostgreSQL; elsewhere search falls back to the prefix index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS customer_search_name_trgm_idx '
+        'ON core_customer USING gin (search_name gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS customer_search_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='phone_normalized',
+            field=models.CharField(default='', editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='search_name',
+            field=models.CharField(default='', editable=False, max_length=201),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone_normalized'], name='customer_phone_normalized_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['search_name'], name='customer_search_name_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(populate_search_fields, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
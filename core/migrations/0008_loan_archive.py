@@ -0,0 +1,56 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_customer_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='idempotencykey',
+            name='loan',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.loan'),
+        ),
+        migrations.AlterField(
+            model_name='loanapplication',
+            name='loan',
+            field=models.OneToOneField(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='application', to='core.loan'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedLoan',
+            fields=[
+                ('loan_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('loan_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('interest_rate', models.FloatField()),
+                ('tenure', models.IntegerField()),
+                ('monthly_installment', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('emis_paid_on_time', models.IntegerField(default=0)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_loans', to='core.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer', 'loan_id'], name='archivedloan_customer_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LoanRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_year', models.IntegerField()),
+                ('loan_count', models.IntegerField(default=0)),
+                ('on_time_count', models.IntegerField(default=0)),
+                ('total_loan_volume', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loan_rollups', to='core.customer')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('customer', 'start_year'), name='unique_loan_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_loan_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='creditscore',
+            name='policy_version',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ScoringPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('approve_above', models.IntegerField(default=50)),
+                ('mid_band_floor', models.IntegerField(default=30)),
+                ('low_band_floor', models.IntegerField(default=10)),
+                ('mid_band_min_rate', models.FloatField(default=12)),
+                ('mid_band_rate', models.FloatField(default=16)),
+                ('low_band_min_rate', models.FloatField(default=16)),
+                ('low_band_rate', models.FloatField(default=20)),
+                ('emi_income_cap', models.FloatField(default=0.5)),
+                ('limit_income_multiple', models.FloatField(default=36)),
+                ('limit_rounding', models.IntegerField(default=100000)),
+                ('is_active', models.BooleanField(default=False, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activated_at', models.DateTimeField(blank=True, editable=False, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('is_active',), name='single_active_scoring_policy')],
+            },
+        ),
+    ]
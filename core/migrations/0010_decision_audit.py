@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_scoring_policy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DecisionAudit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('source', models.CharField(max_length=40)),
+                ('customer_id', models.IntegerField()),
+                ('loan_amount', models.FloatField()),
+                ('interest_rate', models.FloatField()),
+                ('tenure', models.IntegerField()),
+                ('loan_count', models.IntegerField()),
+                ('on_time_count', models.IntegerField()),
+                ('current_year_loans', models.IntegerField()),
+                ('total_loan_volume', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('active_principal', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('active_emi_total', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('credit_score', models.IntegerField()),
+                ('approval', models.BooleanField()),
+                ('corrected_interest_rate', models.FloatField(blank=True, null=True)),
+                ('monthly_installment', models.FloatField()),
+                ('reason', models.CharField(blank=True, max_length=100)),
+                ('policy_version', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer_id', 'created_at'], name='decisionaudit_customer_idx'), models.Index(fields=['created_at'], name='decisionaudit_created_idx')],
+            },
+        ),
+    ]
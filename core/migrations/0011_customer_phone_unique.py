@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:09
+
+from django.db import migrations, models
+from django.db.models import Count
+
+MAX_REPORTED = 50
+
+
+def check_duplicate_phones(apps, schema_editor):
+    # merging customers is a business decision, so stop and list them instead
+    Customer = apps.get_model('core', 'Customer')
+    duplicates = list(
+        Customer.objects.exclude(phone_normalized='').values('phone_normalized')
+        .annotate(count=Count('pk')).filter(count__gt=1).order_by('phone_normalized')
+        .values_list('phone_normalized', flat=True)
+    )
+    if not duplicates:
+        return
+    lines = []
+    for phone in duplicates[:MAX_REPORTED]:
+        ids = Customer.objects.filter(phone_normalized=phone).order_by('pk').values_list('pk', flat=True)
+        lines.append(f"  {phone}: customers {', '.join(map(str, ids))}")
+    if len(duplicates) > MAX_REPORTED:
+        lines.append(f"  ... and {len(duplicates) - MAX_REPORTED} more")
+    raise RuntimeError(
+        f"{len(duplicates)} phone numbers belong to more than one customer. Merge or correct them, "
+        "then run the migration again:\n" + '\n'.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_decision_audit'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_phones, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='customer_phone_normalized_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='customer',
+            constraint=models.UniqueConstraint(condition=models.Q(('phone_normalized', ''), _negated=True), fields=('phone_normalized',), name='unique_customer_phone'),
+        ),
+    ]
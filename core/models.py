@@ -1,6 +1,98 @@
 # models.py
+import re
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Count, DecimalField, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+
+def rollup_expressions(rollup_model, today):
+    """
+    Subquery expressions for what a customer's archived loans (summed over
+    their LoanRollup rows) add to the credit profile components.
+    """
+    rollups = rollup_model.objects.filter(customer=OuterRef('pk')).order_by().values('customer')
+    zero = Value(Decimal('0'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+    def total(field, default=0, queryset=rollups):
+        return Coalesce(Subquery(queryset.annotate(total=Sum(field)).values('total')), default)
+
+    return {
+        'loan_count': total('loan_count'),
+        'on_time_count': total('on_time_count'),
+        'current_year_loans': total('loan_count', queryset=rollups.filter(start_year=today.year)),
+        'total_loan_volume': total('total_loan_volume', zero),
+    }
+
+
+def loan_total_expressions(loan_model, today, rollup_model=None):
+    """
+    Subquery expressions for the denormalized Customer loan totals. With
+    rollup_model, num_loans also counts the customer's archived loans.
+    """
+    loans = loan_model.objects.filter(customer=OuterRef('pk')).order_by().values('customer')
+    active = loans.filter(end_date__gte=today)
+    zero = Value(Decimal('0'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    num_loans = Coalesce(Subquery(loans.annotate(n=Count('pk')).values('n')), 0)
+    if rollup_model is not None:
+        num_loans = num_loans + rollup_expressions(rollup_model, today)['loan_count']
+
+    return {
+        'num_loans': num_loans,
+        'active_loan_principal': Coalesce(Subquery(active.annotate(total=Sum('loan_amount')).values('total')), zero),
+        'active_loan_emi': Coalesce(Subquery(active.annotate(total=Sum('monthly_installment')).values('total')), zero),
+    }
+
+
+def normalize_phone(value):
+    """Digits only, without a +91 or 0 trunk prefix: '+91 98765-43210' -> '9876543210'."""
+    digits = re.sub(r'\D', '', str(value or ''))
+    if len(digits) == 12 and digits.startswith('91'):
+        return digits[2:]
+    if len(digits) == 11 and digits.startswith('0'):
+        return digits[1:]
+    return digits
+
+
+def normalize_name(first_name, last_name):
+    """Lowercase 'first last' with single spaces, as stored in Customer.search_name."""
+    return ' '.join(f"{first_name or ''} {last_name or ''}".lower().split())
+
+
+SEARCH_FIELDS = ('phone_normalized', 'search_name')
+
+
+class CustomerQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips save(); fill in the lookup columns here instead
+        objs = list(objs)
+        for customer in objs:
+            customer.set_search_fields()
+        if kwargs.get('update_fields'):
+            kwargs['update_fields'] = list(dict.fromkeys([*kwargs['update_fields'], *SEARCH_FIELDS]))
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def with_computed_loan_totals(self, today=None):
+        """Annotate computed_<field> for each denormalized loan total, for verification."""
+        expressions = loan_total_expressions(Loan, today or timezone.localdate(), LoanRollup)
+        return self.annotate(**{f'computed_{name}': expression for name, expression in expressions.items()})
+
+    def refresh_loan_totals(self, today=None):
+        """
+        Recompute num_loans, active_loan_principal, active_loan_emi and
+        current_debt for every customer in this queryset with one UPDATE.
+        """
+        expressions = loan_total_expressions(Loan, today or timezone.localdate(), LoanRollup)
+        return self.update(
+            current_debt=Cast(expressions['active_loan_principal'], FloatField()),
+            **expressions,
+        )
+
 
 class Customer(models.Model):
     customer_id = models.AutoField(primary_key=True)
@@ -11,10 +103,45 @@ class Customer(models.Model):
     monthly_income = models.FloatField()
     approved_limit = models.FloatField()
     current_debt = models.FloatField(default=0.0)
+    # Denormalized from loans by CustomerQuerySet.refresh_loan_totals; current_debt
+    # tracks active_loan_principal. "Active" depends on today's date, so the
+    # rebuild_loan_totals command re-syncs them as loans run out.
+    num_loans = models.IntegerField(default=0, editable=False)
+    active_loan_principal = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    active_loan_emi = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    # Lookup columns, derived from phone_number and the names on save() and bulk_create()
+    phone_normalized = models.CharField(max_length=15, default='', editable=False)
+    search_name = models.CharField(max_length=201, default='', editable=False)
+
+    objects = CustomerQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # one customer per phone number; also the index behind phone lookups
+            models.UniqueConstraint(
+                fields=['phone_normalized'], condition=~models.Q(phone_normalized=''), name='unique_customer_phone',
+            ),
+        ]
+        indexes = [
+            # varchar_pattern_ops lets PostgreSQL use it for LIKE 'prefix%'; other backends ignore it.
+            # PostgreSQL also gets a pg_trgm GIN index for substring search (migration 0007).
+            models.Index(fields=['search_name'], name='customer_search_name_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    def set_search_fields(self):
+        self.phone_normalized = normalize_phone(self.phone_number)
+        self.search_name = normalize_name(self.first_name, self.last_name)
+
+    def save(self, *args, **kwargs):
+        self.set_search_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'phone_number', 'first_name', 'last_name'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, *SEARCH_FIELDS}
+        super().save(*args, **kwargs)
+
     def clean(self):
         if self.age < 18:
             raise ValidationError({'age': 'Customer ki age kam se kam 18 honi chahiye.'})
@@ -32,6 +159,30 @@ class Loan(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
 
+    class Meta:
+        indexes = [
+            # eligibility filters a customer's loans by end date (active) and start date (current year)
+            models.Index(fields=['customer', 'end_date'], name='loan_customer_end_date_idx'),
+            models.Index(fields=['customer', 'start_date'], name='loan_customer_start_date_idx'),
+            models.Index(fields=['customer', 'emis_paid_on_time'], name='loan_customer_on_time_idx'),
+        ]
+
+    # fields whose previous values core.scores needs to update a CreditScore incrementally
+    SCORED_FIELDS = ('customer_id', 'loan_amount', 'monthly_installment', 'emis_paid_on_time', 'start_date', 'end_date')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._scored_values = instance.scored_values()
+        return instance
+
+    def scored_values(self):
+        """The SCORED_FIELDS as loaded or last saved; None if any is deferred."""
+        loaded = self.__dict__
+        if any(field not in loaded for field in self.SCORED_FIELDS):
+            return None
+        return {field: loaded[field] for field in self.SCORED_FIELDS}
+
     def __str__(self):
         return f"Loan {self.loan_id} for {self.customer}"
 
@@ -42,3 +193,286 @@ class Loan(models.Model):
             raise ValidationError({'tenure': 'Tenure kam se kam 1 month hona chahiye.'})
         if self.interest_rate <= 0:
             raise ValidationError({'interest_rate': 'Interest rate positive hona chahiye.'})
+
+
+class ArchivedLoan(models.Model):
+    """
+    A closed loan moved out of the Loan table by core.archive. It keeps its
+    loan_id, so references to it (applications, idempotent responses, URLs)
+    stay valid; its score contribution lives on in LoanRollup.
+    """
+    loan_id = models.IntegerField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='archived_loans')
+    loan_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    interest_rate = models.FloatField()
+    tenure = models.IntegerField()
+    monthly_installment = models.DecimalField(max_digits=10, decimal_places=2)
+    emis_paid_on_time = models.IntegerField(default=0)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # customer-loans pages a customer's live and archived loans together by loan_id
+            models.Index(fields=['customer', 'loan_id'], name='archivedloan_customer_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived loan {self.loan_id} for customer {self.customer_id}"
+
+
+class LoanRollup(models.Model):
+    """
+    What a customer's archived loans that started in `start_year` add to
+    their credit profile. Archived loans are closed, so they only count
+    towards the loan count, on-time count, current-year loans and volume.
+    """
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loan_rollups')
+    start_year = models.IntegerField()
+    loan_count = models.IntegerField(default=0)
+    # loans whose emis_paid_on_time is 1, as in profile_queryset
+    on_time_count = models.IntegerField(default=0)
+    total_loan_volume = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'start_year'], name='unique_loan_rollup'),
+        ]
+
+    def __str__(self):
+        return f"Loan rollup {self.start_year} for customer {self.customer_id}"
+
+
+class ScoringPolicy(models.Model):
+    """
+    One version of the eligibility rules' thresholds, rates and limits
+    (core.credit.ScoringRules); the version is the primary key. A policy is
+    not edited once saved: changes are a new policy, switched to with
+    core.policy.activate_policy(), so a version always means the same rules.
+    """
+    name = models.CharField(max_length=100, blank=True)
+    approve_above = models.IntegerField(default=50)
+    mid_band_floor = models.IntegerField(default=30)
+    low_band_floor = models.IntegerField(default=10)
+    mid_band_min_rate = models.FloatField(default=12)
+    mid_band_rate = models.FloatField(default=16)
+    low_band_min_rate = models.FloatField(default=16)
+    low_band_rate = models.FloatField(default=20)
+    emi_income_cap = models.FloatField(default=0.5)
+    limit_income_multiple = models.FloatField(default=36)
+    limit_rounding = models.IntegerField(default=100000)
+    is_active = models.BooleanField(default=False, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    activated_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    RULE_FIELDS = (
+        'approve_above', 'mid_band_floor', 'low_band_floor', 'mid_band_min_rate', 'mid_band_rate',
+        'low_band_min_rate', 'low_band_rate', 'emi_income_cap', 'limit_income_multiple', 'limit_rounding',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_active'], condition=models.Q(is_active=True), name='single_active_scoring_policy',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Scoring policy {self.pk}{f' ({self.name})' if self.name else ''}"
+
+    def clean(self):
+        if not self.low_band_floor <= self.mid_band_floor <= self.approve_above:
+            raise ValidationError('Score bands ka order low_band_floor <= mid_band_floor <= approve_above hona chahiye.')
+        if not 0 < self.emi_income_cap <= 1:
+            raise ValidationError({'emi_income_cap': 'EMI income cap 0 aur 1 ke beech hona chahiye.'})
+        if self.limit_income_multiple <= 0 or self.limit_rounding <= 0:
+            raise ValidationError('Approved limit multiple aur rounding positive hone chahiye.')
+
+
+class CreditScore(models.Model):
+    """
+    Materialized credit profile and score of one customer, as of `as_of`.
+
+    Loan signals apply each loan's contribution incrementally (core.scores);
+    the nightly rebuild recomputes everything, since what counts as active
+    or current-year moves with the date. Readers recompute, without
+    storing, a row whose as_of is not today or whose score came from another
+    scoring policy version.
+    """
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='credit_score')
+    loan_count = models.IntegerField(default=0)
+    on_time_count = models.IntegerField(default=0)
+    current_year_loans = models.IntegerField(default=0)
+    total_loan_volume = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_principal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_emi_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    score = models.IntegerField(default=0)
+    reason = models.CharField(max_length=100, blank=True)
+    as_of = models.DateField()
+    # ScoringPolicy version the score was computed with; 0 for the built-in rules
+    policy_version = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COMPONENTS = (
+        'loan_count', 'on_time_count', 'current_year_loans', 'total_loan_volume', 'active_principal', 'active_emi_total',
+    )
+
+    def __str__(self):
+        return f"Credit score {self.score} for customer {self.customer_id} ({self.as_of})"
+
+
+class DecisionAudit(models.Model):
+    """
+    One eligibility decision as it was made: the application, the profile
+    components and score it was judged on, the result and the scoring
+    policy version. Buffered and written in batches by core.audit; never
+    updated.
+    """
+    # when the decision was made, not when the batch was written
+    created_at = models.DateTimeField()
+    source = models.CharField(max_length=40)
+    # not a foreign key: the record outlives the customer, and batches skip the lookups
+    customer_id = models.IntegerField()
+    loan_amount = models.FloatField()
+    interest_rate = models.FloatField()
+    tenure = models.IntegerField()
+    loan_count = models.IntegerField()
+    on_time_count = models.IntegerField()
+    current_year_loans = models.IntegerField()
+    total_loan_volume = models.DecimalField(max_digits=14, decimal_places=2)
+    active_principal = models.DecimalField(max_digits=14, decimal_places=2)
+    active_emi_total = models.DecimalField(max_digits=14, decimal_places=2)
+    credit_score = models.IntegerField()
+    approval = models.BooleanField()
+    corrected_interest_rate = models.FloatField(null=True, blank=True)
+    monthly_installment = models.FloatField()
+    reason = models.CharField(max_length=100, blank=True)
+    policy_version = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer_id', 'created_at'], name='decisionaudit_customer_idx'),
+            models.Index(fields=['created_at'], name='decisionaudit_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Decision for customer {self.customer_id} at {self.created_at:%Y-%m-%d %H:%M:%S}"
+
+
+class IngestionJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(s, s) for s in (PENDING, RUNNING, COMPLETED, FAILED)]
+
+    CUSTOMERS = 'customers'
+    LOANS = 'loans'
+    PHASE_CHOICES = [(p, p) for p in (CUSTOMERS, LOANS)]
+
+    customer_file = models.FileField(upload_to='ingestion/', blank=True)
+    loan_file = models.FileField(upload_to='ingestion/', blank=True)
+    chunk_size = models.IntegerField(default=5000)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # customers are loaded before loans so the loan foreign keys resolve
+    phase = models.CharField(max_length=10, choices=PHASE_CHOICES, default=CUSTOMERS)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Ingestion job {self.pk} ({self.status})"
+
+    def file_for(self, kind):
+        return self.customer_file if kind == self.CUSTOMERS else self.loan_file
+
+
+class IngestionChunk(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(s, s) for s in (PENDING, RUNNING, DONE, FAILED)]
+
+    job = models.ForeignKey(IngestionJob, on_delete=models.CASCADE, related_name='chunks')
+    kind = models.CharField(max_length=10, choices=IngestionJob.PHASE_CHOICES)
+    start_row = models.IntegerField()
+    stop_row = models.IntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    rows_loaded = models.IntegerField(default=0)
+    rows_rejected = models.IntegerField(default=0)
+    rejected_rows = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'kind', 'start_row'], name='unique_ingestion_chunk'),
+        ]
+        ordering = ['job', 'kind', 'start_row']
+
+    def __str__(self):
+        return f"{self.kind} rows {self.start_row}-{self.stop_row} of job {self.job_id}"
+
+    def file_path(self):
+        """The chunk's rows, split out of the upload when the job starts (core.tasks)."""
+        return Path(settings.MEDIA_ROOT) / 'ingestion' / 'chunks' / str(self.job_id) / f'{self.kind}-{self.start_row}.csv'
+
+
+class LoanApplication(models.Model):
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    APPROVED = 'approved'
+    REJECTED = 'rejected'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(s, s) for s in (PENDING, PROCESSING, APPROVED, REJECTED, FAILED)]
+    FINAL_STATUSES = (APPROVED, REJECTED, FAILED)
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='applications')
+    loan_amount = models.FloatField()
+    interest_rate = models.FloatField()
+    tenure = models.IntegerField()
+    create_loan = models.BooleanField(default=False)
+    callback_url = models.URLField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    # no database constraint: an archived loan (core.archive) keeps its loan_id here
+    loan = models.OneToOneField(
+        Loan, on_delete=models.SET_NULL, null=True, blank=True, related_name='application', db_constraint=False,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    webhook_delivered_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Application {self.pk} for {self.customer} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response of a request sent with an Idempotency-Key header. Stored in the
+    same transaction as the request's writes, so a retry either replays the
+    committed response or waits on the first request's unique-key lock.
+    """
+    key = models.CharField(max_length=255)
+    endpoint = models.CharField(max_length=100)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.JSONField()
+    loan = models.ForeignKey(
+        Loan, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', db_constraint=False,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'key'], name='unique_idempotency_key'),
+        ]
+        indexes = [models.Index(fields=['created_at'], name='idempotency_created_idx')]
+
+    def __str__(self):
+        return f"{self.endpoint} {self.key} ({self.response_status})"
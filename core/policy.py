@@ -0,0 +1,99 @@
+"""
+Scoring policy loading and hot reload.
+
+The eligibility thresholds, rates and limits come from the active
+ScoringPolicy row, compiled into a ScoringRules (with its decision table
+built) once per process and shared by every evaluation after that. With no
+active policy the built-in DEFAULT_RULES (version 0) apply.
+
+activate_policy() publishes the new version under POLICY_VERSION_KEY in the
+shared cache. Each process compares it with the version it has loaded at
+most every SCORING_POLICY_CHECK_SECONDS and reloads when they differ, so
+a switch reaches every worker within that time, without a restart.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.credit import DEFAULT_RULES, ScoringRules
+from core.models import ScoringPolicy
+
+POLICY_VERSION_KEY = 'scoring_policy:version'
+
+_lock = threading.Lock()
+_loaded = {'rules': DEFAULT_RULES, 'checked_at': None}
+
+
+def compile_policy(policy):
+    """ScoringRules for a ScoringPolicy, decision table included."""
+    rules = ScoringRules(version=policy.pk, **{name: getattr(policy, name) for name in ScoringPolicy.RULE_FIELDS})
+    rules.bands  # build the decision table now rather than on the first evaluation
+    return rules
+
+
+def load_active_rules():
+    policy = ScoringPolicy.objects.filter(is_active=True).first()
+    return compile_policy(policy) if policy is not None else DEFAULT_RULES
+
+
+def _checked_recently():
+    checked_at = _loaded['checked_at']
+    return checked_at is not None and time.monotonic() - checked_at < settings.SCORING_POLICY_CHECK_SECONDS
+
+
+def current_rules():
+    """The active policy's ScoringRules, reloaded when another process switched policies."""
+    if _checked_recently():
+        return _loaded['rules']
+    with _lock:
+        if not _checked_recently():
+            rules = _loaded['rules']
+            if cache.get(POLICY_VERSION_KEY) != rules.version:
+                rules = load_active_rules()
+                # an empty cache (restart, eviction) learns the version from the database
+                cache.add(POLICY_VERSION_KEY, rules.version, timeout=None)
+            _loaded.update(rules=rules, checked_at=time.monotonic())
+        return _loaded['rules']
+
+
+async def acurrent_rules():
+    """current_rules() for the async views; only goes to the database to reload."""
+    if _checked_recently():
+        return _loaded['rules']
+    return await sync_to_async(current_rules)()
+
+
+def forget_rules():
+    """Make this process look at the published version on its next current_rules() call."""
+    _loaded['checked_at'] = None
+
+
+def publish_version(version):
+    cache.set(POLICY_VERSION_KEY, version, timeout=None)
+    forget_rules()
+
+
+def activate_policy(policy=None):
+    """
+    Make policy the active ScoringPolicy, or go back to the built-in rules
+    with None. Every materialized score then belongs to another version, so
+    once committed this queues rescore_for_policy to rebuild them; until it
+    is done readers recompute them without storing them (core.scores).
+    """
+    from core.tasks import rescore_for_policy
+
+    with transaction.atomic():
+        active = ScoringPolicy.objects.select_for_update().filter(is_active=True)
+        if policy is not None:
+            active = active.exclude(pk=policy.pk)
+        active.update(is_active=False)
+        if policy is not None:
+            ScoringPolicy.objects.filter(pk=policy.pk).update(is_active=True, activated_at=timezone.now())
+        version = policy.pk if policy is not None else DEFAULT_RULES.version
+        transaction.on_commit(lambda: publish_version(version))
+        transaction.on_commit(lambda: rescore_for_policy.delay(version))
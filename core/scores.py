@@ -0,0 +1,225 @@
+"""
+Materialized credit scores (CreditScore), kept current from loan events.
+
+A loan's contribution to its customer's profile depends only on the loan and
+the date, so a create, change or delete adds or subtracts one contribution
+from the stored row and rescores it, without reading the loan history. A row
+whose as_of is not today is rebuilt from the loans instead: loans stop being
+active and the current year changes as the calendar moves. So is a row
+scored under another scoring policy version (core.policy).
+
+Readers never write. They may run on a replica (core.db_routers), so for a
+missing or stale row they compute the entry from the loans and serve it
+without storing it. The loan signals, the nightly rebuild and the rebuild
+queued on policy activation (core.tasks.rescore_for_policy) bring the
+stored rows current.
+"""
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from core.credit import CreditProfile, profile_queryset, score_profile
+from core.db_routers import pin_to_primary
+from core.models import CreditScore, Customer, Loan
+from core.policy import current_rules
+
+REBUILD_BATCH_SIZE = 2000
+
+
+def _profile(row, customer):
+    return CreditProfile(customer=customer, **{name: getattr(row, name) for name in CreditScore.COMPONENTS})
+
+
+def _entry(row):
+    return {'profile': _profile(row, row.customer), 'credit_score': row.score, 'reason': row.reason}
+
+
+def _score_row(customer, today, rules, **components):
+    row = CreditScore(customer=customer, as_of=today, policy_version=rules.version, **components)
+    row.score, row.reason = score_profile(_profile(row, customer), rules)
+    return row
+
+
+def _is_stale(row, today, rules):
+    return row is None or row.as_of != today or row.policy_version != rules.version
+
+
+def contribution(values, today):
+    """What one loan (a Loan.scored_values() dict) adds to its customer's CreditScore."""
+    values = {name: Loan._meta.get_field(name).to_python(value) for name, value in values.items()}
+    amount = Decimal(values['loan_amount'])
+    active = values['end_date'] >= today
+    return {
+        'loan_count': 1,
+        # emis_paid_on_time=True matches a counter of exactly 1, as in profile_queryset
+        'on_time_count': int(values['emis_paid_on_time'] == 1),
+        'current_year_loans': int(values['start_date'].year == today.year),
+        'total_loan_volume': amount,
+        'active_principal': amount if active else Decimal('0'),
+        'active_emi_total': Decimal(values['monthly_installment']) if active else Decimal('0'),
+    }
+
+
+def rebuild_credit_scores(customer_ids=None, today=None, rules=None):
+    """
+    Recompute CreditScore rows from the loans for customer_ids (all customers
+    when None) and upsert them in batches; returns the number of rows.
+    """
+    today = today or timezone.localdate()
+    rules = rules or current_rules()
+    # the rows are written back, so compute them from the primary, not a lagging replica
+    pin_to_primary()
+    customers = profile_queryset(today).order_by('customer_id')
+    if customer_ids is not None:
+        customers = customers.filter(customer_id__in=set(customer_ids))
+
+    written = 0
+    rows = []
+    for customer in customers.iterator(chunk_size=REBUILD_BATCH_SIZE):
+        rows.append(_fresh_row(customer, today, rules))
+        if len(rows) == REBUILD_BATCH_SIZE:
+            written += _upsert(rows)
+            rows = []
+    return written + _upsert(rows)
+
+
+def _fresh_row(customer, today, rules):
+    """CreditScore for a customer from profile_queryset."""
+    return _score_row(customer, today, rules, **{name: getattr(customer, name) for name in CreditScore.COMPONENTS})
+
+
+def _upsert(rows):
+    CreditScore.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['customer'],
+        update_fields=[*CreditScore.COMPONENTS, 'score', 'reason', 'as_of', 'policy_version', 'updated_at'],
+    )
+    return len(rows)
+
+
+def create_empty_score(customer, today=None):
+    """Row for a customer without loans, e.g. right after registration."""
+    _score_row(customer, today or timezone.localdate(), current_rules()).save(force_insert=True)
+
+
+def rescore_customer(customer):
+    """Customer fields used by the score changed (e.g. approved_limit); loans did not."""
+    today = timezone.localdate()
+    rules = current_rules()
+    with transaction.atomic():
+        row = CreditScore.objects.select_for_update().filter(customer=customer).first()
+        if _is_stale(row, today, rules):
+            rebuild_credit_scores([customer.customer_id], today, rules)
+            return
+        row.score, row.reason = score_profile(_profile(row, customer), rules)
+        row.save(update_fields=['score', 'reason', 'updated_at'])
+
+
+def apply_loan_change(before, after):
+    """
+    Move CreditScore rows from a loan's `before` values to its `after` values
+    (Loan.scored_values() dicts; None for a created or deleted loan).
+    """
+    today = timezone.localdate()
+    rules = current_rules()
+    deltas = {}
+    for values, sign in ((before, -1), (after, 1)):
+        if values is None:
+            continue
+        delta = deltas.setdefault(values['customer_id'], {})
+        for name, amount in contribution(values, today).items():
+            delta[name] = delta.get(name, 0) + sign * amount
+
+    with transaction.atomic():
+        for customer_id, delta in deltas.items():
+            row = (
+                CreditScore.objects.select_for_update(of=('self',)).select_related('customer')
+                .filter(customer_id=customer_id).first()
+            )
+            if row is None and (after is None or after['customer_id'] != customer_id):
+                # only losing a loan, e.g. while the customer is being deleted; readers compute it on demand
+                continue
+            if _is_stale(row, today, rules):
+                rebuild_credit_scores([customer_id], today, rules)
+                continue
+            if not any(delta.values()):
+                continue
+            for name, amount in delta.items():
+                setattr(row, name, getattr(row, name) + amount)
+            if any(getattr(row, name) < 0 for name in CreditScore.COMPONENTS):
+                # the row missed a write that bypassed signals (e.g. bulk_create); start over
+                rebuild_credit_scores([customer_id], today, rules)
+                continue
+            row.score, row.reason = score_profile(_profile(row, row.customer), rules)
+            row.save(update_fields=[*CreditScore.COMPONENTS, 'score', 'reason', 'updated_at'])
+
+
+def _computed_rows(customer_ids, today, rules):
+    """Unsaved CreditScore rows computed from the loans, {customer_id: row}."""
+    customers = profile_queryset(today).filter(customer_id__in=set(customer_ids))
+    return {customer.customer_id: _fresh_row(customer, today, rules) for customer in customers}
+
+
+def get_materialized_entry(customer_id, rules=None):
+    """
+    {'profile', 'credit_score', 'reason'} from the customer's CreditScore: a
+    primary key lookup, computed from the loans (not stored) when the row is
+    missing or stale. The score is the one under `rules` (default:
+    current_rules()). Raises Customer.DoesNotExist.
+    """
+    today = timezone.localdate()
+    rules = rules or current_rules()
+    row = CreditScore.objects.select_related('customer').filter(customer_id=customer_id).first()
+    if _is_stale(row, today, rules):
+        row = _computed_rows([customer_id], today, rules).get(customer_id)
+        if row is None:
+            raise Customer.DoesNotExist(f"Customer {customer_id} does not exist.")
+    return _entry(row)
+
+
+async def aget_materialized_entry(customer_id, rules):
+    """Async get_materialized_entry for the ASGI views; rules from acurrent_rules()."""
+    row = await CreditScore.objects.select_related('customer').filter(customer_id=customer_id).afirst()
+    if not _is_stale(row, timezone.localdate(), rules):
+        return _entry(row)
+    return await sync_to_async(get_materialized_entry)(customer_id, rules)
+
+
+def get_materialized_entries(customer_ids, rules=None):
+    """Batch get_materialized_entry: {customer_id: entry} for existing customers."""
+    today = timezone.localdate()
+    rules = rules or current_rules()
+    customer_ids = set(customer_ids)
+    rows = {
+        row.customer_id: row
+        for row in CreditScore.objects.select_related('customer').filter(customer_id__in=customer_ids)
+    }
+    stale = [customer_id for customer_id in customer_ids if _is_stale(rows.get(customer_id), today, rules)]
+    if stale:
+        rows.update(_computed_rows(stale, today, rules))
+    return {customer_id: _entry(row) for customer_id, row in rows.items()}
+
+
+def find_inconsistent_scores(today=None):
+    """
+    Compare every CreditScore with a full recomputation from the loans.
+    Yields (customer_id, {field: (stored, expected)}); a missing row shows up
+    with stored None.
+    """
+    today = today or timezone.localdate()
+    rules = current_rules()
+    customers = profile_queryset(today).select_related('credit_score').order_by('customer_id')
+    for customer in customers.iterator(chunk_size=REBUILD_BATCH_SIZE):
+        # before _fresh_row, which replaces the cached customer.credit_score
+        row = getattr(customer, 'credit_score', None)
+        fresh = _fresh_row(customer, today, rules)
+        diff = {}
+        for name in (*CreditScore.COMPONENTS, 'score', 'reason', 'as_of', 'policy_version'):
+            stored = getattr(row, name) if row is not None else None
+            if stored != getattr(fresh, name):
+                diff[name] = (stored, getattr(fresh, name))
+        if diff:
+            yield customer.customer_id, diff
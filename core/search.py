@@ -0,0 +1,40 @@
+"""
+Customer lookup by phone number or name.
+
+Phone lookups are an exact match on phone_normalized, which is unique
+(unique_customer_phone) and so indexed.
+Name lookups match search_name: a substring match on PostgreSQL, served by
+the pg_trgm index from migration 0007 once the query has three characters,
+and a prefix match ("ravi sh") as a range on the B-tree index elsewhere.
+"""
+from django.db import connections
+
+from core.models import Customer, normalize_name, normalize_phone
+
+TRIGRAM_MIN_LENGTH = 3
+
+
+def search_customers(phone=None, name=None):
+    """Matching customers in customer_id order, for keyset pagination."""
+    customers = Customer.objects.order_by('customer_id')
+    if phone:
+        # no digits matches nobody, rather than every customer without a phone
+        customers = customers.filter(phone_normalized=normalize_phone(phone) or None)
+    if name:
+        name = normalize_name(name, '')
+        vendor = connections[customers.db].vendor
+        if vendor == 'postgresql':
+            lookup = 'contains' if len(name) >= TRIGRAM_MIN_LENGTH else 'startswith'
+            customers = customers.filter(**{f'search_name__{lookup}': name})
+        else:
+            # SQLite only uses an index for LIKE on NOCASE columns; a range works on any B-tree
+            customers = customers.filter(search_name__gte=name, search_name__lt=name + '\U0010ffff')
+    return customers
+
+
+def find_by_phone(phone):
+    """customer_id of a customer already registered with this phone number, or None."""
+    normalized = normalize_phone(phone)
+    if not normalized:
+        return None
+    return Customer.objects.filter(phone_normalized=normalized).values_list('customer_id', flat=True).first()
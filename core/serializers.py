@@ -1,5 +1,8 @@
+from django.db.models import Count, Sum
+from django.utils import timezone
 from rest_framework import serializers
-from core.models import Customer, Loan
+from core.models import Customer, DecisionAudit, IngestionChunk, IngestionJob, Loan
+from core.webhooks import UnsafeCallback, check_callback_url
 
 class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -21,6 +24,13 @@ class LoanSerializer(serializers.ModelSerializer):
         model = Loan
         fields = '__all__'
 
+    def __init__(self, *args, fields=None, **kwargs):
+        # optional subset of fields, e.g. from a ?fields= query parameter
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
 class EligibilityInputSerializer(serializers.Serializer):
     customer_id = serializers.IntegerField(
         error_messages={
@@ -53,11 +63,106 @@ class EligibilityInputSerializer(serializers.Serializer):
         }
     )
 
+class LoanApplicationInputSerializer(EligibilityInputSerializer):
+    create_loan = serializers.BooleanField(default=False)
+    callback_url = serializers.URLField(
+        required=False, allow_blank=True,
+        error_messages={'invalid': 'Callback URL valid URL hona chahiye.'}
+    )
+
+    def validate_callback_url(self, value):
+        if not value:
+            return value
+        try:
+            check_callback_url(value)
+        except UnsafeCallback as e:
+            raise serializers.ValidationError(f"Callback URL allowed nahi hai: {e}.")
+        except OSError:
+            raise serializers.ValidationError("Callback URL ka host resolve nahi hua.")
+        return value
+
+
+class CustomerLoansQuerySerializer(serializers.Serializer):
+    cursor = serializers.IntegerField(
+        required=False, min_value=0,
+        error_messages={'invalid': 'Cursor valid loan ID hona chahiye.'}
+    )
+    limit = serializers.IntegerField(
+        required=False, min_value=1, max_value=1000,
+        error_messages={'max_value': 'Limit 1000 se zyada nahi ho sakta.'}
+    )
+    active = serializers.BooleanField(required=False)
+    fields = serializers.CharField(required=False)
+    stream = serializers.BooleanField(required=False)
+
+    def validate_fields(self, value):
+        requested = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(requested) - set(LoanSerializer().fields)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return requested
+
+
+class CustomerSearchQuerySerializer(serializers.Serializer):
+    phone = serializers.CharField(required=False, max_length=20)
+    name = serializers.CharField(
+        required=False, min_length=2, max_length=201,
+        error_messages={'min_length': 'Name ke kam se kam 2 characters dene honge.'}
+    )
+    cursor = serializers.IntegerField(
+        required=False, min_value=0,
+        error_messages={'invalid': 'Cursor valid customer ID hona chahiye.'}
+    )
+    limit = serializers.IntegerField(
+        required=False, min_value=1, max_value=100,
+        error_messages={'max_value': 'Limit 100 se zyada nahi ho sakta.'}
+    )
+
+    def validate(self, attrs):
+        if not attrs.get('phone') and not attrs.get('name'):
+            raise serializers.ValidationError("Phone ya name me se kam se kam ek dena zaroori hai.")
+        return attrs
+
+
+class DecisionAuditQuerySerializer(serializers.Serializer):
+    customer_id = serializers.IntegerField(
+        required=False, min_value=1,
+        error_messages={'invalid': 'Customer ID number hona chahiye.'}
+    )
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    cursor = serializers.IntegerField(
+        required=False, min_value=1,
+        error_messages={'invalid': 'Cursor valid decision ID hona chahiye.'}
+    )
+    limit = serializers.IntegerField(
+        required=False, min_value=1, max_value=1000,
+        error_messages={'max_value': 'Limit 1000 se zyada nahi ho sakta.'}
+    )
+
+    def validate(self, attrs):
+        if 'since' in attrs and 'until' in attrs and attrs['since'] >= attrs['until']:
+            raise serializers.ValidationError("'since' ka time 'until' se pehle hona chahiye.")
+        return attrs
+
+
+class DecisionAuditSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DecisionAudit
+        fields = '__all__'
+
+
 class CustomerInfoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = ['customer_id', 'first_name', 'last_name', 'phone_number', 'age']
 
+
+class CustomerSearchResultSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Customer
+        fields = ['customer_id', 'first_name', 'last_name', 'phone_number', 'age', 'approved_limit', 'current_debt']
+
 class LoanDetailSerializer(serializers.ModelSerializer):
     customer = CustomerInfoSerializer(read_only=True)  # nested serializer
 
@@ -80,3 +185,77 @@ class CustomerSerializer(serializers.ModelSerializer):
         if value <= 0:
             raise serializers.ValidationError("Monthly income positive value honi chahiye.")
         return value
+
+
+class IngestionJobCreateSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.IntegerField(
+        min_value=1, max_value=100000, required=False,
+        error_messages={'min_value': 'Chunk size kam se kam 1 hona chahiye.'}
+    )
+
+    class Meta:
+        model = IngestionJob
+        fields = ['customer_file', 'loan_file', 'chunk_size']
+
+    def validate(self, attrs):
+        if not attrs.get('customer_file') and not attrs.get('loan_file'):
+            raise serializers.ValidationError("Customer file ya loan file me se kam se kam ek dena zaroori hai.")
+        return attrs
+
+
+class IngestionJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.IntegerField(source='pk', read_only=True)
+    progress = serializers.SerializerMethodField()
+    completion = serializers.SerializerMethodField()
+    rows_per_second = serializers.SerializerMethodField()
+    failed_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = IngestionJob
+        fields = [
+            'job_id', 'status', 'phase', 'chunk_size', 'created_at', 'started_at', 'finished_at',
+            'progress', 'completion', 'rows_per_second', 'failed_chunks',
+        ]
+
+    def _totals(self, job):
+        # one grouped query per serialization, shared by the method fields
+        if getattr(job, '_chunk_totals', None) is None:
+            job._chunk_totals = list(
+                job.chunks.values('kind', 'status')
+                .annotate(chunks=Count('pk'), loaded=Sum('rows_loaded'), rejected=Sum('rows_rejected'))
+            )
+        return job._chunk_totals
+
+    def get_progress(self, job):
+        progress = {
+            kind: {'chunks_total': 0, 'chunks_done': 0, 'chunks_failed': 0, 'rows_loaded': 0, 'rows_rejected': 0}
+            for kind in (IngestionJob.CUSTOMERS, IngestionJob.LOANS)
+        }
+        for row in self._totals(job):
+            entry = progress[row['kind']]
+            entry['chunks_total'] += row['chunks']
+            entry['rows_loaded'] += row['loaded'] or 0
+            entry['rows_rejected'] += row['rejected'] or 0
+            if row['status'] == IngestionChunk.DONE:
+                entry['chunks_done'] += row['chunks']
+            elif row['status'] == IngestionChunk.FAILED:
+                entry['chunks_failed'] += row['chunks']
+        return progress
+
+    def get_completion(self, job):
+        total = sum(row['chunks'] for row in self._totals(job))
+        done = sum(row['chunks'] for row in self._totals(job) if row['status'] == IngestionChunk.DONE)
+        return round(100 * done / total, 1) if total else 0.0
+
+    def get_rows_per_second(self, job):
+        if not job.started_at:
+            return 0.0
+        elapsed = ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+        rows = sum((row['loaded'] or 0) + (row['rejected'] or 0) for row in self._totals(job))
+        return round(rows / elapsed, 1) if elapsed > 0 else 0.0
+
+    def get_failed_chunks(self, job):
+        return list(
+            job.chunks.filter(status=IngestionChunk.FAILED)
+            .values('id', 'kind', 'start_row', 'stop_row', 'attempts', 'error')
+        )
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import invalidate_profiles
+from core.models import Customer, Loan
+from core.scores import apply_loan_change, create_empty_score, rebuild_credit_scores, rescore_customer
+
+
+@receiver(post_save, sender=Customer)
+def customer_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        if created:
+            create_empty_score(instance)
+        else:
+            rescore_customer(instance)
+    invalidate_profiles([instance.customer_id])
+
+
+@receiver(post_delete, sender=Customer)
+def customer_deleted(sender, instance, **kwargs):
+    invalidate_profiles([instance.customer_id])
+
+
+@receiver(post_save, sender=Loan)
+def loan_saved(sender, instance, created, raw=False, **kwargs):
+    # runs inside the caller's transaction, so the totals commit with the loan
+    before = None if created else getattr(instance, '_scored_values', None)
+    after = instance.scored_values()
+    customer_ids = {instance.customer_id}
+    if before is not None:
+        customer_ids.add(before['customer_id'])
+
+    Customer.objects.filter(pk__in=customer_ids).refresh_loan_totals()
+    if not raw:
+        if created or before is not None:
+            if before != after:
+                apply_loan_change(before, after)
+        else:
+            # saved without its previous values (e.g. built by hand with a pk): recompute
+            rebuild_credit_scores(customer_ids)
+    instance._scored_values = after
+    invalidate_profiles(customer_ids)
+
+
+@receiver(post_delete, sender=Loan)
+def loan_deleted(sender, instance, **kwargs):
+    Customer.objects.filter(pk=instance.customer_id).refresh_loan_totals()
+    values = getattr(instance, '_scored_values', None) or instance.scored_values()
+    if values is not None:
+        apply_loan_change(values, None)
+    invalidate_profiles([instance.customer_id])
@@ -1,15 +1,302 @@
+import logging
+import urllib.error
+from datetime import timedelta
+from decimal import Decimal
+
 from celery import shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.archive import archive_closed_loans
+from core.audit import decision_record, record_decision, write_records
+from core.credit import evaluate_eligibility
+from core.booking import ExposureLimitExceeded, book_loan
+from core.ingestion import chunked, iter_rows, load_customers, load_loans, reset_sequences, write_rows
+from core.models import Customer, IdempotencyKey, IngestionChunk, IngestionJob, Loan, LoanApplication
+from core.policy import current_rules, load_active_rules
+from core.scores import get_materialized_entry, rebuild_credit_scores
+from core.webhooks import UnsafeCallback, post_json
+
+logger = logging.getLogger(__name__)
 
 @shared_task
 def test_task():
     print("✅ Celery Task Executed!")
     return "Task Done"
 
-from celery import shared_task
-
 @shared_task
 def process_credit_application(application_id):
-    # Yahan aap apna credit approval logic likh sakte hain
-    print(f"Processing credit application ID: {application_id}")
-    # For example, yahan database update ya email bhejna ho sakta hai
-    return f"Application {application_id} processed"
+    """
+    Run the eligibility rules for a queued LoanApplication and, if asked and
+    approved, book the loan. State moves pending -> processing -> approved,
+    rejected or failed; only a pending application is picked up.
+    """
+    claimed = LoanApplication.objects.filter(pk=application_id, status=LoanApplication.PENDING).update(
+        status=LoanApplication.PROCESSING
+    )
+    application = LoanApplication.objects.get(pk=application_id)
+    if not claimed:
+        return application.status
+
+    try:
+        rules = current_rules()
+        entry = get_materialized_entry(application.customer_id, rules)
+        score = (entry['credit_score'], entry['reason'])
+        result = evaluate_eligibility(
+            entry['profile'], application.loan_amount, application.interest_rate, application.tenure, rules,
+            score=score
+        )
+        record_decision(decision_record(
+            'loan-application', entry['profile'], score,
+            application.loan_amount, application.interest_rate, application.tenure, result,
+        ))
+        with transaction.atomic():
+            if result['approval'] and application.create_loan:
+                try:
+                    application.loan = book_loan(
+                        application.customer_id,
+                        Decimal(str(application.loan_amount)).quantize(Decimal('0.01')),
+                        result['corrected_interest_rate'],
+                        application.tenure,
+                    )
+                    result = {**result, 'loan_id': application.loan.loan_id}
+                except ExposureLimitExceeded as e:
+                    result = {**result, 'approval': False, 'reason': str(e)}
+            application.result = result
+            application.status = LoanApplication.APPROVED if result['approval'] else LoanApplication.REJECTED
+            application.processed_at = timezone.now()
+            application.save(update_fields=['loan', 'result', 'status', 'processed_at'])
+    except Exception as e:
+        application.status = LoanApplication.FAILED
+        application.error = f"{type(e).__name__}: {e}"
+        application.processed_at = timezone.now()
+        application.save(update_fields=['status', 'error', 'processed_at'])
+
+    if application.callback_url:
+        deliver_application_webhook.delay(application.pk)
+    return application.status
+
+
+# webhook retries wait about 10s, 20s, 40s, ... (full jitter), at most 10 minutes
+WEBHOOK_RETRY_BACKOFF = 10
+WEBHOOK_RETRY_BACKOFF_MAX = 600
+
+
+@shared_task(bind=True, max_retries=5)
+def deliver_application_webhook(self, application_id):
+    """POST the application's status to its callback_url (core.webhooks); 5xx and network errors are retried."""
+    application = LoanApplication.objects.get(pk=application_id)
+    try:
+        post_json(application.callback_url, application_payload(application))
+    except UnsafeCallback as e:
+        logger.warning('Not calling webhook of application %s: %s', application_id, e)
+        return
+    except urllib.error.HTTPError as e:
+        if e.code < 500:
+            # refused (or redirected); sending the same body again will not help
+            logger.warning('Webhook of application %s answered HTTP %s', application_id, e.code)
+            return
+        raise self.retry(exc=e, countdown=webhook_retry_countdown(self.request.retries))
+    except OSError as e:
+        # URLError, timeouts, refused connections, DNS failures
+        raise self.retry(exc=e, countdown=webhook_retry_countdown(self.request.retries))
+
+    LoanApplication.objects.filter(pk=application_id).update(webhook_delivered_at=timezone.now())
+
+
+def webhook_retry_countdown(retries):
+    return get_exponential_backoff_interval(
+        WEBHOOK_RETRY_BACKOFF, retries, WEBHOOK_RETRY_BACKOFF_MAX, full_jitter=True,
+    )
+
+
+def application_payload(application):
+    """Body of the status endpoint and of the webhook."""
+    return {
+        'application_id': application.pk,
+        'customer_id': application.customer_id,
+        'status': application.status,
+        'result': application.result,
+        'loan_id': application.loan_id,
+        'error': application.error,
+        'created_at': application.created_at.isoformat(),
+        'processed_at': application.processed_at.isoformat() if application.processed_at else None,
+    }
+
+
+LOADERS = {
+    IngestionJob.CUSTOMERS: load_customers,
+    IngestionJob.LOANS: load_loans,
+}
+
+# keep at most this many rejected rows per chunk for the status endpoint
+MAX_REJECTED_ROWS = 100
+
+
+@shared_task
+def start_ingestion_job(job_id):
+    """Split the job's files into chunks (once) and dispatch the current phase."""
+    job = IngestionJob.objects.get(pk=job_id)
+    if not job.chunks.exists():
+        chunks = []
+        for kind in (IngestionJob.CUSTOMERS, IngestionJob.LOANS):
+            file = job.file_for(kind)
+            if not file:
+                continue
+            # read the upload once, writing each chunk's rows to its own file,
+            # instead of every chunk re-reading the sheet up to its start row
+            for rows in chunked(iter_rows(file.path), job.chunk_size):
+                start = rows[0][0] - 1
+                chunk = IngestionChunk(job=job, kind=kind, start_row=start, stop_row=start + len(rows))
+                write_rows(chunk.file_path(), rows)
+                chunks.append(chunk)
+        IngestionChunk.objects.bulk_create(chunks, ignore_conflicts=True)
+
+    IngestionJob.objects.filter(pk=job_id, started_at__isnull=True).update(started_at=timezone.now())
+    IngestionJob.objects.filter(pk=job_id).update(status=IngestionJob.RUNNING)
+    if not dispatch_chunks(job_id, job.phase):
+        advance_ingestion_job(job_id)
+
+
+def dispatch_chunks(job_id, kind):
+    """Queue every pending chunk of one kind; returns how many were queued."""
+    chunk_ids = list(IngestionChunk.objects.filter(
+        job_id=job_id, kind=kind, status=IngestionChunk.PENDING
+    ).values_list('pk', flat=True))
+    for chunk_id in chunk_ids:
+        ingest_chunk.delay(chunk_id)
+    return len(chunk_ids)
+
+
+def advance_ingestion_job(job_id):
+    """
+    Move the job forward once every chunk of its current phase has finished.
+
+    Called after each chunk, so the phase switch is a conditional UPDATE:
+    only one of several concurrently finishing chunks wins it and dispatches
+    the next phase.
+    """
+    job = IngestionJob.objects.get(pk=job_id)
+    chunks = job.chunks.filter(kind=job.phase)
+    if chunks.filter(status__in=[IngestionChunk.PENDING, IngestionChunk.RUNNING]).exists():
+        return
+
+    if chunks.filter(status=IngestionChunk.FAILED).exists():
+        IngestionJob.objects.filter(pk=job_id, status=IngestionJob.RUNNING).update(
+            status=IngestionJob.FAILED, finished_at=timezone.now()
+        )
+        return
+
+    if job.phase == IngestionJob.CUSTOMERS:
+        if IngestionJob.objects.filter(pk=job_id, phase=IngestionJob.CUSTOMERS).update(phase=IngestionJob.LOANS):
+            if not dispatch_chunks(job_id, IngestionJob.LOANS):
+                advance_ingestion_job(job_id)
+        return
+
+    if IngestionJob.objects.filter(pk=job_id, status=IngestionJob.RUNNING).update(
+            status=IngestionJob.COMPLETED, finished_at=timezone.now()):
+        reset_sequences(Customer, Loan)
+
+
+@shared_task
+def ingest_chunk(chunk_id):
+    """Load one chunk; chunks already done are skipped, so re-dispatching is safe."""
+    claimed = IngestionChunk.objects.filter(pk=chunk_id, status=IngestionChunk.PENDING).update(
+        status=IngestionChunk.RUNNING, attempts=F('attempts') + 1, started_at=timezone.now(), error=''
+    )
+    chunk = IngestionChunk.objects.select_related('job').get(pk=chunk_id)
+    if not claimed:
+        return chunk.status
+
+    path = chunk.file_path()
+    try:
+        if path.exists():
+            rows = [(chunk.start_row + number, row) for number, row in iter_rows(path)]
+        else:
+            # job split before chunks had their own files
+            rows = list(iter_rows(chunk.job.file_for(chunk.kind).path, chunk.start_row, chunk.stop_row))
+        loaded, rejected = LOADERS[chunk.kind](rows)
+    except Exception as e:
+        result = {'status': IngestionChunk.FAILED, 'error': f"{type(e).__name__}: {e}"}
+    else:
+        result = {
+            'status': IngestionChunk.DONE,
+            'rows_loaded': loaded,
+            'rows_rejected': len(rejected),
+            'rejected_rows': [[number, reason] for number, reason in rejected[:MAX_REJECTED_ROWS]],
+        }
+    # a resume may have handed a stale chunk to another worker; that attempt owns it now
+    saved = IngestionChunk.objects.filter(
+        pk=chunk_id, status=IngestionChunk.RUNNING, attempts=chunk.attempts
+    ).update(finished_at=timezone.now(), **result)
+    if saved and result['status'] == IngestionChunk.DONE:
+        path.unlink(missing_ok=True)
+
+    advance_ingestion_job(chunk.job_id)
+    return result['status']
+
+
+def stale_chunks(job):
+    """Running chunks whose worker has had INGESTION_CHUNK_STALE_SECONDS and is presumed dead."""
+    cutoff = timezone.now() - timedelta(seconds=settings.INGESTION_CHUNK_STALE_SECONDS)
+    return job.chunks.filter(status=IngestionChunk.RUNNING, started_at__lt=cutoff)
+
+
+@shared_task
+def resume_ingestion_job(job_id):
+    """Re-queue failed or stale chunks; finished chunks are never re-imported."""
+    job = IngestionJob.objects.get(pk=job_id)
+    job.chunks.filter(status=IngestionChunk.FAILED).update(status=IngestionChunk.PENDING)
+    stale_chunks(job).update(status=IngestionChunk.PENDING)
+    IngestionJob.objects.filter(pk=job_id).update(status=IngestionJob.RUNNING, finished_at=None)
+    job.refresh_from_db()
+    if not dispatch_chunks(job_id, job.phase):
+        advance_ingestion_job(job_id)
+
+
+@shared_task
+def nightly_rebuild():
+    """
+    Scheduled daily after midnight (CELERY_BEAT_SCHEDULE): loans past their
+    end_date stop being active and a new year resets current-year loans, so
+    rebuild the denormalized loan totals and every CreditScore. Also drops
+    idempotency keys older than IDEMPOTENCY_KEY_TTL_HOURS.
+    """
+    customers = Customer.objects.all().refresh_loan_totals()
+    scores = rebuild_credit_scores()
+    expired, _ = IdempotencyKey.objects.filter(
+        created_at__lt=timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    ).delete()
+    return {'customers': customers, 'credit_scores': scores, 'idempotency_keys_expired': expired}
+
+
+@shared_task
+def rescore_for_policy(version):
+    """
+    Queued by activate_policy(): rebuild every CreditScore under the newly
+    active policy. The rules come from the database rather than this
+    worker's current_rules(), which may not have reloaded yet; a version
+    that is no longer active is skipped, its successor queued its own run.
+    """
+    rules = load_active_rules()
+    if rules.version != version:
+        return {'credit_scores': 0, 'skipped': True}
+    return {'credit_scores': rebuild_credit_scores(rules=rules)}
+
+
+@shared_task
+def archive_loans():
+    """
+    Scheduled nightly (CELERY_BEAT_SCHEDULE): move loans past their end_date
+    into ArchivedLoan (core.archive).
+    """
+    return {'archived': archive_closed_loans()}
+
+
+@shared_task(autoretry_for=(DatabaseError,), max_retries=5, retry_backoff=True, retry_jitter=True)
+def write_decision_audits(records):
+    """Write a batch of buffered eligibility decisions (core.audit)."""
+    return write_records(records)
@@ -1,13 +1,87 @@
-from django.test import TestCase, Client
+from django.test import (
+    AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+    skipUnlessDBFeature,
+)
+from django.test.utils import CaptureQueriesContext
+from django.conf import settings
+from django.db import DatabaseError, connection, connections
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from core.throttling import ELIGIBILITY_LIMITER, TAKE_TOKEN_SCRIPT, take_token
+from core.db_routers import PIN_COOKIE, ReplicaPinningMiddleware, ReplicaRouter, replica_reads
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from unittest import addModuleCleanup, mock, skipUnless
 from django.urls import reverse
-from core.models import Customer
+from core.models import (
+    ArchivedLoan, CreditScore, Customer, DecisionAudit, IdempotencyKey, IngestionChunk, IngestionJob, Loan,
+    LoanApplication, LoanRollup, ScoringPolicy, normalize_name, normalize_phone,
+)
+from core.policy import POLICY_VERSION_KEY, activate_policy, current_rules, forget_rules
+from core.archive import archive_closed_loans
+from core.search import find_by_phone
+from core.audit import DECISION_AUDITS, decision_record, flush_on_shutdown, record_decision
+from core.tasks import (
+    LOADERS, WEBHOOK_RETRY_BACKOFF, archive_loans, deliver_application_webhook, ingest_chunk, nightly_rebuild,
+    process_credit_application, rescore_for_policy, webhook_retry_countdown, write_decision_audits,
+)
+from core.webhooks import UnsafeCallback, check_callback_url, post_json
+from celery.exceptions import Retry
+from core.scores import (
+    find_inconsistent_scores, get_materialized_entries, get_materialized_entry, rebuild_credit_scores,
+)
+from core.serializers import LoanDetailSerializer, LoanSerializer
+from core.fast_serializers import fast_serializer
+from core.benchmarking import ENDPOINTS, percentile
+from rest_framework.renderers import JSONRenderer
+from core.views import CustomerLoansView
+from core.ingestion import load_customers, load_loans
+from core.export import header as export_header, iter_chunks, parquet_chunks
+from core.management.commands.rescore_portfolio import Command as RescorePortfolioCommand
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from credit_approval_system.celery import app as celery_app
+from celery.signals import task_postrun, task_prerun, worker_process_init
+from core import instrumentation
+from core.loan_math import add_months, amortization_schedule, end_date, schedule_cache_info
+from core.credit import (
+    ScoringRules,
+    calculate_emi,
+    evaluate_eligibility,
+    get_credit_profile,
+    get_credit_profiles,
+)
+from core.vectorized import calculate_emi as vectorized_emi, evaluate_portfolio, load_portfolio, reasons
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from datetime import date, timedelta
+from decimal import Decimal
+import csv
+import io
 import json
+import os
+import socket
+import tempfile
+import time
+import urllib.error
+from pathlib import Path
+from urllib.request import urlopen
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
 
 class CheckEligibilityViewTest(TestCase):
     @classmethod
     def setUpTestData(cls):
         cls.client = Client()
-        cls.url = reverse('check_eligibility')
+        cls.url = reverse('check-eligibility')
         cls.customer = Customer.objects.create(
             first_name="Test",
             last_name="User",
@@ -50,8 +124,8 @@ class CheckEligibilityViewTest(TestCase):
             content_type='application/json'
         )
         self.assertEqual(response.status_code, 400)
-        self.assertIn('error', response.json())
-        self.assertEqual(response.json()['error'], 'Loan amount must be greater than 0.')
+        self.assertIn('loan_amount', response.json())
+        self.assertEqual(response.json()['loan_amount'], ['Loan amount zero ya usse zyada hona chahiye.'])
 
     def test_post_invalid_customer_id(self):
         # Using a non-existent integer customer_id (but valid integer type)
@@ -68,8 +142,2067 @@ class CheckEligibilityViewTest(TestCase):
         )
         self.assertEqual(response.status_code, 404)  # Expecting 404 because customer not found
         self.assertIn('error', response.json())
-        self.assertEqual(response.json()['error'], 'Customer not found')
+        self.assertEqual(response.json()['error'], 'Customer not found.')
+
+
+
+class CreditProfileTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse('check-eligibility')
+        cls.customer = Customer.objects.create(
+            first_name="Profile",
+            last_name="User",
+            phone_number="9876543210",
+            age=40,
+            monthly_income=100000,
+            approved_limit=3600000
+        )
+        today = date.today()
+        # active loan started this year, paid on time
+        Loan.objects.create(
+            customer=cls.customer, loan_amount=Decimal('200000'), interest_rate=10,
+            tenure=24, monthly_installment=Decimal('9000'), emis_paid_on_time=1,
+            start_date=today, end_date=today + timedelta(days=700)
+        )
+        # closed loan from an earlier year
+        Loan.objects.create(
+            customer=cls.customer, loan_amount=Decimal('100000'), interest_rate=12,
+            tenure=12, monthly_installment=Decimal('8885'), emis_paid_on_time=12,
+            start_date=date(today.year - 3, 1, 1), end_date=date(today.year - 2, 1, 1)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_profile_aggregates(self):
+        with self.assertNumQueries(1):
+            profile = get_credit_profile(self.customer.customer_id)
+
+        self.assertEqual(profile.customer, self.customer)
+        self.assertEqual(profile.loan_count, 2)
+        self.assertEqual(profile.on_time_count, 1)
+        self.assertEqual(profile.on_time_ratio, 0.5)
+        self.assertEqual(profile.current_year_loans, 1)
+        self.assertEqual(profile.total_loan_volume, Decimal('300000'))
+        self.assertEqual(profile.active_principal, Decimal('200000'))
+        self.assertEqual(profile.active_emi_total, Decimal('9000'))
+
+    def test_profile_without_loans(self):
+        customer = Customer.objects.create(
+            first_name="No", last_name="Loans", phone_number="1111111111",
+            age=25, monthly_income=50000, approved_limit=1800000
+        )
+        profile = get_credit_profile(customer.customer_id)
+        self.assertEqual(profile.loan_count, 0)
+        self.assertEqual(profile.on_time_ratio, 1)
+        self.assertEqual(profile.total_loan_volume, 0)
+        self.assertEqual(profile.active_emi_total, 0)
+
+    def test_profiles_for_many_customers_in_one_query(self):
+        other = Customer.objects.create(
+            first_name="Other", last_name="User", phone_number="2222222222",
+            age=35, monthly_income=60000, approved_limit=2200000
+        )
+        with self.assertNumQueries(1):
+            profiles = get_credit_profiles([self.customer.customer_id, other.customer_id, 999999])
+        self.assertEqual(set(profiles), {self.customer.customer_id, other.customer_id})
+        self.assertEqual(profiles[other.customer_id].loan_count, 0)
+
+    def test_check_eligibility_uses_single_query(self):
+        data = {
+            "customer_id": self.customer.customer_id,
+            "loan_amount": 100000.0,
+            "interest_rate": 14.0,
+            "tenure": 12
+        }
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, data=json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        # 0.5 * 50 + 30 / 3 + 10 (current year) + 10 (limit above volume)
+        self.assertEqual(response.json()['credit_score'], 55)
+        self.assertTrue(response.json()['approval'])
+
+
+
+class BatchCheckEligibilityViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse('check-eligibility-batch')
+        cls.single_url = reverse('check-eligibility')
+        cls.customers = [
+            Customer.objects.create(
+                first_name=f"Batch{i}", last_name="User", phone_number=f"90000000{i:02d}",
+                age=30 + i, monthly_income=50000 + 10000 * i, approved_limit=1800000 + 400000 * i
+            )
+            for i in range(3)
+        ]
+        today = date.today()
+        Loan.objects.create(
+            customer=cls.customers[1], loan_amount=Decimal('500000'), interest_rate=11,
+            tenure=36, monthly_installment=Decimal('16370'), emis_paid_on_time=0,
+            start_date=today, end_date=today + timedelta(days=1000)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def post(self, url, data):
+        return self.client.post(url, data=json.dumps(data), content_type='application/json')
+
+    def test_batch_matches_single_endpoint(self):
+        items = [
+            {"customer_id": c.customer_id, "loan_amount": 200000.0, "interest_rate": rate, "tenure": 24}
+            for c in self.customers for rate in (8.0, 14.0, 18.0)
+        ]
+        with self.assertNumQueries(1):
+            response = self.post(self.url, items)
+        self.assertEqual(response.status_code, 200)
+
+        results = response.json()['results']
+        self.assertEqual(len(results), len(items))
+        for index, (item, result) in enumerate(zip(items, results)):
+            self.assertEqual(result.pop('index'), index)
+            self.assertEqual(result.pop('status'), 200)
+            self.assertEqual(result, self.post(self.single_url, item).json())
+
+    def test_per_item_errors(self):
+        items = [
+            {"customer_id": self.customers[0].customer_id, "loan_amount": 100000.0, "interest_rate": 10.0, "tenure": 12},
+            {"customer_id": 999999, "loan_amount": 100000.0, "interest_rate": 10.0, "tenure": 12},
+            {"customer_id": self.customers[0].customer_id, "loan_amount": -5, "interest_rate": 10.0, "tenure": 12},
+        ]
+        results = self.post(self.url, items).json()['results']
+
+        self.assertEqual([r['status'] for r in results], [200, 404, 400])
+        self.assertEqual(results[1]['error'], 'Customer not found.')
+        self.assertIn('loan_amount', results[2]['errors'])
+
+    def test_rejects_non_list_body(self):
+        response = self.post(self.url, {"customer_id": self.customers[0].customer_id})
+        self.assertEqual(response.status_code, 400)
+
+
+
+class VectorizedScoringTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        incomes = [20000, 45000, 80000, 150000, 300000]
+        for i in range(25):
+            income = incomes[i % len(incomes)]
+            customer = Customer.objects.create(
+                first_name=f"Vec{i}", last_name="User", phone_number=f"80000000{i:02d}",
+                age=25 + i, monthly_income=income, approved_limit=round(36 * income / 100000) * 100000
+            )
+            for j in range(i % 6):
+                start = date(today.year - (j % 3), 1 + j, 1)
+                Loan.objects.create(
+                    customer=customer, loan_amount=Decimal(50000 * (i + j + 1)), interest_rate=9 + j,
+                    tenure=12 * (j + 1), monthly_installment=Decimal(str(round(income * 0.15 * (j + 1), 2))),
+                    emis_paid_on_time=(i + j) % 3, start_date=start,
+                    end_date=start + timedelta(days=365 * (j + 1) - 200 * (i % 2)),
+                )
+
+    def test_matches_per_request_path(self):
+        portfolio = load_portfolio()
+        profiles = get_credit_profiles(portfolio.customer_id.tolist())
+        labels = reasons()
+
+        for loan_amount, interest_rate, tenure in [(100000, 8, 12), (400000, 14, 36), (1500000, 18, 60)]:
+            results = evaluate_portfolio(portfolio, loan_amount, interest_rate, tenure)
+            for i, customer_id in enumerate(portfolio.customer_id.tolist()):
+                expected = evaluate_eligibility(profiles[customer_id], loan_amount, interest_rate, tenure)
+                self.assertEqual(bool(results['approval'][i]), expected['approval'])
+                self.assertEqual(float(results['monthly_installment'][i]), expected['monthly_installment'])
+                self.assertEqual(labels[results['reason'][i]], expected['reason'])
+                if 'credit_score' in expected:
+                    self.assertEqual(int(results['credit_score'][i]), expected['credit_score'])
+                    self.assertEqual(float(results['corrected_interest_rate'][i]), expected['corrected_interest_rate'])
+
+    def test_custom_rules_match_per_request_path(self):
+        rules = ScoringRules(approve_above=60, mid_band_floor=40, mid_band_rate=18, emi_income_cap=0.4)
+        portfolio = load_portfolio()
+        profiles = get_credit_profiles(portfolio.customer_id.tolist())
+        results = evaluate_portfolio(portfolio, 300000, 12, 24, rules)
+
+        for i, customer_id in enumerate(portfolio.customer_id.tolist()):
+            expected = evaluate_eligibility(profiles[customer_id], 300000, 12, 24, rules)
+            self.assertEqual(bool(results['approval'][i]), expected['approval'])
+            self.assertEqual(reasons(rules)[results['reason'][i]], expected['reason'])
+
+    def test_emi_array(self):
+        emis = vectorized_emi([100000, 250000, 500000], [10, 12.5, 16], [12, 24, 60])
+        for emi, args in zip(emis.tolist(), [(100000, 10, 12), (250000, 12.5, 24), (500000, 16, 60)]):
+            self.assertEqual(emi, calculate_emi(*args))
+
+    def test_rescore_portfolio_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'summary.json')
+            call_command(
+                'rescore_portfolio', '--loan-amount', '200000', '--interest-rate', '12', '--tenure', '24',
+                '--rule', 'approve_above=55', '--output', output, stdout=io.StringIO()
+            )
+            with open(output) as f:
+                summary = json.load(f)
+        self.assertEqual(summary['customers'], 25)
+        self.assertEqual(summary['approved'] + summary['rejected'], 25)
+        self.assertEqual(summary['rules']['approve_above'], 55)
+
+    def test_rescore_portfolio_rules_are_typed_and_validated(self):
+        command = RescorePortfolioCommand()
+        rules = command.parse_rules(['approve_above=60', 'emi_income_cap=0.4', 'mid_band_rate=18'])
+        self.assertEqual((rules.approve_above, rules.emi_income_cap, rules.mid_band_rate), (60, 0.4, 18.0))
+        self.assertIsInstance(rules.mid_band_rate, float)
+        for override in ('approve_above=50.5', 'limit_rounding=1e5', 'mid_band_rate=abc', 'low_band_rate=nan',
+                         'emi_income_cap=1.5', 'mid_band_floor=80', 'unknown=1', 'approve_above'):
+            with self.assertRaises(CommandError, msg=override):
+                command.parse_rules([override])
+
+
+
+class ImportDataCommandTest(TestCase):
+    def write_csv(self, directory, name, rows):
+        path = os.path.join(directory, name)
+        with open(path, 'w', newline='') as f:
+            csv.writer(f).writerows(rows)
+        return path
+
+    def test_bulk_import_with_rejects(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            customers = self.write_csv(tmp, 'customers.csv', [
+                ['Customer ID', 'First Name', 'Last Name', 'Age', 'Phone Number', 'Monthly Salary', 'Approved Limit'],
+                [10, 'Aaron', 'Garcia', 63, 9629317944, 50000, 1800000],
+                [11, 'Abbey', 'Gonzalez', 20, 9278790909, 33000, 1200000],
+                [12, 'Bad', 'Row', 'abc', 9000000000, 10000, 400000],
+            ])
+            loans = self.write_csv(tmp, 'loans.csv', [
+                ['Customer ID', 'Loan ID', 'Loan Amount', 'Tenure', 'Interest Rate', 'Monthly payment',
+                 'EMIs paid on Time', 'Date of Approval', 'End Date'],
+                [10, 100, 900000, 129, 8.2, 15344, 114, '2017-03-09', '2027-12-09'],
+                [11, 101, 300000, 3, 13.46, 100000, 3, '2011-09-06', '2011-12-06'],
+                [99, 102, 200000, 12, 12, 17769, 12, '2015-07-13', '2016-07-13'],
+                [10, 100, 950000, 129, 8.2, 16000, 114, '2017-03-09', '2027-12-09'],
+            ])
+            out = io.StringIO()
+            call_command('import_data', '--customers', customers, '--loans', loans, '--chunk-size', '2', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Successfully imported 2 customers', output)
+        self.assertIn("row 3: 'Age' has invalid value 'abc'", output)
+        self.assertIn('row 3: customer 99 does not exist', output)
+
+        self.assertEqual(Customer.objects.count(), 2)
+        self.assertEqual(Customer.objects.get(customer_id=10).phone_number, '9629317944')
+        self.assertEqual(Loan.objects.count(), 2)
+        # the later row for loan 100 wins, like update_or_create did
+        self.assertEqual(Loan.objects.get(loan_id=100).loan_amount, Decimal('950000'))
+
+        # sequences are moved past the imported ids
+        customer = Customer.objects.create(
+            first_name="New", last_name="Customer", phone_number="1", age=30,
+            monthly_income=10000, approved_limit=400000
+        )
+        self.assertGreater(customer.customer_id, 11)
+
+    def test_reimport_updates_in_place(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            header = ['Customer ID', 'First Name', 'Last Name', 'Age', 'Phone Number', 'Monthly Salary', 'Approved Limit']
+            first = self.write_csv(tmp, 'a.csv', [header, [5, 'Old', 'Name', 30, 1, 10000, 400000]])
+            second = self.write_csv(tmp, 'b.csv', [header, [5, 'New', 'Name', 31, 1, 20000, 700000]])
+            call_command('import_data', '--customers', first, '--skip-loans', stdout=io.StringIO())
+            call_command('import_data', '--customers', second, '--skip-loans', stdout=io.StringIO())
+
+        customer = Customer.objects.get()
+        self.assertEqual((customer.first_name, customer.age, customer.monthly_income), ('New', 31, 20000))
+
+
+
+class EagerCeleryMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._always_eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+
+    @classmethod
+    def tearDownClass(cls):
+        celery_app.conf.task_always_eager = cls._always_eager
+        super().tearDownClass()
+
+
+class IngestionJobTest(EagerCeleryMixin, TestCase):
+    CUSTOMER_ROWS = [
+        ['Customer ID', 'First Name', 'Last Name', 'Age', 'Phone Number', 'Monthly Salary', 'Approved Limit'],
+    ] + [[i, f'First{i}', 'Last', 30, 9000000000 + i, 50000, 1800000] for i in range(1, 8)]
+    LOAN_ROWS = [
+        ['Customer ID', 'Loan ID', 'Loan Amount', 'Tenure', 'Interest Rate', 'Monthly payment',
+         'EMIs paid on Time', 'Date of Approval', 'End Date'],
+    ] + [[i % 7 + 1, 100 + i, 100000, 12, 10, 8792, 12, '2020-01-01', '2021-01-01'] for i in range(10)] + [
+        [99, 200, 100000, 12, 10, 8792, 12, '2020-01-01', '2021-01-01'],
+    ]
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(User.objects.create_user('ops', is_staff=True))
+
+    def upload(self):
+        files = {}
+        for name, rows in (('customer_file', self.CUSTOMER_ROWS), ('loan_file', self.LOAN_ROWS)):
+            content = io.StringIO()
+            csv.writer(content).writerows(rows)
+            files[name] = SimpleUploadedFile(f'{name}.csv', content.getvalue().encode(), content_type='text/csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('ingestion-create'), {**files, 'chunk_size': 3})
+        self.assertEqual(response.status_code, 202)
+        return response.json()['job_id']
+
+    def status(self, job_id):
+        return self.client.get(reverse('ingestion-status', args=[job_id])).json()
+
+    def test_chunked_ingestion(self):
+        job = self.status(self.upload())
+
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['completion'], 100.0)
+        self.assertEqual(job['progress']['customers'], {
+            'chunks_total': 3, 'chunks_done': 3, 'chunks_failed': 0, 'rows_loaded': 7, 'rows_rejected': 0
+        })
+        self.assertEqual(job['progress']['loans']['chunks_total'], 4)
+        self.assertEqual(job['progress']['loans']['rows_loaded'], 10)
+        self.assertEqual(job['progress']['loans']['rows_rejected'], 1)
+        self.assertEqual(Customer.objects.count(), 7)
+        self.assertEqual(Loan.objects.count(), 10)
+
+    def test_resume_skips_finished_chunks(self):
+        calls = []
+        real_load_loans = LOADERS[IngestionJob.LOANS]
+
+        def flaky_load_loans(rows):
+            calls.append(rows[0][0])
+            if rows[0][0] == 4 and calls.count(4) == 1:
+                raise RuntimeError("database went away")
+            return real_load_loans(rows)
+
+        with mock.patch.dict(LOADERS, {IngestionJob.LOANS: flaky_load_loans}):
+            job_id = self.upload()
+            job = self.status(job_id)
+            self.assertEqual(job['status'], 'failed')
+            self.assertEqual(job['progress']['loans']['chunks_failed'], 1)
+            self.assertEqual(job['failed_chunks'][0]['error'], 'RuntimeError: database went away')
+
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('ingestion-resume', args=[job_id]))
+            self.assertEqual(response.status_code, 202)
+
+        job = self.status(job_id)
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['progress']['loans']['rows_loaded'], 10)
+        # only the failed chunk (rows 4-6) was loaded twice
+        self.assertEqual(sorted(calls), [1, 4, 4, 7, 10])
+
+        response = self.client.post(reverse('ingestion-resume', args=[job_id]))
+        self.assertEqual(response.status_code, 409)
+
+    def test_requires_a_file(self):
+        response = self.client.post(reverse('ingestion-create'), {'chunk_size': 10})
+        self.assertEqual(response.status_code, 400)
+
+    def test_chunks_are_read_from_their_own_files(self):
+        job_id = self.upload()
+        # done chunks drop their files; the upload was read once, at the start
+        self.assertEqual(list(Path(self.media.name, 'ingestion', 'chunks', str(job_id)).iterdir()), [])
+        rejected = self.status(job_id)['progress']['loans']['rows_rejected']
+        self.assertEqual(rejected, 1)
+        chunk = IngestionChunk.objects.get(job_id=job_id, kind=IngestionJob.LOANS, start_row=9)
+        self.assertEqual(chunk.rejected_rows, [[11, 'customer 99 does not exist']])
+
+    def test_running_job_is_resumed_only_when_stale(self):
+        job_id = self.upload()
+        IngestionJob.objects.filter(pk=job_id).update(status=IngestionJob.RUNNING, finished_at=None)
+        chunk = IngestionChunk.objects.filter(job_id=job_id, kind=IngestionJob.LOANS).first()
+        IngestionChunk.objects.filter(pk=chunk.pk).update(status=IngestionChunk.RUNNING, started_at=timezone.now())
+
+        response = self.client.post(reverse('ingestion-resume', args=[job_id]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(IngestionChunk.objects.get(pk=chunk.pk).status, IngestionChunk.RUNNING)
+
+        started = timezone.now() - timedelta(seconds=settings.INGESTION_CHUNK_STALE_SECONDS + 1)
+        IngestionChunk.objects.filter(pk=chunk.pk).update(started_at=started)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('ingestion-resume', args=[job_id]))
+        self.assertEqual(response.status_code, 202)
+        chunk.refresh_from_db()
+        self.assertEqual((chunk.status, chunk.attempts), (IngestionChunk.DONE, 2))
+        self.assertEqual(self.status(job_id)['status'], 'completed')
+
+    def test_stale_attempt_does_not_overwrite_its_replacement(self):
+        job_id = self.upload()
+        chunk = IngestionChunk.objects.filter(job_id=job_id, kind=IngestionJob.LOANS).first()
+        IngestionChunk.objects.filter(pk=chunk.pk).update(status=IngestionChunk.PENDING, rows_loaded=0)
+
+        def load_while_replaced(rows):
+            # meanwhile a resume re-queued the chunk and another worker claimed it
+            IngestionChunk.objects.filter(pk=chunk.pk).update(attempts=F('attempts') + 1)
+            return len(rows), []
+
+        with mock.patch.dict(LOADERS, {IngestionJob.LOANS: load_while_replaced}):
+            ingest_chunk(chunk.pk)
+        chunk.refresh_from_db()
+        self.assertEqual((chunk.status, chunk.rows_loaded), (IngestionChunk.RUNNING, 0))
+
+    def test_requires_staff(self):
+        self.client.logout()
+        self.assertEqual(self.client.post(reverse('ingestion-create'), {'chunk_size': 10}).status_code, 403)
+        self.assertEqual(self.client.get(reverse('ingestion-status', args=[1])).status_code, 403)
+        self.assertEqual(self.client.post(reverse('ingestion-resume', args=[1])).status_code, 403)
+
+
+
+class LoanApplicationTest(EagerCeleryMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(
+            first_name="Async", last_name="User", phone_number="7000000000",
+            age=35, monthly_income=100000, approved_limit=3600000
+        )
+
+    def submit(self, **overrides):
+        data = {
+            "customer_id": self.customer.customer_id,
+            "loan_amount": 300000.0,
+            "interest_rate": 14.0,
+            "tenure": 24,
+            **overrides,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('loan-application-create'), data=json.dumps(data), content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_application_is_processed_and_polled(self):
+        submitted = self.submit()
+        self.assertEqual(submitted['status'], 'pending')
+
+        result = self.client.get(submitted['status_url']).json()
+        expected = evaluate_eligibility(get_credit_profile(self.customer.customer_id), 300000.0, 14.0, 24)
+        self.assertEqual(result['status'], 'approved')
+        self.assertEqual(result['result'], expected)
+        self.assertIsNone(result['loan_id'])
+        self.assertFalse(Loan.objects.exists())
+
+    def test_approved_application_books_loan(self):
+        submitted = self.submit(create_loan=True)
+        result = self.client.get(submitted['status_url']).json()
+
+        loan = Loan.objects.get(loan_id=result['loan_id'])
+        self.assertEqual(result['result']['loan_id'], loan.loan_id)
+        self.assertEqual(loan.monthly_installment, Decimal(str(result['result']['monthly_installment'])))
+        self.assertEqual(loan.tenure, 24)
+        self.assertEqual(loan.end_date, add_months(loan.start_date, 24))
+
+    def test_rejected_application_does_not_book_loan(self):
+        submitted = self.submit(loan_amount=10000000.0, tenure=6, create_loan=True)
+        result = self.client.get(submitted['status_url']).json()
+        self.assertEqual(result['status'], 'rejected')
+        self.assertEqual(result['result']['reason'], 'EMI exceeds 50% of income.')
+        self.assertFalse(Loan.objects.exists())
+
+    def resolve_to(self, address, port=443):
+        return mock.patch('core.webhooks.socket.getaddrinfo', return_value=[
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, port)),
+        ])
+
+    def partner_server(self, status_code=204):
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                received.append((self.path, self.headers['Host'], json.loads(body)))
+                self.send_response(status_code)
+                self.send_header('Location', 'http://169.254.169.254/')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_port, received
+
+    def test_webhook_receives_result(self):
+        port, received = self.partner_server()
+        # the partner host "resolves" to the local server, let through as if it were public
+        with self.resolve_to('127.0.0.1', port), mock.patch('core.webhooks._public', return_value=True):
+            submitted = self.submit(callback_url=f'http://partner.example.com:{port}/hook?source=credit')
+
+        [(path, host, body)] = received
+        self.assertEqual((path, host), ('/hook?source=credit', f'partner.example.com:{port}'))
+        self.assertEqual(body['status'], 'approved')
+        application = LoanApplication.objects.get(pk=submitted['application_id'])
+        self.assertIsNotNone(application.webhook_delivered_at)
+
+    def test_redirects_are_not_followed(self):
+        port, received = self.partner_server(302)
+        with self.resolve_to('127.0.0.1', port), mock.patch('core.webhooks._public', return_value=True):
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                post_json(f'http://partner.example.com:{port}/hook', {})
+        self.assertEqual((raised.exception.code, len(received)), (302, 1))
+
+    def test_delivery_connects_to_the_checked_address(self):
+        answers = [
+            [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('93.184.216.34', 443))],
+            # a rebinding DNS server answers differently the second time
+            [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', 443))],
+        ]
+        with mock.patch('core.webhooks.socket.getaddrinfo', side_effect=answers) as getaddrinfo, \
+                mock.patch('core.webhooks.socket.create_connection', side_effect=ConnectionRefusedError) as connect:
+            with self.assertRaises(ConnectionRefusedError):
+                post_json('https://partner.example.com/hook', {})
+        self.assertEqual(getaddrinfo.call_count, 1)
+        self.assertEqual(connect.call_args[0][0], ('93.184.216.34', 443))
+
+    def test_internal_callback_urls_are_refused(self):
+        for url, address in [
+            ('http://169.254.169.254/latest/meta-data/', '169.254.169.254'),
+            ('http://localhost:8000/admin/', '127.0.0.1'),
+            ('https://partner.example.com/hook', '10.0.0.5'),
+            ('ftp://partner.example.com/hook', '93.184.216.34'),
+        ]:
+            with self.resolve_to(address):
+                response = self.client.post(reverse('loan-application-create'), data=json.dumps({
+                    'customer_id': self.customer.customer_id, 'loan_amount': 300000.0, 'interest_rate': 14.0,
+                    'tenure': 24, 'callback_url': url,
+                }), content_type='application/json')
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn('callback_url', response.json())
+        self.assertFalse(LoanApplication.objects.exists())
+
+        with override_settings(WEBHOOK_ALLOWED_HOSTS=['.partner.example.com']), self.resolve_to('93.184.216.34'):
+            check_callback_url('https://hooks.partner.example.com/loan')
+            with self.assertRaises(UnsafeCallback):
+                check_callback_url('https://other.example.com/loan')
+
+    def test_webhook_retries_only_server_errors(self):
+        application = LoanApplication.objects.create(
+            customer=self.customer, loan_amount=1000, interest_rate=10, tenure=12,
+            callback_url='https://partner.example.com/hook',
+        )
+        for code, retried in ((400, False), (302, False), (503, True)):
+            error = urllib.error.HTTPError(application.callback_url, code, 'error', {}, None)
+            with self.resolve_to('93.184.216.34'), \
+                    mock.patch('core.tasks.post_json', side_effect=error), \
+                    mock.patch.object(deliver_application_webhook, 'retry', side_effect=Retry) as retry:
+                if retried:
+                    with self.assertRaises(Retry):
+                        deliver_application_webhook(application.pk)
+                    self.assertLessEqual(retry.call_args.kwargs['countdown'], WEBHOOK_RETRY_BACKOFF)
+                else:
+                    deliver_application_webhook(application.pk)
+                    retry.assert_not_called()
+        self.assertLessEqual(webhook_retry_countdown(4), 160)
+        self.assertLessEqual(webhook_retry_countdown(20), 600)
+        application.refresh_from_db()
+        self.assertIsNone(application.webhook_delivered_at)
+
+    def test_reprocessing_is_a_no_op(self):
+        submitted = self.submit(create_loan=True)
+        self.assertEqual(process_credit_application(submitted['application_id']), 'approved')
+        self.assertEqual(Loan.objects.count(), 1)
+
+    def test_unknown_customer(self):
+        response = self.client.post(
+            reverse('loan-application-create'),
+            data=json.dumps({"customer_id": 999999, "loan_amount": 1000.0, "interest_rate": 10.0, "tenure": 12}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+
+class CreditProfileCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse('check-eligibility')
+        cls.customer = Customer.objects.create(
+            first_name="Cached", last_name="User", phone_number="6000000000",
+            age=45, monthly_income=90000, approved_limit=3200000
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def check(self):
+        data = {"customer_id": self.customer.customer_id, "loan_amount": 100000.0, "interest_rate": 10.0, "tenure": 12}
+        return self.client.post(self.url, data=json.dumps(data), content_type='application/json').json()
+
+    def add_loan(self, **fields):
+        today = date.today()
+        return Loan.objects.create(**{
+            'customer': self.customer, 'loan_amount': Decimal('3000000'), 'interest_rate': 10, 'tenure': 60,
+            'monthly_installment': Decimal('63741'), 'emis_paid_on_time': 0,
+            'start_date': today, 'end_date': today + timedelta(days=1800), **fields,
+        })
+
+    def test_repeat_checks_hit_cache(self):
+        with self.assertNumQueries(1):
+            first = self.check()
+        with self.assertNumQueries(0):
+            second = self.check()
+        self.assertEqual(first, second)
+
+        stats = self.client.get(reverse('credit-profile-cache-stats')).json()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_loan_changes_invalidate(self):
+        self.assertTrue(self.check()['approval'])
+        loan = self.add_loan()
+        self.assertEqual(self.check()['reason'], 'Total EMIs exceed 50% of income.')
+
+        loan.delete()
+        self.assertTrue(self.check()['approval'])
+
+    def test_customer_changes_invalidate(self):
+        self.assertTrue(self.check()['approval'])
+        self.customer.monthly_income = 10000
+        self.customer.save()
+        self.assertEqual(self.check()['reason'], 'EMI exceeds 50% of income.')
+
+    def test_bulk_import_invalidates(self):
+        self.assertTrue(self.check()['approval'])
+        load_loans([(1, {
+            'Loan ID': 500, 'Customer ID': self.customer.customer_id, 'Loan Amount': 3000000, 'Tenure': 60,
+            'Interest Rate': 10, 'Monthly payment': 63741, 'EMIs paid on Time': 0,
+            'Date of Approval': date.today(), 'End Date': date.today() + timedelta(days=1800),
+        })])
+        self.assertEqual(self.check()['reason'], 'Total EMIs exceed 50% of income.')
+
+    def test_batch_uses_cache(self):
+        self.check()
+        item = {"customer_id": self.customer.customer_id, "loan_amount": 100000.0, "interest_rate": 10.0, "tenure": 12}
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                reverse('check-eligibility-batch'), data=json.dumps([item, item]), content_type='application/json'
+            )
+        self.assertEqual([r['status'] for r in response.json()['results']], [200, 200])
+
+
+
+class CustomerLoanTotalsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(
+            first_name="Totals", last_name="User", phone_number="5000000000",
+            age=50, monthly_income=120000, approved_limit=4300000
+        )
+
+    def add_loan(self, amount, emi, end_date):
+        return Loan.objects.create(
+            customer=self.customer, loan_amount=Decimal(amount), interest_rate=10, tenure=12,
+            monthly_installment=Decimal(emi), emis_paid_on_time=0,
+            start_date=date(2020, 1, 1), end_date=end_date,
+        )
+
+    def totals(self):
+        self.customer.refresh_from_db()
+        c = self.customer
+        return c.num_loans, c.active_loan_principal, c.active_loan_emi, c.current_debt
+
+    def test_totals_follow_loan_writes(self):
+        future = date.today() + timedelta(days=30)
+        active = self.add_loan('200000', '17500', future)
+        self.add_loan('50000', '4400', date(2021, 1, 1))
+        self.assertEqual(self.totals(), (2, Decimal('200000'), Decimal('17500'), 200000.0))
+
+        active.delete()
+        self.assertEqual(self.totals(), (1, Decimal('0'), Decimal('0'), 0.0))
+
+    def test_create_loan_view_updates_totals(self):
+        response = self.client.post(reverse('create-loan'), data=json.dumps({
+            'customer_id': self.customer.customer_id, 'loan_amount': '100000', 'interest_rate': 10,
+            'tenure': 12, 'monthly_installment': '8792', 'emis_paid_on_time': 0,
+            'start_date': date.today().isoformat(), 'end_date': (date.today() + timedelta(days=365)).isoformat(),
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        # the installment is derived server-side, not taken from the request
+        self.assertEqual(self.totals(), (1, Decimal('100000'), Decimal('8791.59'), 100000.0))
+
+    def test_import_updates_totals(self):
+        load_loans([(1, {
+            'Loan ID': 900, 'Customer ID': self.customer.customer_id, 'Loan Amount': 300000, 'Tenure': 24,
+            'Interest Rate': 11, 'Monthly payment': 14000, 'EMIs paid on Time': 3,
+            'Date of Approval': date.today(), 'End Date': date.today() + timedelta(days=700),
+        })])
+        self.assertEqual(self.totals(), (1, Decimal('300000'), Decimal('14000'), 300000.0))
+
+    def test_reimported_loan_moving_customer_refreshes_both(self):
+        other = Customer.objects.create(
+            first_name="Other", last_name="Owner", phone_number="5000000001",
+            age=40, monthly_income=120000, approved_limit=4300000
+        )
+        row = {
+            'Loan ID': 901, 'Customer ID': self.customer.customer_id, 'Loan Amount': 300000, 'Tenure': 24,
+            'Interest Rate': 11, 'Monthly payment': 14000, 'EMIs paid on Time': 3,
+            'Date of Approval': date.today(), 'End Date': date.today() + timedelta(days=700),
+        }
+        load_loans([(1, row)])
+        load_loans([(1, {**row, 'Customer ID': other.customer_id})])
+
+        self.assertEqual(self.totals(), (0, Decimal('0'), Decimal('0'), 0.0))
+        other.refresh_from_db()
+        self.assertEqual((other.num_loans, other.current_debt), (1, 300000.0))
+        self.assertEqual(CreditScore.objects.get(pk=self.customer.pk).loan_count, 0)
+        self.assertEqual(CreditScore.objects.get(pk=other.pk).loan_count, 1)
+        self.assertEqual(list(find_inconsistent_scores()), [])
+
+    def test_rebuild_command(self):
+        self.add_loan('200000', '17500', date.today() + timedelta(days=30))
+        # simulate drift, e.g. after the loan's end date passed
+        Customer.objects.filter(pk=self.customer.pk).update(num_loans=7, current_debt=1)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_loan_totals', '--check', stdout=io.StringIO())
+        call_command('rebuild_loan_totals', stdout=io.StringIO())
+        call_command('rebuild_loan_totals', '--check', stdout=io.StringIO())
+        self.assertEqual(self.totals(), (1, Decimal('200000'), Decimal('17500'), 200000.0))
+
+
+
+class CustomerLoansViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(
+            first_name="History", last_name="User", phone_number="4000000000",
+            age=55, monthly_income=500000, approved_limit=18000000
+        )
+        today = date.today()
+        Loan.objects.bulk_create([
+            Loan(
+                customer=cls.customer, loan_amount=Decimal(10000 + i), interest_rate=10, tenure=12,
+                monthly_installment=Decimal('900.50'), emis_paid_on_time=i % 12,
+                start_date=date(2015, 1, 1),
+                end_date=today + timedelta(days=30) if i % 3 == 0 else date(2016, 1, 1),
+            )
+            for i in range(12)
+        ])
+        cls.loan_ids = list(Loan.objects.order_by('loan_id').values_list('loan_id', flat=True))
+        cls.url = reverse('customer-loans', args=[cls.customer.customer_id])
+
+    def test_small_history_keeps_list_shape(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), LoanSerializer(Loan.objects.order_by('loan_id'), many=True).data)
+
+    def test_large_history_is_paginated_by_default(self):
+        with mock.patch.object(CustomerLoansView, 'small_history', 10), \
+                mock.patch.object(CustomerLoansView, 'default_limit', 5):
+            body = self.client.get(self.url).json()
+        self.assertEqual([loan['loan_id'] for loan in body['results']], self.loan_ids[:5])
+        self.assertEqual(body['next_cursor'], self.loan_ids[4])
+
+    def test_keyset_pages_cover_history(self):
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 5} if cursor is None else {'limit': 5, 'cursor': cursor}
+            body = self.client.get(self.url, params).json()
+            seen += [loan['loan_id'] for loan in body['results']]
+            cursor = body['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.loan_ids)
+
+    def test_active_filter_and_field_selection(self):
+        body = self.client.get(self.url, {'active': 'true', 'fields': 'loan_id,loan_amount'}).json()
+        self.assertEqual(len(body['results']), 4)
+        self.assertEqual(body['results'][0], {'loan_id': self.loan_ids[0], 'loan_amount': '10000.00'})
+
+        body = self.client.get(self.url, {'active': 'false'}).json()
+        self.assertEqual(len(body['results']), 8)
+
+    def test_unknown_field_rejected(self):
+        response = self.client.get(self.url, {'fields': 'loan_id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_streaming_matches_list(self):
+        with mock.patch.object(CustomerLoansView, 'stream_chunk_size', 5):
+            response = self.client.get(self.url, {'stream': 'true'})
+        self.assertTrue(response.streaming)
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body, self.client.get(self.url).json())
+
+    def test_streaming_empty_history(self):
+        Loan.objects.all().delete()
+        response = self.client.get(self.url, {'stream': 'true'})
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), [])
+
+    def test_unknown_customer(self):
+        response = self.client.get(reverse('customer-loans', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+
+
+class FastSerializerParityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(
+            first_name="Parity", last_name="User", phone_number="3000000000",
+            age=33, monthly_income=75000.5, approved_limit=2700000
+        )
+        Loan.objects.bulk_create([
+            Loan(customer=customer, loan_amount=Decimal('123456.7'), interest_rate=10.25, tenure=36,
+                 monthly_installment=Decimal('4000'), emis_paid_on_time=5,
+                 start_date=date(2023, 2, 28), end_date=date(2026, 2, 28)),
+            Loan(customer=customer, loan_amount=Decimal('99.99'), interest_rate=8, tenure=1,
+                 monthly_installment=Decimal('100.66'), emis_paid_on_time=0,
+                 start_date=date(2024, 12, 31), end_date=date(2025, 1, 31)),
+        ])
+        cls.customer = customer
+
+    def assertSameJSON(self, drf_data, fast_data):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(fast_data), renderer.render(drf_data))
+
+    def test_loan_list_parity(self):
+        loans = Loan.objects.order_by('loan_id')
+        self.assertSameJSON(LoanSerializer(loans, many=True).data, fast_serializer(LoanSerializer).rows(loans))
+
+    def test_field_subset_parity(self):
+        loans = Loan.objects.order_by('loan_id')
+        fields = ('end_date', 'loan_amount')
+        self.assertSameJSON(
+            LoanSerializer(loans, many=True, fields=list(fields)).data,
+            fast_serializer(LoanSerializer, fields).rows(loans),
+        )
+
+    def test_loan_detail_parity(self):
+        for loan in Loan.objects.all():
+            response = self.client.get(reverse('loan-detail', args=[loan.loan_id]))
+            self.assertEqual(response.content, JSONRenderer().render(LoanDetailSerializer(loan).data))
+
+    def test_loan_detail_queries_and_404(self):
+        loan = Loan.objects.first()
+        with self.assertNumQueries(1):
+            self.client.get(reverse('loan-detail', args=[loan.loan_id]))
+        response = self.client.get(reverse('loan-detail', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'No Loan matches the given query.'})
+
+
+
+class BenchmarkSuiteTest(TestCase):
+    def test_percentile(self):
+        values = [5, 1, 4, 2, 3, 6, 7, 8, 9, 10]
+        self.assertEqual(percentile(values, 50), 5)
+        self.assertEqual(percentile(values, 95), 10)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_seed_and_benchmark_with_baseline(self):
+        call_command('seed_portfolio', '--customers', '20', '--loans-per-customer', '3', stdout=io.StringIO())
+        self.assertEqual(Customer.objects.count(), 20)
+        self.assertEqual(Loan.objects.count(), 60)
+        self.assertEqual(Customer.objects.filter(num_loans=3).count(), 20)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = os.path.join(tmp, 'baseline.json')
+            out = io.StringIO()
+            call_command('bench_endpoints', '--requests', '5', '--save', baseline, stdout=out)
+            with open(baseline) as f:
+                report = json.load(f)
+
+            self.assertEqual([r['endpoint'] for r in report['results']], ENDPOINTS)
+            for result in report['results']:
+                self.assertEqual(result['errors'], 0)
+                self.assertGreater(result['queries_per_request'], 0)
+            # in-process writes are rolled back
+            self.assertEqual(Customer.objects.count(), 20)
+
+            report['results'][1]['queries_per_request'] = 0.5
+            with open(baseline, 'w') as f:
+                json.dump(report, f)
+            with self.assertRaisesMessage(CommandError, 'regressions'):
+                call_command(
+                    'bench_endpoints', '--requests', '5', '--endpoints', 'check-eligibility',
+                    '--compare', baseline, '--tolerance', '100', stdout=io.StringIO()
+                )
+
+    def test_bench_db_connections(self):
+        out = io.StringIO()
+        call_command('bench_db_connections', '--iterations', '5', stdout=out)
+        output = out.getvalue()
+        self.assertIn('new connection', output)
+        self.assertIn('persistent', output)
+        self.assertIn('Persistent connections save', output)
+
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True)
+class InstrumentationTest(EagerCeleryMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        instrumentation.reset_metrics()
+        self.customer = Customer.objects.create(
+            first_name='Timing', last_name='User', phone_number='9000000001', age=30,
+            monthly_income=50000, approved_limit=1800000,
+        )
+        self.loan = Loan.objects.create(
+            customer=self.customer, loan_amount=Decimal('100000.00'), interest_rate=10.0, tenure=12,
+            monthly_installment=Decimal('8791.59'), emis_paid_on_time=3,
+            start_date=date.today() - timedelta(days=90), end_date=date.today() + timedelta(days=270),
+        )
+
+    def test_server_timing_and_metrics(self):
+        response = Client().get(reverse('loan-detail', args=[self.loan.loan_id]))
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="1 queries"', timing)
+        self.assertIn('serializer;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+        metrics = Client().get(reverse('metrics'))
+        self.assertTrue(metrics['Content-Type'].startswith('text/plain'))
+        body = metrics.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_db_queries_bucket{view="loan-detail",le="1"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{view="loan-detail",method="GET",status="200"} 1', body)
+
+    def test_celery_tasks_are_recorded(self):
+        instrumentation.connect_celery_signals()
+        self.addCleanup(task_prerun.disconnect, dispatch_uid='core.instrumentation.task_prerun')
+        self.addCleanup(task_postrun.disconnect, dispatch_uid='core.instrumentation.task_postrun')
+        self.addCleanup(worker_process_init.disconnect, dispatch_uid='core.instrumentation.worker_process_init')
+
+        application = LoanApplication.objects.create(
+            customer=self.customer, loan_amount=50000, interest_rate=12, tenure=12,
+        )
+        process_credit_application.delay(application.pk)
+
+        body = instrumentation.render_metrics()
+        self.assertIn(
+            'celery_task_duration_seconds_count{task="core.tasks.process_credit_application",state="SUCCESS"} 1', body
+        )
+        self.assertIn('celery_task_db_queries_count{task="core.tasks.process_credit_application"} 1', body)
+
+    def test_worker_processes_serve_their_metrics(self):
+        instrumentation.TASK_DB_QUERIES.observe(2, task='core.tasks.nightly_rebuild')
+        with mock.patch('billiard.process.current_process', return_value=mock.Mock(index=3)), \
+                mock.patch.object(instrumentation, 'serve_metrics') as serve:
+            instrumentation._serve_worker_metrics()
+        serve.assert_called_once_with(settings.CELERY_METRICS_PORT + 3)
+
+        server = instrumentation.serve_metrics(0, host='127.0.0.1')
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        with urlopen(f'http://127.0.0.1:{server.server_port}/metrics') as response:
+            body = response.read().decode()
+        self.assertIn('celery_task_db_queries_count{task="core.tasks.nightly_rebuild"} 1', body)
+
+    @override_settings(INSTRUMENTATION_ENABLED=False)
+    def test_disabled_middleware_is_not_loaded(self):
+        response = Client().get(reverse('loan-detail', args=[self.loan.loan_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+        self.assertNotIn('loan-detail', instrumentation.render_metrics())
+
+
+
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = Customer.objects.create(
+            first_name='Async', last_name='User', phone_number='9000000002', age=35,
+            monthly_income=80000, approved_limit=2900000,
+        )
+        today = date.today()
+        Loan.objects.bulk_create([
+            Loan(
+                customer=self.customer, loan_amount=Decimal(50000 + i), interest_rate=11.5, tenure=12,
+                monthly_installment=Decimal('4431.03'), emis_paid_on_time=i % 12,
+                start_date=today - timedelta(days=30 * i), end_date=today + timedelta(days=200 - 30 * i),
+            )
+            for i in range(12)
+        ])
+        rebuild_credit_scores([self.customer.customer_id])
+        self.loan = Loan.objects.filter(customer=self.customer).order_by('loan_id').first()
+
+    def sync_json(self, name, *args, body=None, query=''):
+        url = reverse(name, args=args) + query
+        if body is None:
+            response = self.client.get(url)
+        else:
+            response = self.client.post(url, body, content_type='application/json')
+        return response.status_code, b''.join(response.streaming_content) if response.streaming else response.content
+
+    async def async_json(self, name, *args, body=None, query=''):
+        url = reverse(name, args=args) + query
+        if body is None:
+            response = await self.async_client.get(url)
+        else:
+            response = await self.async_client.post(url, body, content_type='application/json')
+        if response.streaming:
+            content = b''.join([chunk async for chunk in response.streaming_content])
+        else:
+            content = response.content
+        return response.status_code, content
+
+    async def assert_same(self, name, *args, **kwargs):
+        sync_status, sync_content = await sync_to_async(self.sync_json)(name, *args, **kwargs)
+        async_status, async_content = await self.async_json(f'async-{name}', *args, **kwargs)
+        self.assertEqual(async_status, sync_status)
+        self.assertEqual(json.loads(async_content), json.loads(sync_content))
+        return async_status
+
+    async def test_check_eligibility_matches_sync_view(self):
+        body = {'customer_id': self.customer.customer_id, 'loan_amount': 200000, 'interest_rate': 10, 'tenure': 24}
+        self.assertEqual(await self.assert_same('check-eligibility', body=body), 200)
+        self.assertEqual(await self.assert_same('check-eligibility', body={**body, 'customer_id': 999999}), 404)
+        self.assertEqual(await self.assert_same('check-eligibility', body={**body, 'loan_amount': -5}), 400)
+
+    async def test_loan_detail_matches_sync_view(self):
+        self.assertEqual(await self.assert_same('loan-detail', self.loan.loan_id), 200)
+        self.assertEqual(await self.assert_same('loan-detail', 999999), 404)
+
+    async def test_customer_loans_matches_sync_view(self):
+        customer_id = self.customer.customer_id
+        self.assertEqual(await self.assert_same('customer-loans', customer_id), 200)
+        await self.assert_same('customer-loans', customer_id, query='?limit=5')
+        await self.assert_same('customer-loans', customer_id, query='?active=true&fields=loan_id,loan_amount')
+        await self.assert_same('customer-loans', customer_id, query='?stream=true')
+        self.assertEqual(await self.assert_same('customer-loans', customer_id, query='?limit=0'), 400)
+        self.assertEqual(await self.assert_same('customer-loans', 999999), 404)
+
+    @override_settings(INSTRUMENTATION_ENABLED=True)
+    async def test_async_requests_are_instrumented(self):
+        response = await AsyncClient().get(reverse('async-loan-detail', args=[self.loan.loan_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+
+
+class LoanMathTest(TestCase):
+    def test_schedule_pays_off_the_principal(self):
+        for amount, rate, tenure in [(100000, 10, 12), (2500000, 8.75, 240), (50000, 0, 7), (99999.99, 19.5, 1)]:
+            payment, principal, interest, balance = amortization_schedule(amount, rate, tenure)
+            self.assertEqual(len(payment), tenure)
+            self.assertAlmostEqual(principal.sum(), amount, delta=0.01 * tenure)
+            self.assertEqual(balance[-1], 0)
+            self.assertTrue((balance[:-1] > 0).all())
+            self.assertTrue((payment[:-1] == calculate_emi(amount, rate, tenure)).all())
+            self.assertTrue((abs(payment - principal - interest) < 0.011).all())
+
+        payment, principal, interest, balance = amortization_schedule(100000, 10, 12)
+        self.assertEqual(interest[0], 833.33)
+        self.assertEqual(principal[0], 7958.26)
+        self.assertEqual(balance[0], 92041.74)
+
+    def test_schedule_is_cached_and_read_only(self):
+        amortization_schedule(123456, 11.25, 36)
+        hits = schedule_cache_info().hits
+        payment = amortization_schedule(Decimal('123456.00'), 11.25, 36)[0]
+        self.assertEqual(schedule_cache_info().hits, hits + 1)
+        with self.assertRaises(ValueError):
+            payment[0] = 0
+        with self.assertRaises(ValueError):
+            amortization_schedule(1000, 10, 0)
+
+    def test_end_date(self):
+        self.assertEqual(end_date(date(2024, 1, 31), 1), date(2024, 2, 29))
+        self.assertEqual(end_date(date(2024, 5, 15), 24), date(2026, 5, 15))
+
+    def test_create_loan_derives_fields_and_schedule_endpoint(self):
+        customer = Customer.objects.create(
+            first_name='Plan', last_name='User', phone_number='9000000003', age=40,
+            monthly_income=100000, approved_limit=3600000,
+        )
+        response = self.client.post(reverse('create-loan'), data=json.dumps({
+            'customer_id': customer.customer_id, 'loan_amount': 100000, 'interest_rate': 10, 'tenure': 12,
+            'start_date': '2025-01-31', 'monthly_installment': '1', 'emis_paid_on_time': 12,
+            'end_date': '2025-02-01',
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        loan = Loan.objects.get(pk=response.json()['loan_id'])
+        self.assertEqual(loan.monthly_installment, Decimal('8791.59'))
+        self.assertEqual(loan.emis_paid_on_time, 0)
+        self.assertEqual(loan.end_date, date(2026, 1, 31))
+
+        response = self.client.get(reverse('loan-schedule', args=[loan.loan_id]))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['monthly_installment'], 8791.59)
+        self.assertEqual(data['end_date'], '2026-01-31')
+        self.assertEqual(len(data['schedule']), 12)
+        self.assertEqual(data['schedule'][0]['due_date'], '2025-02-28')
+        self.assertEqual(data['schedule'][-1]['balance'], 0)
+        self.assertEqual(self.client.get(reverse('loan-schedule', args=[999999])).status_code, 404)
+
+        response = self.client.post(reverse('create-loan'), data=json.dumps({
+            'customer_id': customer.customer_id, 'loan_amount': 100000, 'interest_rate': 10, 'tenure': 0,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        for field, value in [('loan_amount', 'NaN'), ('loan_amount', 'Infinity'), ('interest_rate', 'NaN'),
+                             ('interest_rate', 'Infinity'), ('loan_amount', '-Infinity')]:
+            application = {'customer_id': customer.customer_id, 'loan_amount': 100000, 'interest_rate': 10, 'tenure': 12}
+            application[field] = value
+            response = self.client.post(reverse('create-loan'), data=json.dumps(application), content_type='application/json')
+            self.assertEqual(response.status_code, 400, (field, value))
+        self.assertEqual(Loan.objects.filter(customer=customer).count(), 1)
+
+
+
+class CreditScoreTest(EagerCeleryMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = Customer.objects.create(
+            first_name='Score', last_name='User', phone_number='9000000004', age=45,
+            monthly_income=60000, approved_limit=2200000,
+        )
+
+    def add_loan(self, customer=None, **kwargs):
+        values = dict(
+            customer=customer or self.customer, loan_amount=Decimal('120000.00'), interest_rate=12, tenure=12,
+            monthly_installment=Decimal('10661.85'), emis_paid_on_time=1,
+            start_date=date.today(), end_date=date.today() + timedelta(days=365),
+        )
+        values.update(kwargs)
+        return Loan.objects.create(**values)
+
+    def assert_matches_full_recomputation(self):
+        self.assertEqual(list(find_inconsistent_scores()), [])
+
+    def test_loan_events_update_the_row_incrementally(self):
+        row = CreditScore.objects.get(customer=self.customer)
+        self.assertEqual((row.loan_count, row.as_of), (0, date.today()))
+
+        loan = self.add_loan()
+        self.add_loan(emis_paid_on_time=5, start_date=date(2019, 3, 1), end_date=date(2020, 3, 1))
+        self.assert_matches_full_recomputation()
+
+        loan = Loan.objects.get(pk=loan.pk)
+        loan.end_date = date.today() - timedelta(days=1)
+        loan.loan_amount = Decimal('90000.00')
+        loan.save()
+        self.assert_matches_full_recomputation()
+
+        other = Customer.objects.create(
+            first_name='Other', last_name='User', phone_number='9000000005', age=30,
+            monthly_income=40000, approved_limit=1400000,
+        )
+        loan.customer = other
+        loan.save()
+        self.assert_matches_full_recomputation()
+        self.assertEqual(CreditScore.objects.get(customer=other).loan_count, 1)
+
+        loan.delete()
+        self.assert_matches_full_recomputation()
+
+        self.assertEqual(CreditScore.objects.get(customer=self.customer).score, 25)
+        # volume is no longer under the limit
+        self.customer.approved_limit = 50000
+        self.customer.save()
+        self.assert_matches_full_recomputation()
+        self.assertEqual(CreditScore.objects.get(customer=self.customer).score, 15)
+
+    def test_read_is_one_query_and_serves_stale_rows_recomputed(self):
+        self.add_loan()
+        with self.assertNumQueries(1):
+            entry = get_materialized_entry(self.customer.customer_id)
+        expected = get_credit_profile(self.customer.customer_id)
+        self.assertEqual(entry['profile'].active_principal, expected.active_principal)
+
+        yesterday = date.today() - timedelta(days=1)
+        CreditScore.objects.filter(customer=self.customer).update(as_of=yesterday, loan_count=40, active_principal=0)
+        # reads may run on a replica, so they compute but never write
+        with CaptureQueriesContext(connection) as queries:
+            entry = get_materialized_entry(self.customer.customer_id)
+            entries = get_materialized_entries([self.customer.customer_id])
+        self.assertTrue(all(query['sql'].lstrip().upper().startswith('SELECT') for query in queries))
+        self.assertEqual(entry['profile'].loan_count, 1)
+        self.assertEqual(entries[self.customer.customer_id]['credit_score'], entry['credit_score'])
+        self.assertEqual(CreditScore.objects.get(customer=self.customer).as_of, yesterday)
+        with self.assertRaises(Customer.DoesNotExist):
+            get_materialized_entry(999999)
+
+    def test_consistency_check_and_nightly_rebuild(self):
+        self.add_loan()
+        call_command('check_credit_scores', stdout=io.StringIO())
+
+        CreditScore.objects.filter(customer=self.customer).update(on_time_count=7)
+        with self.assertRaisesMessage(CommandError, '1 credit scores differ'):
+            call_command('check_credit_scores', stdout=io.StringIO())
+        call_command('check_credit_scores', '--fix', stdout=io.StringIO())
+        self.assert_matches_full_recomputation()
+
+        CreditScore.objects.all().delete()
+        self.assertEqual(
+            nightly_rebuild.delay().get(), {'customers': 1, 'credit_scores': 1, 'idempotency_keys_expired': 0}
+        )
+        self.assert_matches_full_recomputation()
+
+
+
+class LoanBookingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = Customer.objects.create(
+            first_name='Book', last_name='User', phone_number='9000000006', age=33,
+            monthly_income=50000, approved_limit=300000,
+        )
+
+    def create_loan(self, amount, key=None, **extra):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(reverse('create-loan'), data=json.dumps({
+            'customer_id': self.customer.customer_id, 'loan_amount': amount, 'interest_rate': 12, 'tenure': 12,
+            **extra,
+        }), content_type='application/json', **headers)
+
+    def test_exposure_is_checked_against_the_approved_limit(self):
+        self.assertEqual(self.create_loan(200000).status_code, 201)
+        response = self.create_loan(150000)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('exceeds the approved limit', response.json()['error'])
+        self.assertEqual(self.create_loan(100000).status_code, 201)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.current_debt, 300000.0)
+
+    def test_idempotency_key_books_once(self):
+        first = self.create_loan(100000, key='retry-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', first)
+
+        retry = self.create_loan(100000, key='retry-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 1)
+
+        self.assertEqual(self.create_loan(120000, key='retry-1').status_code, 422)
+
+        rejected = self.create_loan(900000, key='retry-2')
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(self.create_loan(900000, key='retry-2').json(), rejected.json())
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
+
+
+class BulkCreateLoanTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = Customer.objects.create(
+            first_name='Bulk', last_name='User', phone_number='9000000008', age=40,
+            monthly_income=50000, approved_limit=300000,
+        )
+
+    def post(self, items, **headers):
+        return self.client.post(reverse('create-loan-bulk'), data=json.dumps(items),
+                                content_type='application/json', **headers)
+
+    def test_rows_are_booked_and_reported_in_order(self):
+        loan = {'customer_id': self.customer.customer_id, 'interest_rate': 12, 'tenure': 12}
+        response = self.post([
+            # ended in 2025, so it does not count toward the debt
+            {**loan, 'loan_amount': 250000, 'start_date': '2024-01-31'},
+            {**loan, 'loan_amount': 200000},
+            {**loan, 'loan_amount': 150000},
+            {**loan, 'loan_amount': 100000},
+            {**loan, 'loan_amount': -5},
+            {**loan, 'customer_id': 999999, 'loan_amount': 1000},
+            {'customer_id': self.customer.customer_id},
+        ])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['created'], body['failed']), (3, 4))
+        self.assertEqual([result['status'] for result in body['results']], [201, 201, 400, 201, 400, 404, 400])
+        self.assertIn('exceeds the approved limit', body['results'][2]['error'])
+        self.assertIn('loan_amount', body['results'][4]['errors'])
+        self.assertEqual(set(body['results'][6]['errors']), {'loan_amount', 'interest_rate', 'tenure'})
+        self.assertEqual(body['results'][0]['end_date'], '2025-01-31')
+
+        booked = Loan.objects.get(loan_id=body['results'][1]['loan_id'])
+        self.assertEqual(booked.monthly_installment, Decimal(str(calculate_emi(200000, 12, 12))))
+
+        # bulk_create skips the signals, so the totals and score are refreshed by the batch
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.current_debt, 300000.0)
+        self.assertEqual(CreditScore.objects.get(customer=self.customer).loan_count, 3)
+        self.assertEqual(list(find_inconsistent_scores()), [])
+
+    def test_rejects_non_list_and_replays_idempotent_batches(self):
+        self.assertEqual(self.post({'customer_id': 1}).status_code, 400)
+        items = [{'customer_id': self.customer.customer_id, 'loan_amount': 1000, 'interest_rate': 10, 'tenure': 6}]
+        first = self.post(items, HTTP_IDEMPOTENCY_KEY='bulk-1')
+        retry = self.post(items, HTTP_IDEMPOTENCY_KEY='bulk-1')
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 1)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentLoanBookingTest(TransactionTestCase):
+    """Runs against PostgreSQL; SQLite serializes writers and has no row locks."""
+    threads = 16
+
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name='Race', last_name='User', phone_number='9000000007', age=33,
+            monthly_income=50000, approved_limit=400000,
+        )
+
+    def hammer(self, key_for):
+        barrier = threading.Barrier(self.threads)
+
+        def post(i):
+            try:
+                barrier.wait()
+                headers = {'HTTP_IDEMPOTENCY_KEY': key_for(i)} if key_for(i) else {}
+                return Client().post(reverse('create-loan'), data=json.dumps({
+                    'customer_id': self.customer.customer_id, 'loan_amount': 100000, 'interest_rate': 12,
+                    'tenure': 12,
+                }), content_type='application/json', **headers).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            return list(pool.map(post, range(self.threads)))
+
+    def test_concurrent_bookings_stay_within_the_limit(self):
+        statuses = self.hammer(lambda i: None)
+        self.assertEqual(statuses.count(201), 4)
+        self.assertEqual(statuses.count(400), self.threads - 4)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.current_debt, 400000.0)
+
+    def test_concurrent_retries_book_once(self):
+        statuses = self.hammer(lambda i: 'same-key')
+        self.assertEqual(statuses, [201] * self.threads)
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 1)
+
+
+
+class PortfolioExportTest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name='Export', last_name='User', phone_number='9000000009', age=45,
+            monthly_income=100000, approved_limit=3600000,
+        )
+        today = date.today()
+        for i in range(5):
+            Loan.objects.create(
+                customer=self.customer, loan_amount=Decimal('100000.00'), interest_rate=10, tenure=12,
+                monthly_installment=Decimal('8791.59'), emis_paid_on_time=12,
+                start_date=today, end_date=today + timedelta(days=365),
+            )
+        self.staff = User.objects.create_user('analyst', password='secret', is_staff=True)
+
+    def test_requires_staff(self):
+        url = reverse('portfolio-export', args=['loans', 'csv'])
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(User.objects.create_user('viewer'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_streams_csv_with_credit_metrics(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('portfolio-export', args=['customers', 'csv']))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="customers.csv"')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['num_loans'], '5')
+        self.assertEqual(rows[0]['available_limit'], '3100000.0')
+        self.assertEqual(rows[0]['emi_headroom'], str(round(50000 - 5 * 8791.59, 2)))
+        self.assertEqual(rows[0]['credit_score'], str(CreditScore.objects.get(customer=self.customer).score))
+
+        self.assertEqual(self.client.get(reverse('portfolio-export', args=['users', 'csv'])).status_code, 404)
+
+    def test_stale_scores_are_exported_recomputed(self):
+        fresh = list(iter_chunks('customers'))
+        yesterday = date.today() - timedelta(days=1)
+        CreditScore.objects.filter(customer=self.customer).update(as_of=yesterday, score=0, on_time_count=0)
+        self.assertEqual(list(iter_chunks('customers')), fresh)
+        self.assertEqual(CreditScore.objects.get(customer=self.customer).as_of, yesterday)
+
+        CreditScore.objects.filter(customer=self.customer).update(as_of=date.today(), policy_version=99, score=0)
+        self.assertEqual(list(iter_chunks('customers')), fresh)
+
+    @skipUnless(pq, 'pyarrow is not installed')
+    def test_parquet_is_written_one_row_group_per_chunk(self):
+        data = b''.join(parquet_chunks('loans', chunk_size=2))
+        parquet = pq.ParquetFile(io.BytesIO(data))
+        self.assertEqual(parquet.num_row_groups, 3)
+        table = parquet.read()
+        self.assertEqual(table.column('loan_amount').to_pylist(), [Decimal('100000.00')] * 5)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('portfolio-export', args=['loans', 'parquet']))
+        self.assertEqual(pq.read_table(io.BytesIO(b''.join(response.streaming_content))).num_rows, 5)
+
+    def test_command_writes_csv(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'loans.csv')
+            call_command('export_portfolio', 'loans', output=path, chunk_size=2, stdout=io.StringIO())
+            with open(path, newline='') as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(rows[0], export_header('loans'))
+        self.assertEqual(len(rows), 6)
+
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_use_the_replica_only_inside_opted_in_blocks_until_a_write(self):
+        self.assertEqual(self.router.db_for_read(Loan), 'default')
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Loan), 'replica')
+            self.assertEqual(self.router.db_for_write(Loan), 'default')
+            self.assertEqual(self.router.db_for_read(Loan), 'default')
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Loan), 'replica')
+            with mock.patch.object(connections['default'], 'in_atomic_block', True):
+                self.assertEqual(self.router.db_for_read(Loan), 'default')
+        # a write outside any block does not pin later blocks
+        self.router.db_for_write(Loan)
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Loan), 'replica')
+
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+
+    def test_middleware_pins_clients_after_a_write(self):
+        seen = []
+
+        def view(request):
+            with replica_reads():
+                seen.append(self.router.db_for_read(Loan))
+                if request.path == '/create-loan/':
+                    self.router.db_for_write(Loan)
+            return HttpResponse(status=201 if request.method == 'POST' else 200)
+
+        middleware = ReplicaPinningMiddleware(view)
+        factory = RequestFactory()
+
+        self.assertNotIn(PIN_COOKIE, middleware(factory.get('/loan/1/')).cookies)
+        # a POST that only reads does not pin
+        self.assertNotIn(PIN_COOKIE, middleware(factory.post('/check-eligibility/')).cookies)
+        response = middleware(factory.post('/create-loan/'))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        pinned = factory.get('/loan/1/')
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        middleware(pinned)
+        self.assertEqual(seen, ['replica', 'replica', 'replica', 'default'])
+
+
+# the "replica" is the test database itself, so the real views can run
+@override_settings(DATABASE_REPLICAS=['default'], REPLICA_PIN_SECONDS=5)
+class ReplicaPinningTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = Customer.objects.create(
+            first_name='Pin', last_name='User', phone_number='9000000020', age=30,
+            monthly_income=60000, approved_limit=2200000,
+        )
+        self.application = {
+            'customer_id': self.customer.customer_id, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12,
+        }
+
+    def test_eligibility_checks_do_not_pin(self):
+        for name in ('check-eligibility', 'async-check-eligibility'):
+            response = self.client.post(reverse(name), self.application, content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn(PIN_COOKIE, response.cookies, name)
+        response = self.client.post(
+            reverse('check-eligibility-batch'), data=json.dumps([self.application]), content_type='application/json'
+        )
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        response = self.client.post(reverse('create-loan'), self.application, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'REPLICA_DATABASE_URL is not set')
+class ReplicaReadsTest(TransactionTestCase):
+    """Run with REPLICA_DATABASE_URL set; the replica alias mirrors the test database."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.customer = Customer.objects.create(
+            first_name='Replica', last_name='User', phone_number='9000000010', age=30,
+            monthly_income=60000, approved_limit=2200000,
+        )
+
+    def test_reads_go_to_the_replica_and_writes_pin_the_client(self):
+        response = self.client.post(reverse('create-loan'), data=json.dumps({
+            'customer_id': self.customer.customer_id, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        url = reverse('loan-detail', args=[response.json()['loan_id']])
+
+        # read-your-writes: the client that just booked reads from the primary
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(len(replica), 0)
+
+        self.client.cookies.clear()
+        with CaptureQueriesContext(connections['replica']) as replica, \
+                CaptureQueriesContext(connections['default']) as primary:
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertEqual(self.client.get(
+                reverse('customer-loans', args=[self.customer.customer_id])
+            ).status_code, 200)
+        self.assertGreater(len(replica), 0)
+        self.assertEqual(len(primary), 0)
+
+
+
+class CustomerSearchTest(TestCase):
+    def setUp(self):
+        self.ravi = Customer.objects.create(
+            first_name='Ravi', last_name='Sharma', phone_number='+91 98765-43210', age=30,
+            monthly_income=50000, approved_limit=1800000,
+        )
+        self.others = [
+            Customer.objects.create(
+                first_name=f'Ravina{i}', last_name='Iyer', phone_number=f'70000000{i:02d}', age=30,
+                monthly_income=50000, approved_limit=1800000,
+            )
+            for i in range(3)
+        ]
+
+    def search(self, **params):
+        return self.client.get(reverse('customer-search'), params)
+
+    def test_normalization(self):
+        self.assertEqual(normalize_phone('+91 98765-43210'), '9876543210')
+        self.assertEqual(normalize_phone('098765 43210'), '9876543210')
+        self.assertEqual(normalize_name('  Ravi ', 'SHARMA'), 'ravi sharma')
+        self.assertEqual((self.ravi.phone_normalized, self.ravi.search_name), ('9876543210', 'ravi sharma'))
+
+        self.ravi.last_name = 'Verma'
+        self.ravi.save(update_fields=['last_name'])
+        self.assertEqual(Customer.objects.get(pk=self.ravi.pk).search_name, 'ravi verma')
+
+        load_customers([(1, {
+            'Customer ID': 500, 'First Name': 'Bulk', 'Last Name': 'Row', 'Phone Number': '09123456789',
+            'Age': 40, 'Monthly Salary': 10000, 'Approved Limit': 400000,
+        })])
+        self.assertEqual(
+            Customer.objects.filter(pk=500).values_list('phone_normalized', 'search_name').get(),
+            ('9123456789', 'bulk row'),
+        )
+
+    def test_lookup_by_phone_and_name(self):
+        response = self.search(phone='9876543210')
+        self.assertEqual([row['customer_id'] for row in response.json()['results']], [self.ravi.customer_id])
+        self.assertEqual(response.json()['results'][0]['phone_number'], '+91 98765-43210')
+
+        response = self.search(name='ravi sh')
+        self.assertEqual([row['customer_id'] for row in response.json()['results']], [self.ravi.customer_id])
+
+        first = self.search(name='Ravi', limit=2).json()
+        self.assertEqual(len(first['results']), 2)
+        rest = self.search(name='Ravi', limit=2, cursor=first['next_cursor']).json()
+        self.assertEqual(len(rest['results']), 2)
+        self.assertIsNone(rest['next_cursor'])
+
+        self.assertEqual(self.search().status_code, 400)
+        self.assertEqual(self.search(name='r').status_code, 400)
+
+    def test_duplicate_phone_is_rejected_at_registration(self):
+        response = self.client.post(reverse('register-customer'), {
+            'first_name': 'Ravi', 'last_name': 'Again', 'age': 31, 'monthly_income': 60000,
+            'phone_number': '9876543210',
+        })
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['customer_id'], self.ravi.customer_id)
+        self.assertEqual(Customer.objects.filter(phone_normalized='9876543210').count(), 1)
+
+    def test_concurrent_registration_gets_409(self):
+        # the other request inserted between our lookup and our insert
+        with mock.patch('core.views.find_by_phone', side_effect=[None, self.ravi.customer_id]):
+            response = self.client.post(reverse('register-customer'), {
+                'first_name': 'Ravi', 'last_name': 'Again', 'age': 31, 'monthly_income': 60000,
+                'phone_number': '+91 98765 43210',
+            })
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['customer_id'], self.ravi.customer_id)
+        self.assertEqual(Customer.objects.filter(phone_normalized='9876543210').count(), 1)
+
+    def test_import_rejects_rows_reusing_a_phone(self):
+        row = {'First Name': 'New', 'Last Name': 'Customer', 'Age': 30, 'Monthly Salary': 50000, 'Approved Limit': 1800000}
+        loaded, rejected = load_customers([
+            (1, {**row, 'Customer ID': 9001, 'Phone Number': '9876543210'}),
+            (2, {**row, 'Customer ID': 9002, 'Phone Number': '8000000001'}),
+            (3, {**row, 'Customer ID': 9003, 'Phone Number': '08000000001'}),
+            (4, {**row, 'Customer ID': self.ravi.customer_id, 'Phone Number': '9876543210', 'First Name': 'Ravi'}),
+        ])
+        self.assertEqual(loaded, 2)
+        self.assertEqual(rejected, [
+            (1, f"phone number belongs to customer {self.ravi.customer_id}"),
+            (3, "phone number belongs to customer 9002"),
+        ])
+        self.assertEqual(find_by_phone('8000000001'), 9002)
+
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_BUCKETS={'check-eligibility': (1, 2), 'create-loan': (1, 1)})
+class ThrottlingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = Customer.objects.create(
+            first_name='Throttle', last_name='User', phone_number='9000000011', age=30,
+            monthly_income=50000, approved_limit=1800000,
+        )
+        self.body = json.dumps({
+            'customer_id': self.customer.customer_id, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12,
+        })
+
+    def check(self, path='check-eligibility', **extra):
+        return self.client.post(reverse(path), data=self.body, content_type='application/json', **extra)
+
+    def test_token_bucket_refills_at_the_configured_rate(self):
+        self.assertEqual([take_token('check-eligibility', 'partner', now=100) for _ in range(3)], [0, 0, 1])
+        self.assertEqual(take_token('check-eligibility', 'partner', now=100.5), 0.5)
+        self.assertEqual(take_token('check-eligibility', 'partner', now=101.5), 0)
+
+    def test_concurrent_requests_cannot_overdraw_the_bucket(self):
+        barrier = threading.Barrier(8)
+
+        def take():
+            barrier.wait()
+            return take_token('check-eligibility', 'burst', now=100)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            waits = list(pool.map(lambda _: take(), range(8)))
+        self.assertEqual(waits.count(0), 2)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://redis:6379/1',
+    }})
+    def test_redis_buckets_are_taken_in_one_script(self):
+        with mock.patch('django.core.cache.backends.redis.RedisCacheClient.get_client') as get_client:
+            script = get_client.return_value.register_script.return_value
+            script.return_value = b'0.5'
+            self.assertEqual(take_token('check-eligibility', 'partner', now=100), 0.5)
+        get_client.return_value.register_script.assert_called_once_with(TAKE_TOKEN_SCRIPT)
+        script.assert_called_once_with(keys=[':1:throttle:check-eligibility:partner'], args=[1, 2, 100, 3])
+
+    def test_budgets_are_per_client_and_per_endpoint(self):
+        self.assertEqual([self.check().status_code for _ in range(2)], [200, 200])
+        throttled = self.check()
+        self.assertEqual(throttled.status_code, 429)
+        self.assertEqual(throttled['Retry-After'], '1')
+        # the async view draws from the same bucket
+        self.assertEqual(self.check('async-check-eligibility').status_code, 429)
+
+        self.assertEqual(self.check(REMOTE_ADDR='10.0.0.2').status_code, 200)
+        self.assertEqual(self.check('create-loan').status_code, 201)
+        self.assertEqual(self.check('create-loan').status_code, 429)
+
+        with override_settings(THROTTLE_ENABLED=False):
+            self.assertEqual(self.check().status_code, 200)
+
+    @override_settings(ELIGIBILITY_MAX_IN_FLIGHT=0, ADMISSION_RETRY_AFTER=2)
+    def test_eligibility_is_shed_when_the_limiter_is_full(self):
+        rejected = ELIGIBILITY_LIMITER.rejected
+        for path in ('check-eligibility', 'async-check-eligibility'):
+            response = self.check(path)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '2')
+        self.assertEqual(ELIGIBILITY_LIMITER.rejected, rejected + 2)
+        self.assertEqual(ELIGIBILITY_LIMITER.in_flight, 0)
+
+        metrics = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('admission_limit{limiter="eligibility"} 0', metrics)
+        self.assertIn(f'admission_rejected_total{{limiter="eligibility"}} {rejected + 2}', metrics)
+        self.assertIn('throttle_bucket_burst{scope="check-eligibility"} 2', metrics)
+        self.assertIn('throttle_requests_total{scope="check-eligibility",outcome="allowed"}', metrics)
+
+
+class LoanArchiveTest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name="Archive", last_name="User", phone_number="6100000000",
+            age=45, monthly_income=200000, approved_limit=7200000
+        )
+        self.today = date.today()
+        self.old, self.this_year, self.active = Loan.objects.bulk_create([
+            Loan(
+                customer=self.customer, loan_amount=Decimal(amount), interest_rate=10, tenure=12,
+                monthly_installment=Decimal('1000.00'), emis_paid_on_time=on_time, start_date=start, end_date=end,
+            )
+            for amount, on_time, start, end in [
+                ('50000.00', 1, date(2019, 1, 1), date(2020, 1, 1)),
+                ('30000.00', 0, date(self.today.year, 1, 1), self.today - timedelta(days=1)),
+                ('90000.00', 1, date(2019, 6, 1), self.today + timedelta(days=365)),
+            ]
+        ])
+        Customer.objects.filter(pk=self.customer.pk).refresh_loan_totals()
+        rebuild_credit_scores([self.customer.customer_id])
+
+    def test_moves_closed_loans_and_keeps_scores(self):
+        profile = get_credit_profile(self.customer.customer_id)
+        score = CreditScore.objects.get(pk=self.customer.pk)
+        portfolio = load_portfolio()
+
+        self.assertEqual(archive_loans(), {'archived': 2})
+
+        self.assertEqual(list(Loan.objects.values_list('loan_id', flat=True)), [self.active.loan_id])
+        self.assertEqual(
+            sorted(ArchivedLoan.objects.values_list('loan_id', flat=True)), [self.old.loan_id, self.this_year.loan_id]
+        )
+        self.assertEqual(
+            sorted(LoanRollup.objects.values_list('start_year', 'loan_count', 'on_time_count', 'total_loan_volume')),
+            [(2019, 1, 1, Decimal('50000.00')), (self.today.year, 1, 0, Decimal('30000.00'))],
+        )
+        archived_profile = get_credit_profile(self.customer.customer_id)
+        for component in CreditScore.COMPONENTS:
+            self.assertEqual(getattr(archived_profile, component), getattr(profile, component), component)
+        rebuild_credit_scores([self.customer.customer_id])
+        self.assertEqual(CreditScore.objects.get(pk=self.customer.pk).score, score.score)
+        self.assertEqual(list(find_inconsistent_scores()), [])
+        Customer.objects.all().refresh_loan_totals()
+        self.assertEqual(Customer.objects.get(pk=self.customer.pk).num_loans, 3)
+
+        archived_portfolio = load_portfolio()
+        for column in ('loan_count', 'on_time_count', 'current_year_loans', 'total_volume_paise'):
+            self.assertEqual(list(getattr(archived_portfolio, column)), list(getattr(portfolio, column)), column)
+
+    def test_rollups_accumulate_across_runs(self):
+        self.assertEqual(archive_closed_loans(today=date(2021, 1, 1)), 1)
+        self.assertEqual(archive_closed_loans(today=date(2021, 1, 1)), 0)
+        Loan.objects.filter(pk=self.active.pk).update(end_date=date(2020, 6, 1))
+        self.assertEqual(archive_closed_loans(batch_size=1), 2)
+        rollup = LoanRollup.objects.get(customer=self.customer, start_year=2019)
+        self.assertEqual((rollup.loan_count, rollup.on_time_count, rollup.total_loan_volume), (2, 2, Decimal('140000.00')))
+        self.assertFalse(Loan.objects.exists())
+
+    def test_views_find_archived_loans(self):
+        archive_closed_loans()
+        old_id = self.old.loan_id
+
+        response = self.client.get(reverse('loan-detail', args=[old_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['loan_amount'], '50000.00')
+        self.assertEqual(response.json()['customer']['customer_id'], self.customer.customer_id)
+        self.assertEqual(self.client.get(reverse('async-loan-detail', args=[old_id])).json(), response.json())
+        self.assertEqual(self.client.get(reverse('loan-schedule', args=[old_id])).json()['loan_id'], old_id)
+
+        for name in ('customer-loans', 'async-customer-loans'):
+            url = reverse(name, args=[self.customer.customer_id])
+            ids = [loan['loan_id'] for loan in self.client.get(url).json()]
+            self.assertEqual(ids, [self.old.loan_id, self.this_year.loan_id, self.active.loan_id], name)
+            active = self.client.get(url, {'active': 'true'}).json()['results']
+            self.assertEqual([loan['loan_id'] for loan in active], [self.active.loan_id])
+            closed = self.client.get(url, {'active': 'false', 'limit': 1}).json()
+            self.assertEqual([loan['loan_id'] for loan in closed['results']], [self.old.loan_id])
+            rest = self.client.get(url, {'active': 'false', 'cursor': closed['next_cursor']}).json()
+            self.assertEqual([loan['loan_id'] for loan in rest['results']], [self.this_year.loan_id])
+
+        url = reverse('customer-loans', args=[self.customer.customer_id])
+        response = self.client.get(url, {'stream': 'true', 'fields': 'loan_amount'})
+        self.assertEqual(
+            json.loads(b''.join(response.streaming_content)),
+            [{'loan_amount': '50000.00'}, {'loan_amount': '30000.00'}, {'loan_amount': '90000.00'}],
+        )
+
+    def test_references_keep_the_loan_id(self):
+        application = LoanApplication.objects.create(
+            customer=self.customer, loan_amount=50000, interest_rate=10, tenure=12,
+            status=LoanApplication.APPROVED, loan=self.old,
+        )
+        archive_closed_loans()
+        application.refresh_from_db()
+        self.assertEqual(application.loan_id, self.old.loan_id)
+
+    def test_ingestion_rejects_archived_loans(self):
+        archive_closed_loans()
+        row = {
+            'Customer ID': self.customer.customer_id, 'Loan ID': self.old.loan_id, 'Loan Amount': 50000,
+            'Tenure': 12, 'Interest Rate': 10, 'Monthly payment': 1000, 'EMIs paid on Time': 12,
+            'Date of Approval': date(2019, 1, 1), 'End Date': date(2020, 1, 1),
+        }
+        loaded, rejected = load_loans([(2, row)])
+        self.assertEqual((loaded, rejected), (0, [(2, f"loan {self.old.loan_id} is archived")]))
+        self.assertFalse(Loan.objects.filter(pk=self.old.loan_id).exists())
+
+    def test_new_loans_never_reuse_archived_ids(self):
+        top = Loan.objects.create(
+            customer=self.customer, loan_amount=Decimal('20000.00'), interest_rate=10, tenure=12,
+            monthly_installment=Decimal('1000.00'), emis_paid_on_time=12,
+            start_date=date(2020, 1, 1), end_date=date(2021, 1, 1),
+        )
+        archive_closed_loans()
+        self.assertTrue(ArchivedLoan.objects.filter(pk=top.loan_id).exists())
+        call_command('import_data', '--skip-customers', '--skip-loans', stdout=io.StringIO())
+
+        response = self.client.post(reverse('create-loan'), data=json.dumps({
+            'customer_id': self.customer.customer_id, 'loan_amount': 10000, 'interest_rate': 10, 'tenure': 12,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(response.json()['loan_id'], top.loan_id)
+
+
+class ScoringPolicyTest(EagerCeleryMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        forget_rules()
+        self.addCleanup(forget_rules)
+        self.addCleanup(cache.clear)
+        self.customer = Customer.objects.create(
+            first_name="Policy", last_name="User", phone_number="6200000000",
+            age=35, monthly_income=100000, approved_limit=3600000
+        )
+        self.application = {'customer_id': self.customer.customer_id, 'loan_amount': 100000, 'interest_rate': 10, 'tenure': 12}
+
+    def check(self, name='check-eligibility'):
+        return self.client.post(reverse(name), self.application, content_type='application/json').json()
+
+    def activate(self, policy):
+        with self.captureOnCommitCallbacks(execute=True):
+            activate_policy(policy)
+
+    def test_decision_table_matches_bands(self):
+        rules = ScoringRules()
+        self.assertEqual(rules.bands[51], (True, None, None, ''))
+        self.assertEqual(rules.bands[50], (False, 12, 16, 'Credit score low; interest rate adjusted to 16%.'))
+        self.assertEqual(rules.bands[31][:3], (False, 12, 16))
+        self.assertEqual(rules.bands[30], (False, 16, 20, 'Credit score very low; interest rate adjusted to 20%.'))
+        self.assertEqual(rules.bands[10], (False, None, None, 'Credit score too low for approval.'))
+        self.assertEqual(rules.band(150), rules.bands[100])
+        self.assertEqual(rules.approved_limit(70000), 2500000)
+
+    def test_activated_policy_drives_decisions(self):
+        before = self.check()
+        self.assertEqual((before['approval'], before['policy_version']), (True, 0))
+
+        policy = ScoringPolicy.objects.create(name='stricter', approve_above=95, limit_income_multiple=10)
+        self.activate(policy)
+        self.assertEqual(current_rules().version, policy.pk)
+        for name in ('check-eligibility', 'async-check-eligibility'):
+            after = self.check(name)
+            self.assertEqual(after['corrected_interest_rate'], 16, name)
+            self.assertEqual(after['reason'], 'Credit score low; interest rate adjusted to 16%.')
+            self.assertEqual(after['policy_version'], policy.pk)
+        # activation rebuilt the stored scores under the new policy
+        self.assertEqual(CreditScore.objects.get(pk=self.customer.pk).policy_version, policy.pk)
+
+        response = self.client.post(reverse('register-customer'), {
+            'first_name': 'New', 'last_name': 'Limit', 'phone_number': '6200000001', 'age': 30, 'monthly_income': 50000,
+        }, content_type='application/json')
+        self.assertEqual(Customer.objects.get(pk=response.json()['customer_id']).approved_limit, 500000)
+
+        self.activate(None)
+        self.assertEqual(self.check()['policy_version'], 0)
+        self.assertEqual(list(find_inconsistent_scores()), [])
+
+    def test_rescore_skips_superseded_version(self):
+        policy = ScoringPolicy.objects.create(name='stricter', approve_above=95)
+        self.assertEqual(rescore_for_policy(policy.pk), {'credit_scores': 0, 'skipped': True})
+        self.assertEqual(CreditScore.objects.get(pk=self.customer.pk).policy_version, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            activate_policy(policy)
+        self.assertEqual(rescore_for_policy(policy.pk), {'credit_scores': 1})
+
+    def test_other_processes_reload_after_check_interval(self):
+        self.assertEqual(current_rules().version, 0)
+        policy = ScoringPolicy.objects.create(approve_above=95)
+        # as another process's activate_policy() would leave it
+        ScoringPolicy.objects.filter(pk=policy.pk).update(is_active=True)
+        cache.set(POLICY_VERSION_KEY, policy.pk)
+
+        with self.settings(SCORING_POLICY_CHECK_SECONDS=60):
+            self.assertEqual(current_rules().version, 0)
+        with self.settings(SCORING_POLICY_CHECK_SECONDS=0):
+            self.assertEqual(current_rules().version, policy.pk)
+            self.assertEqual(current_rules().approve_above, 95)
+
+    def test_command_switches_policies(self):
+        policy = ScoringPolicy.objects.create(name='cmd')
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('scoring_policy', activate=policy.pk, stdout=out)
+        self.assertIn(f'*    {policy.pk}  cmd  approve_above=50', out.getvalue())
+        self.assertEqual(current_rules().version, policy.pk)
+        with self.assertRaises(CommandError):
+            call_command('scoring_policy', activate=policy.pk + 1, stdout=io.StringIO())
+
+
+
+def setUpModule():
+    # keep core.audit's flusher thread from writing into the test database
+    # from its own connection; tests that want it shorten the interval
+    override = override_settings(DECISION_AUDIT_FLUSH_SECONDS=3600)
+    override.enable()
+    addModuleCleanup(override.disable)
+
+
+def tearDownModule():
+    # whatever the views buffered would otherwise be flushed at exit, after
+    # the test database is gone
+    DECISION_AUDITS.take()
+
+
+@override_settings(DECISION_AUDIT_BATCH_SIZE=3, DECISION_AUDIT_FLUSH_SECONDS=3600)
+class DecisionAuditTest(EagerCeleryMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        DECISION_AUDITS.take()
+        self.addCleanup(DECISION_AUDITS.take)
+        self.customer = Customer.objects.create(
+            first_name="Audit", last_name="User", phone_number="6300000000",
+            age=35, monthly_income=100000, approved_limit=3600000
+        )
+        self.application = {'customer_id': self.customer.customer_id, 'loan_amount': 100000, 'interest_rate': 10, 'tenure': 12}
+
+    def check(self, name='check-eligibility'):
+        return self.client.post(reverse(name), self.application, content_type='application/json').json()
+
+    def test_decisions_are_written_in_batches(self):
+        first = self.check()
+        self.check('async-check-eligibility')
+        self.assertEqual(DecisionAudit.objects.count(), 0)
+        self.assertEqual(len(DECISION_AUDITS), 2)
+
+        self.client.post(reverse('check-eligibility-batch'), data=json.dumps([self.application]), content_type='application/json')
+        self.assertEqual(len(DECISION_AUDITS), 0)
+        self.assertEqual(
+            list(DecisionAudit.objects.order_by('id').values_list('source', flat=True)),
+            ['check-eligibility', 'async-check-eligibility', 'check-eligibility-batch'],
+        )
+        audit = DecisionAudit.objects.order_by('id').first()
+        self.assertEqual(audit.customer_id, self.customer.customer_id)
+        self.assertEqual((audit.loan_amount, audit.interest_rate, audit.tenure), (100000, 10, 12))
+        self.assertEqual(audit.approval, first['approval'])
+        self.assertEqual(audit.policy_version, first['policy_version'])
+        self.assertEqual(audit.monthly_installment, first['monthly_installment'])
+        self.assertEqual((audit.loan_count, audit.active_emi_total), (0, Decimal('0')))
+        self.assertIsNotNone(audit.credit_score)
+
+    def test_loan_applications_are_audited(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('loan-application-create'), self.application, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        flush_on_shutdown()
+        self.assertEqual(DecisionAudit.objects.get().source, 'loan-application')
+
+    def test_broker_down_writes_inline(self):
+        written_inline = DECISION_AUDITS.written_inline
+        with mock.patch.object(write_decision_audits, 'apply_async', side_effect=OSError('connection refused')):
+            for _ in range(3):
+                self.check()
+        self.assertEqual(DecisionAudit.objects.count(), 3)
+        self.assertEqual(DECISION_AUDITS.written_inline, written_inline + 3)
+
+    def test_quiet_process_flushes_within_the_interval(self):
+        self.check()
+        with mock.patch.object(write_decision_audits, 'apply_async') as apply_async, \
+                override_settings(DECISION_AUDIT_FLUSH_SECONDS=0.05):
+            # no further decisions arrive; the flusher thread has to notice by itself
+            deadline = time.monotonic() + 5
+            while len(DECISION_AUDITS) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(len(DECISION_AUDITS), 0)
+        records = apply_async.call_args[0][0][0]
+        self.assertEqual([record['source'] for record in records], ['check-eligibility'])
+
+    def test_shutdown_flushes_buffer(self):
+        self.check()
+        self.assertEqual(DecisionAudit.objects.count(), 0)
+        flush_on_shutdown()
+        self.assertEqual(DecisionAudit.objects.count(), 1)
+        self.assertEqual(len(DECISION_AUDITS), 0)
+
+    @override_settings(DECISION_AUDIT_MAX_BUFFERED=4)
+    def test_failed_writes_keep_oldest_up_to_bound(self):
+        dropped = DECISION_AUDITS.dropped
+        records = [{'n': n} for n in range(3)]
+        with mock.patch('core.audit.write_records', side_effect=DatabaseError('down')):
+            for record in records:
+                DECISION_AUDITS.add(record)
+            self.assertEqual(DECISION_AUDITS.flush(inline=True), 0)
+            self.assertEqual(len(DECISION_AUDITS), 3)
+            for n in range(3, 6):
+                DECISION_AUDITS.add({'n': n})
+            DECISION_AUDITS.flush(inline=True)
+        self.assertEqual([record['n'] for record in DECISION_AUDITS.take()], [2, 3, 4, 5])
+        self.assertEqual(DECISION_AUDITS.dropped, dropped + 2)
+        self.assertIn('decision_audit_dropped_total', self.client.get(reverse('metrics')).content.decode())
+
+    def test_one_bad_record_does_not_sink_its_batch(self):
+        self.check()
+        self.check('async-check-eligibility')
+        good = DECISION_AUDITS.take()
+        bad = {**good[0], 'loan_amount': float('nan')}
+        dropped = DECISION_AUDITS.dropped
+        self.assertEqual(write_decision_audits.delay([good[0], bad, good[1]]).get(), 2)
+        self.assertEqual(DecisionAudit.objects.count(), 2)
+        self.assertEqual(DECISION_AUDITS.dropped, dropped + 1)
+
+        # the inline path drops it too instead of putting it back
+        DECISION_AUDITS.add(bad)
+        DECISION_AUDITS.add(good[0])
+        DECISION_AUDITS.flush(inline=True)
+        self.assertEqual((len(DECISION_AUDITS), DecisionAudit.objects.count()), (0, 3))
+
+    def test_non_finite_decisions_are_not_buffered(self):
+        entry = get_materialized_entry(self.customer.customer_id)
+        score = (entry['credit_score'], entry['reason'])
+        result = evaluate_eligibility(entry['profile'], 100000, 10, 12, score=score)
+        self.assertIsNotNone(decision_record('check-eligibility', entry['profile'], score, 100000, 10, 12, result))
+        for loan_amount, interest_rate in [(float('nan'), 10), (100000, float('inf')), (Decimal('NaN'), 10)]:
+            record = decision_record('check-eligibility', entry['profile'], score, loan_amount, interest_rate, 12, result)
+            self.assertIsNone(record)
+            record_decision(record)
+        self.assertEqual(len(DECISION_AUDITS), 0)
+
+    def test_query_api_filters_and_pages(self):
+        other = Customer.objects.create(
+            first_name="Other", last_name="User", phone_number="6300000001",
+            age=35, monthly_income=100000, approved_limit=3600000
+        )
+        for _ in range(3):
+            self.check()
+        self.application['customer_id'] = other.customer_id
+        self.check()
+        flush_on_shutdown()
+        start = timezone.now() - timedelta(days=1)
+        DecisionAudit.objects.filter(customer_id=other.customer_id).update(created_at=start)
+
+        url = reverse('decision-audits')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(User.objects.create_user('auditor', is_staff=True))
+
+        params = {'customer_id': self.customer.customer_id, 'limit': 2}
+        page = self.client.get(url, params).json()
+        self.assertEqual([row['customer_id'] for row in page['results']], [self.customer.customer_id] * 2)
+        self.assertIsNotNone(page['next_cursor'])
+        rest = self.client.get(url, {**params, 'cursor': page['next_cursor']}).json()
+        self.assertEqual(len(rest['results']), 1)
+        self.assertIsNone(rest['next_cursor'])
+        ids = [row['id'] for row in page['results'] + rest['results']]
+        self.assertEqual(len(set(ids)), 3)
+
+        window = {'since': (start - timedelta(hours=1)).isoformat(), 'until': (start + timedelta(hours=1)).isoformat()}
+        results = self.client.get(url, window).json()['results']
+        self.assertEqual([row['customer_id'] for row in results], [other.customer_id])
 
+        self.assertEqual(self.client.get(url, {'since': window['until'], 'until': window['since']}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'cursor': 999999}).status_code, 400)
 
 
 
@@ -0,0 +1,197 @@
+"""
+Rate limiting and admission control for the eligibility and booking endpoints.
+
+TokenBucketThrottle gives each client a token bucket per endpoint scope
+(a view's throttle_scope, sized by THROTTLE_BUCKETS), kept in the default
+cache so every worker shares it. A request finding the bucket empty gets 429
+with Retry-After. On Redis a bucket is refilled and taken from in one Lua
+script, so a client's concurrent requests cannot all read the same full
+bucket; the in-process cache (tests, local runs) does the same under a lock.
+
+ConcurrencyLimiter caps in-flight eligibility computations per process and
+sheds the excess with 503 and Retry-After, instead of letting them queue
+for database connections that bookings need too.
+
+Both report their state on /metrics/ (instrumentation.metric_collectors).
+Like the histograms there, the counters are per process.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+
+from core import instrumentation
+
+_lock = threading.Lock()
+_bucket_lock = threading.Lock()
+_throttle_counts = {}
+
+# KEYS[1]: the bucket; ARGV: rate, burst, now, ttl. Returns the wait as a
+# string, since Redis truncates Lua numbers to integers.
+TAKE_TOKEN_SCRIPT = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(now - updated, 0) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return tostring(wait)
+"""
+
+
+def _count(scope, outcome):
+    with _lock:
+        _throttle_counts[scope, outcome] = _throttle_counts.get((scope, outcome), 0) + 1
+
+
+def take_token(scope, ident, now=None):
+    """
+    Take a token from ident's bucket for scope. Returns 0, or the seconds
+    until the bucket has a token again.
+    """
+    rate, burst = settings.THROTTLE_BUCKETS[scope]
+    now = time.time() if now is None else now
+    key = f'throttle:{scope}:{ident}'
+    # an expired entry reads as a full bucket, which it would be by then
+    ttl = math.ceil(burst / rate) + 1
+    cache = caches['default']
+    if isinstance(cache, RedisCache):
+        client = cache._cache.get_client(key, write=True)
+        script = client.register_script(TAKE_TOKEN_SCRIPT)
+        wait = float(script(keys=[cache.make_and_validate_key(key)], args=[rate, burst, now, ttl]))
+    else:
+        with _bucket_lock:
+            tokens, updated = cache.get(key) or (burst, now)
+            tokens = min(burst, tokens + max(now - updated, 0) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            cache.set(key, (tokens, now), timeout=ttl)
+    _count(scope, 'throttled' if wait else 'allowed')
+    return wait
+
+
+def client_ident(request):
+    """The authenticated user, else the client address (honouring NUM_PROXIES)."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user-{user.pk}'
+    return BaseThrottle().get_ident(request)
+
+
+def throttle_wait(scope, request):
+    """take_token() for the request's client; 0 when throttling is off or scope has no bucket."""
+    if not settings.THROTTLE_ENABLED or scope not in settings.THROTTLE_BUCKETS:
+        return 0
+    return take_token(scope, client_ident(request))
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttles views that set throttle_scope to a THROTTLE_BUCKETS key."""
+
+    def allow_request(self, request, view):
+        self.wait_seconds = throttle_wait(getattr(view, 'throttle_scope', None), request)
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class Overloaded(APIException):
+    status_code = 503
+    default_detail = 'Too many requests in progress, retry shortly.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait):
+        super().__init__()
+        # DRF's exception handler turns this into a Retry-After header
+        self.wait = wait
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name, limit_setting):
+        self.name = name
+        self.limit_setting = limit_setting
+        self.in_flight = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    @property
+    def limit(self):
+        return getattr(settings, self.limit_setting)
+
+    def acquire(self):
+        with self.lock:
+            if self.in_flight >= self.limit:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the limiter's slots; raises Overloaded when none is free."""
+        if not self.acquire():
+            raise Overloaded(settings.ADMISSION_RETRY_AFTER)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+ELIGIBILITY_LIMITER = ConcurrencyLimiter('eligibility', 'ELIGIBILITY_MAX_IN_FLIGHT')
+LIMITERS = [ELIGIBILITY_LIMITER]
+
+
+def admitted(limiter):
+    """Run a DRF handler method in one of limiter's slots."""
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            with limiter.slot():
+                return handler(self, request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_limiter_metrics():
+    lines = [
+        '# HELP admission_in_flight Requests holding a concurrency limiter slot.',
+        '# TYPE admission_in_flight gauge',
+    ]
+    lines += [f'admission_in_flight{{limiter="{l.name}"}} {l.in_flight}' for l in LIMITERS]
+    lines += ['# HELP admission_limit Concurrency limiter size.', '# TYPE admission_limit gauge']
+    lines += [f'admission_limit{{limiter="{l.name}"}} {l.limit}' for l in LIMITERS]
+    lines += ['# HELP admission_rejected_total Requests shed with 503.', '# TYPE admission_rejected_total counter']
+    lines += [f'admission_rejected_total{{limiter="{l.name}"}} {l.rejected}' for l in LIMITERS]
+
+    lines += ['# HELP throttle_bucket_rate Tokens added per second.', '# TYPE throttle_bucket_rate gauge']
+    lines += [f'throttle_bucket_rate{{scope="{scope}"}} {rate}' for scope, (rate, _) in settings.THROTTLE_BUCKETS.items()]
+    lines += ['# HELP throttle_bucket_burst Bucket size.', '# TYPE throttle_bucket_burst gauge']
+    lines += [f'throttle_bucket_burst{{scope="{scope}"}} {burst}' for scope, (_, burst) in settings.THROTTLE_BUCKETS.items()]
+    lines += ['# HELP throttle_requests_total Throttled and allowed requests.', '# TYPE throttle_requests_total counter']
+    with _lock:
+        counts = sorted(_throttle_counts.items())
+    lines += [f'throttle_requests_total{{scope="{scope}",outcome="{outcome}"}} {n}' for (scope, outcome), n in counts]
+    return lines
+
+
+instrumentation.metric_collectors.append(render_limiter_metrics)
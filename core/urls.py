@@ -1,11 +1,25 @@
 
 from django.urls import path
+from .async_views import AsyncCheckEligibilityView, AsyncCustomerLoansView, AsyncLoanDetailView
 from .views import (
     RegisterCustomerView,
     CheckEligibilityView,
+    BatchCheckEligibilityView,
+    CreditProfileCacheStatsView,
     CreateLoanView,
+    BulkCreateLoanView,
     LoanDetailView,
+    LoanScheduleView,
     CustomerLoansView,
+    CustomerSearchView,
+    DecisionAuditListView,
+    PortfolioExportView,
+    IngestionJobCreateView,
+    IngestionJobStatusView,
+    IngestionJobResumeView,
+    LoanApplicationCreateView,
+    LoanApplicationStatusView,
+    metrics,
     trigger_task,
     home
 )
@@ -14,8 +28,25 @@ urlpatterns = [
     path('', home, name='home'),
     path('register-customer/', RegisterCustomerView.as_view(), name='register-customer'),
     path('check-eligibility/', CheckEligibilityView.as_view(), name='check-eligibility'),
+    path('check-eligibility/batch/', BatchCheckEligibilityView.as_view(), name='check-eligibility-batch'),
+    path('credit-profile-cache/stats/', CreditProfileCacheStatsView.as_view(), name='credit-profile-cache-stats'),
     path('create-loan/', CreateLoanView.as_view(), name='create-loan'),
+    path('create-loan/bulk/', BulkCreateLoanView.as_view(), name='create-loan-bulk'),
     path('loan/<int:loan_id>/', LoanDetailView.as_view(), name='loan-detail'),
+    path('loan/<int:loan_id>/schedule/', LoanScheduleView.as_view(), name='loan-schedule'),
     path('customer-loans/<int:customer_id>/', CustomerLoansView.as_view(), name='customer-loans'),
+    # async variants of the read paths, for ASGI servers
+    path('async/check-eligibility/', AsyncCheckEligibilityView.as_view(), name='async-check-eligibility'),
+    path('async/loan/<int:loan_id>/', AsyncLoanDetailView.as_view(), name='async-loan-detail'),
+    path('async/customer-loans/<int:customer_id>/', AsyncCustomerLoansView.as_view(), name='async-customer-loans'),
+    path('customers/search/', CustomerSearchView.as_view(), name='customer-search'),
+    path('decision-audits/', DecisionAuditListView.as_view(), name='decision-audits'),
+    path('export/<str:dataset>.<str:file_format>', PortfolioExportView.as_view(), name='portfolio-export'),
+    path('ingestion/', IngestionJobCreateView.as_view(), name='ingestion-create'),
+    path('ingestion/<int:job_id>/', IngestionJobStatusView.as_view(), name='ingestion-status'),
+    path('ingestion/<int:job_id>/resume/', IngestionJobResumeView.as_view(), name='ingestion-resume'),
+    path('loan-applications/', LoanApplicationCreateView.as_view(), name='loan-application-create'),
+    path('loan-applications/<int:application_id>/', LoanApplicationStatusView.as_view(), name='loan-application-status'),
+    path('metrics/', metrics, name='metrics'),
     path('trigger-task/', trigger_task, name='trigger-task'),
 ]
@@ -0,0 +1,215 @@
+"""
+Vectorized credit scoring over the whole portfolio.
+
+Mirrors core.credit.score_profile / evaluate_eligibility, but works on
+column arrays pulled with values_list, so re-scoring every customer under
+a different ScoringRules is one pass over NumPy arrays instead of one
+eligibility request per customer.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from django.utils import timezone
+
+from core.credit import DEFAULT_RULES
+from core.models import Customer, Loan, LoanRollup
+
+# Reason codes, index into REASONS
+OK, LIMIT_EXCEEDED, EMIS_EXCEED_INCOME, LOW_SCORE, VERY_LOW_SCORE, SCORE_TOO_LOW, EMI_EXCEEDS_INCOME = range(7)
+
+
+def reasons(rules=DEFAULT_RULES):
+    return [
+        "",
+        "Current loans exceed approved limit.",
+        f"Total EMIs exceed {rules.emi_income_cap:.0%} of income.",
+        f"Credit score low; interest rate adjusted to {rules.mid_band_rate:g}%.",
+        f"Credit score very low; interest rate adjusted to {rules.low_band_rate:g}%.",
+        "Credit score too low for approval.",
+        f"EMI exceeds {rules.emi_income_cap:.0%} of income.",
+    ]
+
+
+@dataclass
+class Portfolio:
+    """Per-customer columns; every array is aligned on customer_id."""
+    customer_id: np.ndarray
+    monthly_income: np.ndarray
+    approved_limit: np.ndarray
+    loan_count: np.ndarray
+    on_time_count: np.ndarray
+    current_year_loans: np.ndarray
+    # loan sums are kept in integer paise so they add up exactly like the Decimal sums
+    total_volume_paise: np.ndarray
+    active_principal_paise: np.ndarray
+    active_emi_paise: np.ndarray
+
+    def __len__(self):
+        return len(self.customer_id)
+
+
+def _paise(values):
+    return np.rint(np.asarray(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+def load_portfolio(today=None, chunk_size=10000):
+    """Pull Customer and Loan columns and aggregate loans per customer with bincount."""
+    today = today or timezone.localdate()
+
+    customers = list(
+        Customer.objects.order_by('customer_id')
+        .values_list('customer_id', 'monthly_income', 'approved_limit')
+        .iterator(chunk_size=chunk_size)
+    )
+    customer_id = np.array([c[0] for c in customers], dtype=np.int64)
+    monthly_income = np.array([c[1] for c in customers], dtype=np.float64)
+    approved_limit = np.array([c[2] for c in customers], dtype=np.float64)
+
+    loans = list(
+        Loan.objects.values_list(
+            'customer_id', 'loan_amount', 'monthly_installment', 'emis_paid_on_time', 'start_date', 'end_date'
+        ).iterator(chunk_size=chunk_size)
+    )
+    size = len(customer_id)
+    if loans:
+        loan_customer = np.searchsorted(customer_id, np.array([l[0] for l in loans], dtype=np.int64))
+        amount = _paise([l[1] for l in loans])
+        installment = _paise([l[2] for l in loans])
+        on_time = np.array([l[3] for l in loans], dtype=np.int64) == 1
+        start_year = np.array([l[4].year for l in loans], dtype=np.int64)
+        active = np.array([l[5] for l in loans], dtype='datetime64[D]') >= np.datetime64(today, 'D')
+    else:
+        loan_customer = amount = installment = start_year = np.zeros(0, dtype=np.int64)
+        on_time = active = np.zeros(0, dtype=bool)
+
+    # archived loans only add to the counts and the volume (core.archive)
+    rollups = list(
+        LoanRollup.objects.values_list('customer_id', 'start_year', 'loan_count', 'on_time_count', 'total_loan_volume')
+    )
+    rollup_customer = np.searchsorted(customer_id, np.array([r[0] for r in rollups], dtype=np.int64))
+    rollup_year = np.array([r[1] for r in rollups], dtype=np.int64)
+    rollup_count = np.array([r[2] for r in rollups], dtype=np.int64)
+    rollup_on_time = np.array([r[3] for r in rollups], dtype=np.int64)
+    rollup_volume = _paise([r[4] for r in rollups])
+
+    def per_customer(weights=None, archived=None):
+        totals = np.bincount(loan_customer, weights=weights, minlength=size)
+        if archived is not None:
+            totals = totals + np.bincount(rollup_customer, weights=archived, minlength=size)
+        return np.rint(totals).astype(np.int64)
+
+    return Portfolio(
+        customer_id=customer_id,
+        monthly_income=monthly_income,
+        approved_limit=approved_limit,
+        loan_count=per_customer(archived=rollup_count),
+        on_time_count=per_customer(on_time, rollup_on_time),
+        current_year_loans=per_customer(start_year == today.year, np.where(rollup_year == today.year, rollup_count, 0)),
+        total_volume_paise=per_customer(amount, rollup_volume),
+        active_principal_paise=per_customer(np.where(active, amount, 0)),
+        active_emi_paise=per_customer(np.where(active, installment, 0)),
+    )
+
+
+def calculate_emi(principal, annual_rate, tenure):
+    """Array version of core.loan_math.calculate_emi; arguments broadcast."""
+    P = np.asarray(principal, dtype=np.float64)
+    r = np.asarray(annual_rate, dtype=np.float64) / (12 * 100)
+    n = np.asarray(tenure, dtype=np.int64)
+
+    growth = np.power(1 + r, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        emi = np.where(r > 0, (P * r * growth) / (growth - 1), P / n)
+    return np.round(emi, 2)
+
+
+def score_portfolio(portfolio, rules=DEFAULT_RULES):
+    """Return (credit_score, reason_code) arrays, like core.credit.score_profile."""
+    count = portfolio.loan_count
+    with np.errstate(divide='ignore', invalid='ignore'):
+        on_time_ratio = np.where(count > 0, portfolio.on_time_count / np.maximum(count, 1), 1.0)
+
+    raw = (
+        on_time_ratio * 50 +
+        (1 / (count + 1)) * 30 +
+        np.where(portfolio.current_year_loans > 0, 10, 0) +
+        np.where(portfolio.approved_limit * 100 > portfolio.total_volume_paise, 10, 0)
+    )
+    credit_score = np.minimum(100, np.trunc(raw).astype(np.int64))
+    reason = np.full(len(portfolio), OK, dtype=np.int8)
+
+    over_limit = portfolio.active_principal_paise > portfolio.approved_limit * 100
+    credit_score[over_limit] = 0
+    reason[over_limit] = LIMIT_EXCEEDED
+
+    emis_over_cap = portfolio.active_emi_paise > rules.emi_income_cap * portfolio.monthly_income * 100
+    credit_score[emis_over_cap] = 0
+    reason[emis_over_cap] = EMIS_EXCEED_INCOME
+
+    return credit_score, reason
+
+
+def evaluate_portfolio(portfolio, loan_amount, interest_rate, tenure, rules=DEFAULT_RULES):
+    """
+    Evaluate one application per customer; loan_amount, interest_rate and
+    tenure are scalars or arrays aligned with the portfolio.
+
+    Returns a dict of arrays: credit_score, approval, corrected_interest_rate,
+    monthly_installment and reason (codes into reasons(rules)).
+    """
+    size = len(portfolio)
+    interest_rate = np.broadcast_to(np.asarray(interest_rate, dtype=np.float64), (size,))
+    credit_score, reason = score_portfolio(portfolio, rules)
+
+    top = credit_score > rules.approve_above
+    mid = (credit_score > rules.mid_band_floor) & ~top
+    low = (credit_score > rules.low_band_floor) & (credit_score <= rules.mid_band_floor)
+    mid_correct = mid & (interest_rate <= rules.mid_band_min_rate)
+    low_correct = low & (interest_rate <= rules.low_band_min_rate)
+
+    approval = top | (mid & ~mid_correct) | (low & ~low_correct)
+    corrected_interest_rate = np.where(
+        mid_correct, rules.mid_band_rate, np.where(low_correct, rules.low_band_rate, interest_rate)
+    )
+    reason = np.where(mid_correct, LOW_SCORE, np.where(low_correct, VERY_LOW_SCORE, reason))
+    rejected = ~(top | mid | low)
+    reason = np.where(rejected & (reason == OK), SCORE_TOO_LOW, reason)
+
+    emi = calculate_emi(loan_amount, corrected_interest_rate, tenure)
+    emi = np.broadcast_to(emi, (size,))
+    emi_over_cap = emi > rules.emi_income_cap * portfolio.monthly_income
+    approval = approval & ~emi_over_cap
+    reason = np.where(emi_over_cap, EMI_EXCEEDS_INCOME, reason)
+
+    return {
+        'credit_score': credit_score,
+        'approval': approval,
+        'corrected_interest_rate': corrected_interest_rate,
+        'monthly_installment': emi,
+        'reason': reason.astype(np.int8),
+    }
+
+
+def summarize(portfolio, results, rules=DEFAULT_RULES):
+    """Portfolio level counts for a what-if run."""
+    labels = reasons(rules)
+    approval = results['approval']
+    score = results['credit_score']
+    reason_counts = np.bincount(results['reason'], minlength=len(labels))
+
+    return {
+        'customers': int(len(portfolio)),
+        'approved': int(approval.sum()),
+        'rejected': int((~approval).sum()),
+        'rate_corrected': int((results['reason'] == LOW_SCORE).sum() + (results['reason'] == VERY_LOW_SCORE).sum()),
+        'mean_credit_score': float(score.mean()) if len(score) else 0.0,
+        'score_bands': {
+            f'>{rules.approve_above}': int((score > rules.approve_above).sum()),
+            f'{rules.mid_band_floor}-{rules.approve_above}': int(
+                ((score > rules.mid_band_floor) & (score <= rules.approve_above)).sum()),
+            f'{rules.low_band_floor}-{rules.mid_band_floor}': int(
+                ((score > rules.low_band_floor) & (score <= rules.mid_band_floor)).sum()),
+            f'<={rules.low_band_floor}': int((score <= rules.low_band_floor).sum()),
+        },
+        'reasons': {label or 'none': int(n) for label, n in zip(labels, reason_counts) if n},
+    }
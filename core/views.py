@@ -1,18 +1,54 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
-from django.http import HttpResponse
-from django.db.models import Sum
-from django.utils.timezone import now
-from core.models import Customer, Loan
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import IsAdminUser
+from rest_framework.reverse import reverse
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from decimal import Decimal
+import math
+from rest_framework.utils.encoders import JSONEncoder
+from core.models import ArchivedLoan, Customer, DecisionAudit, IngestionJob, Loan, LoanApplication
 from core.serializers import (
     CustomerSerializer,
     LoanSerializer,
     EligibilityInputSerializer,
-    LoanDetailSerializer
+    LoanDetailSerializer,
+    IngestionJobCreateSerializer,
+    IngestionJobSerializer,
+    LoanApplicationInputSerializer,
+    CustomerLoansQuerySerializer,
+    CustomerSearchQuerySerializer,
+    CustomerSearchResultSerializer,
+    DecisionAuditQuerySerializer,
+    DecisionAuditSerializer,
+)
+from core.cache import cache_stats, get_cached_entry, get_cached_profiles
+from core.credit import evaluate_eligibility, score_profile
+from core.policy import current_rules
+from core.fast_serializers import fast_serializer
+from core.ingestion import chunked
+from core.instrumentation import render_metrics, timed
+from core.db_routers import ReplicaReadMixin
+from core.search import find_by_phone, search_customers
+from core.throttling import ELIGIBILITY_LIMITER, admitted
+from core.export import DATASETS, csv_chunks, parquet_chunks
+from core.booking import ExposureLimitExceeded, book_loan, book_loans, run_idempotent
+from core.loan_math import end_date, schedule_rows
+from core.archive import customer_loans
+from core.audit import decision_record, record_decision
+from .tasks import (
+    application_payload,
+    process_credit_application,
+    resume_ingestion_job,
+    stale_chunks,
+    start_ingestion_job,
+    test_task,
 )
-from .tasks import process_credit_application
-import math
 
 # Home page view
 from django.shortcuts import render
@@ -34,27 +70,45 @@ class RegisterCustomerView(APIView):
             return Response({"error": "Monthly income must be a number."}, status=status.HTTP_400_BAD_REQUEST)
 
         if 'approved_limit' not in data:
-            approved_limit = round((36 * monthly_income) / 100000) * 100000
-            data['approved_limit'] = approved_limit
+            data['approved_limit'] = current_rules().approved_limit(monthly_income)
 
         serializer = CustomerSerializer(data=data)
         if serializer.is_valid():
+            phone = serializer.validated_data['phone_number']
+            existing = find_by_phone(phone)
+            if existing is not None:
+                return self.already_registered(existing)
             try:
-                customer = serializer.save()
+                with transaction.atomic():
+                    customer = serializer.save()
                 return Response({
                     "message": "Customer registered successfully.",
                     "customer_id": customer.customer_id
                 }, status=status.HTTP_201_CREATED)
+            except IntegrityError:
+                # registered by a concurrent request since find_by_phone (unique_customer_phone)
+                return self.already_registered(find_by_phone(phone))
             except Exception as e:
                 return Response({"error": f"Error saving customer: {e}"}, status=status.HTTP_400_BAD_REQUEST)
         else:
             return Response({"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
+    def already_registered(self, customer_id):
+        return Response({
+            "error": "A customer with this phone number is already registered.",
+            "customer_id": customer_id
+        }, status=status.HTTP_409_CONFLICT)
 
-class CheckEligibilityView(APIView):
+
+class CheckEligibilityView(ReplicaReadMixin, APIView):
+    throttle_scope = 'check-eligibility'
+
+    @admitted(ELIGIBILITY_LIMITER)
     def post(self, request):
         input_serializer = EligibilityInputSerializer(data=request.data)
-        if not input_serializer.is_valid():
+        with timed():
+            valid = input_serializer.is_valid()
+        if not valid:
             return Response(input_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         data = input_serializer.validated_data
@@ -69,102 +123,100 @@ class CheckEligibilityView(APIView):
                 "error": "Loan amount, interest rate, and tenure must all be greater than zero."
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        rules = current_rules()
         try:
-            customer = Customer.objects.get(customer_id=customer_id)
+            entry = get_cached_entry(customer_id, rules)
         except Customer.DoesNotExist:
             return Response({'error': 'Customer not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Past loans and credit score calculation
-        past_loans = Loan.objects.filter(customer=customer)
+        score = (entry['credit_score'], entry['reason'])
+        try:
+            result = evaluate_eligibility(entry['profile'], loan_amount, interest_rate, tenure, rules, score=score)
+        except (ValueError, OverflowError) as e:
+            return Response({'error': f"Error calculating EMI: {e}"}, status=status.HTTP_400_BAD_REQUEST)
 
-        on_time_ratio = 1
-        if past_loans.exists():
-            paid_on_time = past_loans.filter(emis_paid_on_time=True).count()
-            on_time_ratio = paid_on_time / past_loans.count()
+        record_decision(decision_record(
+            'check-eligibility', entry['profile'], score, loan_amount, interest_rate, tenure, result
+        ))
+        return Response(result, status=status.HTTP_200_OK)
 
-        num_loans = past_loans.count()
-        current_year_loans = past_loans.filter(start_date__year=now().year).count()
-        total_loan_volume = past_loans.aggregate(total=Sum('loan_amount'))['total'] or 0
-        current_loans_amount = past_loans.filter(end_date__gte=now()).aggregate(total=Sum('loan_amount'))['total'] or 0
 
-        credit_score = 0
-        reason = ""
+class BatchCheckEligibilityView(ReplicaReadMixin, APIView):
+    max_batch_size = 5000
+    throttle_scope = 'check-eligibility-batch'
 
-        if current_loans_amount > customer.approved_limit:
-            credit_score = 0
-            reason = "Current loans exceed approved limit."
-        else:
-            credit_score = min(100, int(
-                on_time_ratio * 50 +
-                (1 / (num_loans + 1)) * 30 +
-                (10 if current_year_loans > 0 else 0) +
-                (10 if customer.approved_limit > total_loan_volume else 0)
-            ))
+    @admitted(ELIGIBILITY_LIMITER)
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response({"error": "Request body must be a list of applications."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_batch_size:
+            return Response({
+                "error": f"At most {self.max_batch_size} applications are allowed per batch."
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-        total_emis = past_loans.filter(end_date__gte=now()).aggregate(total=Sum('monthly_installment'))['total'] or 0
-        if total_emis > 0.5 * customer.monthly_income:
-            credit_score = 0
-            reason = "Total EMIs exceed 50% of income."
+        # Validate everything in memory first, then fetch all profiles in one query
+        validated = []
+        for item in items:
+            input_serializer = EligibilityInputSerializer(data=item)
+            if input_serializer.is_valid():
+                validated.append((input_serializer.validated_data, None))
+            else:
+                validated.append((None, input_serializer.errors))
 
-        # Loan approval rules
-        approval = False
-        corrected_interest_rate = interest_rate
+        rules = current_rules()
+        profiles = get_cached_profiles((data['customer_id'] for data, _ in validated if data), rules)
 
-        if credit_score > 50:
-            approval = True
-        elif 30 < credit_score <= 50:
-            if interest_rate > 12:
-                approval = True
-            else:
-                corrected_interest_rate = 16
-                reason = "Credit score low; interest rate adjusted to 16%."
-        elif 10 < credit_score <= 30:
-            if interest_rate > 16:
-                approval = True
-            else:
-                corrected_interest_rate = 20
-                reason = "Credit score very low; interest rate adjusted to 20%."
-        else:
-            approval = False
-            if not reason:
-                reason = "Credit score too low for approval."
+        results = []
+        for index, (data, errors) in enumerate(validated):
+            if errors:
+                results.append({'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': errors})
+                continue
 
-        # EMI calculation
-        try:
-            P = float(loan_amount)
-            r = float(corrected_interest_rate) / (12 * 100)
-            n = int(tenure)
+            profile = profiles.get(data['customer_id'])
+            if profile is None:
+                results.append({'index': index, 'status': status.HTTP_404_NOT_FOUND, 'error': 'Customer not found.'})
+                continue
 
-            emi = (P * r * math.pow(1 + r, n)) / (math.pow(1 + r, n) - 1) if r > 0 else P / n
-            emi = round(emi, 2)
-        except Exception as e:
-            return Response({'error': f"Error calculating EMI: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+            score = score_profile(profile, rules)
+            try:
+                result = evaluate_eligibility(
+                    profile, data['loan_amount'], data['interest_rate'], data['tenure'], rules, score=score
+                )
+            except (ValueError, OverflowError) as e:
+                results.append({
+                    'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'error': f"Error calculating EMI: {e}"
+                })
+                continue
+            record_decision(decision_record(
+                'check-eligibility-batch', profile, score, data['loan_amount'], data['interest_rate'], data['tenure'],
+                result,
+            ))
+            results.append({'index': index, 'status': status.HTTP_200_OK, **result})
 
-        if emi > 0.5 * customer.monthly_income:
-            return Response({
-                'approval': False,
-                'reason': "EMI exceeds 50% of income.",
-                'monthly_installment': emi
-            }, status=status.HTTP_200_OK)
+        return Response({'results': results}, status=status.HTTP_200_OK)
 
-        return Response({
-            'customer_id': customer_id,
-            'approval': approval,
-            'interest_rate': interest_rate,
-            'corrected_interest_rate': corrected_interest_rate,
-            'tenure': tenure,
-            'monthly_installment': emi,
-            'credit_score': credit_score,
-            'reason': reason,
-        }, status=status.HTTP_200_OK)
+
+class CreditProfileCacheStatsView(APIView):
+    def get(self, request):
+        return Response(cache_stats(), status=status.HTTP_200_OK)
 
 
 class CreateLoanView(APIView):
+    """
+    Books a loan. monthly_installment, end_date and emis_paid_on_time are
+    derived here from the amount, rate, tenure and start date (today unless
+    given); client-sent values for them are ignored.
+
+    The customer row is locked while its exposure is checked, so concurrent
+    requests cannot together exceed approved_limit. Requests sent with an
+    Idempotency-Key header are booked at most once; retries get the first
+    response back with an Idempotent-Replayed header.
+    """
+    throttle_scope = 'create-loan'
+
     def post(self, request):
-        required_fields = [
-            'customer_id', 'loan_amount', 'interest_rate', 'tenure',
-            'monthly_installment', 'emis_paid_on_time', 'start_date', 'end_date'
-        ]
+        required_fields = ['customer_id', 'loan_amount', 'interest_rate', 'tenure']
 
         missing_fields = [f for f in required_fields if f not in request.data]
         if missing_fields:
@@ -173,56 +225,386 @@ class CreateLoanView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            customer = Customer.objects.get(customer_id=request.data['customer_id'])
-        except Customer.DoesNotExist:
-            return Response({'error': 'Customer not found.'}, status=status.HTTP_404_NOT_FOUND)
+            loan_amount = Decimal(str(request.data['loan_amount'])).quantize(Decimal('0.01'))
+            interest_rate = float(request.data['interest_rate'])
+            tenure = int(request.data['tenure'])
+            start_date = request.data.get('start_date') or timezone.localdate()
+            if isinstance(start_date, str):
+                start_date = parse_date(start_date)
+                if start_date is None:
+                    raise ValueError("start_date must be YYYY-MM-DD.")
+            if not loan_amount.is_finite() or not math.isfinite(interest_rate):
+                raise ValueError("loan_amount and interest_rate must be finite numbers.")
+            if loan_amount <= 0 or interest_rate <= 0 or tenure <= 0:
+                return Response({
+                    "error": "Loan amount, interest rate, and tenure must all be greater than zero."
+                }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': f"Error creating loan: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def book():
+            return self.book(request.data['customer_id'], loan_amount, interest_rate, tenure, start_date)
+
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            status_code, body, _ = book()
+            return Response(body, status=status_code)
 
+        data = {field: request.data.get(field) for field in required_fields + ['start_date']}
+        status_code, body, replayed = run_idempotent('create-loan', key, data, book)
+        response = Response(body, status=status_code)
+        if replayed:
+            response['Idempotent-Replayed'] = 'true'
+        return response
+
+    def book(self, customer_id, loan_amount, interest_rate, tenure, start_date):
+        """Returns (status, JSON body, loan or None)."""
         try:
-            loan = Loan(
-                customer=customer,
-                loan_amount=request.data['loan_amount'],
-                interest_rate=request.data['interest_rate'],
-                tenure=request.data['tenure'],
-                monthly_installment=request.data['monthly_installment'],
-                emis_paid_on_time=request.data['emis_paid_on_time'],
-                start_date=request.data['start_date'],
-                end_date=request.data['end_date'],
-            )
-            loan.full_clean()  # model-level validations
-            loan.save()
-            return Response({'message': 'Loan created successfully.', 'loan_id': loan.loan_id}, status=status.HTTP_201_CREATED)
+            loan = book_loan(customer_id, loan_amount, interest_rate, tenure, start_date)
+        except Customer.DoesNotExist:
+            return status.HTTP_404_NOT_FOUND, {'error': 'Customer not found.'}, None
+        except ExposureLimitExceeded as e:
+            return status.HTTP_400_BAD_REQUEST, {'error': str(e)}, None
         except Exception as e:
-            return Response({'error': f"Error creating loan: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+            return status.HTTP_400_BAD_REQUEST, {'error': f"Error creating loan: {e}"}, None
+        return status.HTTP_201_CREATED, {
+            'message': 'Loan created successfully.',
+            'loan_id': loan.loan_id,
+            'monthly_installment': str(loan.monthly_installment),
+            'start_date': loan.start_date.isoformat(),
+            'end_date': loan.end_date.isoformat(),
+        }, loan
+
+
+class BulkCreateLoanView(APIView):
+    """
+    Books a list of loans in one transaction (see core.booking.book_loans)
+    and returns one result per item; rows that fail validation or the
+    exposure check are reported and do not stop the others.
+    """
+    max_batch_size = 10000
+    throttle_scope = 'create-loan-bulk'
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response({"error": "Request body must be a list of loans."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_batch_size:
+            return Response({
+                "error": f"At most {self.max_batch_size} loans are allowed per batch."
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        def book():
+            results = book_loans(items)
+            created = sum(1 for result in results if result['status'] == status.HTTP_201_CREATED)
+            return status.HTTP_200_OK, {'created': created, 'failed': len(results) - created, 'results': results}, None
 
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            status_code, body, _ = book()
+            return Response(body, status=status_code)
 
-class LoanDetailView(generics.RetrieveAPIView):
+        status_code, body, replayed = run_idempotent('create-loan-bulk', key, items, book)
+        response = Response(body, status=status_code)
+        if replayed:
+            response['Idempotent-Replayed'] = 'true'
+        return response
+
+
+class LoanDetailView(ReplicaReadMixin, generics.RetrieveAPIView):
     queryset = Loan.objects.all()
     serializer_class = LoanDetailSerializer
     lookup_field = 'loan_id'
     lookup_url_kwarg = 'loan_id'
 
     def get(self, request, *args, **kwargs):
+        # same output as LoanDetailSerializer, from one joined values() query
+        serializer = fast_serializer(self.serializer_class)
+        loan_id = kwargs[self.lookup_url_kwarg]
+        with timed():
+            rows = (
+                serializer.rows(self.get_queryset().filter(loan_id=loan_id))
+                or serializer.rows(ArchivedLoan.objects.filter(loan_id=loan_id))
+            )
+        if not rows:
+            raise Http404(f"No {Loan._meta.object_name} matches the given query.")
+        return Response(rows[0], status=status.HTTP_200_OK)
+
+
+class LoanScheduleView(ReplicaReadMixin, APIView):
+    """Month-by-month amortization schedule of a loan."""
+
+    def get(self, request, loan_id):
+        fields = ('loan_id', 'loan_amount', 'interest_rate', 'tenure', 'start_date')
+        loan = (
+            Loan.objects.filter(loan_id=loan_id).values(*fields).first()
+            or ArchivedLoan.objects.filter(loan_id=loan_id).values(*fields).first()
+        )
+        if loan is None:
+            return Response({'error': 'Loan not found.'}, status=status.HTTP_404_NOT_FOUND)
+
         try:
-            loan = self.get_object()
-            serializer = self.get_serializer(loan)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Loan.DoesNotExist:
-            return Response({"detail": "Loan not found."}, status=status.HTTP_404_NOT_FOUND)
+            with timed():
+                schedule = schedule_rows(loan['loan_amount'], loan['interest_rate'], loan['tenure'], loan['start_date'])
+        except (ValueError, OverflowError) as e:
+            return Response({'error': f"Error calculating schedule: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'loan_id': loan['loan_id'],
+            'loan_amount': loan['loan_amount'],
+            'interest_rate': loan['interest_rate'],
+            'tenure': loan['tenure'],
+            'monthly_installment': schedule[0]['payment'],
+            'start_date': loan['start_date'],
+            'end_date': end_date(loan['start_date'], loan['tenure']),
+            'total_interest': round(sum(row['interest'] for row in schedule), 2),
+            'schedule': schedule,
+        }, status=status.HTTP_200_OK)
 
 
-class CustomerLoansView(APIView):
+class CustomerLoansView(ReplicaReadMixin, APIView):
+    """
+    A customer's loans, ordered by loan_id.
+
+    Without query parameters, histories up to `small_history` loans are
+    returned as the plain list this endpoint always returned. Larger
+    histories, or any of ?cursor=, ?limit=, ?active=, ?fields=, get a keyset
+    page: {"results": [...], "next_cursor": <loan_id or null>}. ?stream=true
+    streams the whole (filtered) history as one JSON array instead.
+    """
+    small_history = 500
+    default_limit = 100
+    stream_chunk_size = 500
+
     def get(self, request, customer_id):
+        # a plain dict, so absent booleans stay absent instead of reading as False
+        query = CustomerLoansQuerySerializer(data=request.query_params.dict())
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+
+        if not Customer.objects.filter(customer_id=customer_id).exists():
+            return Response({'error': 'Customer not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        # live and archived loans, by loan_id
+        loans = customer_loans(customer_id, active=params.get('active'), after=params.get('cursor'))
+        fields = params.get('fields')
+        serializer = fast_serializer(LoanSerializer, tuple(fields) if fields else None)
+
+        if params.get('stream'):
+            return self.stream(loans, serializer)
+
+        if not params:
+            with timed():
+                first = serializer.rows(loans[:self.small_history + 1], key='loan_id')
+            if len(first) <= self.small_history:
+                return Response([data for _, data in first], status=status.HTTP_200_OK)
+            return self.page(first[:self.default_limit + 1], self.default_limit)
+
+        limit = params.get('limit', self.default_limit)
+        with timed():
+            rows = serializer.rows(loans[:limit + 1], key='loan_id')
+        return self.page(rows, limit)
+
+    def page(self, rows, limit):
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return Response({
+            'results': [data for _, data in rows],
+            'next_cursor': rows[-1][0] if has_more else None,
+        }, status=status.HTTP_200_OK)
+
+    def stream(self, loans, serializer):
+        encoder = JSONEncoder()
+
+        def chunks():
+            yield '['
+            first = True
+            for batch in chunked(serializer.iter_rows(loans, self.stream_chunk_size), self.stream_chunk_size):
+                body = encoder.encode(batch)[1:-1]
+                if body:
+                    yield body if first else ',' + body
+                    first = False
+            yield ']'
+
+        return StreamingHttpResponse(chunks(), content_type='application/json')
+
+
+class CustomerSearchView(ReplicaReadMixin, APIView):
+    """
+    Call center lookup: ?phone= (any format, matched normalized) and/or
+    ?name= (see core.search), paged by ?cursor= and ?limit= like customer-loans.
+    """
+    default_limit = 20
+
+    def get(self, request):
+        query = CustomerSearchQuerySerializer(data=request.query_params.dict())
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+
+        customers = search_customers(phone=params.get('phone'), name=params.get('name'))
+        if 'cursor' in params:
+            customers = customers.filter(customer_id__gt=params['cursor'])
+        limit = params.get('limit', self.default_limit)
+        with timed():
+            rows = fast_serializer(CustomerSearchResultSerializer).rows(customers[:limit + 1], key='customer_id')
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return Response({
+            'results': [data for _, data in rows],
+            'next_cursor': rows[-1][0] if has_more else None,
+        }, status=status.HTTP_200_OK)
+
+
+class DecisionAuditListView(ReplicaReadMixin, APIView):
+    """
+    Recorded eligibility decisions (core.audit), oldest first: ?customer_id=,
+    ?since= and ?until= (ISO datetimes, until exclusive), paged by ?cursor=
+    and ?limit=. Staff only. A decision shows up once its batch is written.
+    """
+    permission_classes = [IsAdminUser]
+    default_limit = 100
+
+    def get(self, request):
+        query = DecisionAuditQuerySerializer(data=request.query_params.dict())
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+
+        decisions = DecisionAudit.objects.order_by('created_at', 'id')
+        if 'customer_id' in params:
+            decisions = decisions.filter(customer_id=params['customer_id'])
+        if 'since' in params:
+            decisions = decisions.filter(created_at__gte=params['since'])
+        if 'until' in params:
+            decisions = decisions.filter(created_at__lt=params['until'])
+        if 'cursor' in params:
+            last = DecisionAudit.objects.filter(pk=params['cursor']).values_list('created_at', flat=True).first()
+            if last is None:
+                return Response({'error': 'Unknown cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+            # rows of one batch can share a timestamp, so page on (created_at, id)
+            decisions = decisions.filter(Q(created_at__gt=last) | Q(created_at=last, id__gt=params['cursor']))
+        limit = params.get('limit', self.default_limit)
+        with timed():
+            rows = fast_serializer(DecisionAuditSerializer).rows(decisions[:limit + 1], key='id')
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return Response({
+            'results': [data for _, data in rows],
+            'next_cursor': rows[-1][0] if has_more else None,
+        }, status=status.HTTP_200_OK)
+
+
+class PortfolioExportView(APIView):
+    """
+    Streams a whole table for analytics: export/customers.csv, export/loans.parquet, ...
+    Staff only; the response is written chunk by chunk (core.export).
+    """
+    permission_classes = [IsAdminUser]
+    formats = {
+        'csv': (csv_chunks, 'text/csv; charset=utf-8'),
+        'parquet': (parquet_chunks, 'application/vnd.apache.parquet'),
+    }
+
+    def get(self, request, dataset, file_format):
+        if dataset not in DATASETS or file_format not in self.formats:
+            return Response({'error': 'Unknown export.'}, status=status.HTTP_404_NOT_FOUND)
+        chunks, content_type = self.formats[file_format]
         try:
-            customer = Customer.objects.get(customer_id=customer_id)
-        except Customer.DoesNotExist:
+            body = chunks(dataset)
+        except ImportError:
+            return Response({
+                'error': 'Parquet export needs pyarrow installed.'
+            }, status=status.HTTP_501_NOT_IMPLEMENTED)
+        response = StreamingHttpResponse(body, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{file_format}"'
+        return response
+
+
+class IngestionJobCreateView(APIView):
+    parser_classes = [MultiPartParser, FormParser]
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = IngestionJobCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = serializer.save()
+        transaction.on_commit(lambda: start_ingestion_job.delay(job.pk))
+        return Response(IngestionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class IngestionJobStatusView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, job_id):
+        try:
+            job = IngestionJob.objects.get(pk=job_id)
+        except IngestionJob.DoesNotExist:
+            return Response({'error': 'Ingestion job not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(IngestionJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+class IngestionJobResumeView(APIView):
+    """
+    Re-queue a job's failed chunks. A running job is only resumed once one
+    of its chunks has been running for INGESTION_CHUNK_STALE_SECONDS (its
+    worker died); chunks still being loaded are left alone.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, job_id):
+        try:
+            job = IngestionJob.objects.get(pk=job_id)
+        except IngestionJob.DoesNotExist:
+            return Response({'error': 'Ingestion job not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        if job.status == IngestionJob.COMPLETED:
+            return Response({'error': 'Ingestion job already completed.'}, status=status.HTTP_409_CONFLICT)
+        if job.status == IngestionJob.RUNNING and not stale_chunks(job).exists():
+            return Response({'error': 'Ingestion job is still running.'}, status=status.HTTP_409_CONFLICT)
+        if not job.chunks.exists():
+            transaction.on_commit(lambda: start_ingestion_job.delay(job.pk))
+        else:
+            transaction.on_commit(lambda: resume_ingestion_job.delay(job.pk))
+        return Response(IngestionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class LoanApplicationCreateView(APIView):
+    def post(self, request):
+        input_serializer = LoanApplicationInputSerializer(data=request.data)
+        if not input_serializer.is_valid():
+            return Response(input_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = input_serializer.validated_data
+        if not Customer.objects.filter(customer_id=data['customer_id']).exists():
             return Response({'error': 'Customer not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        loans = Loan.objects.filter(customer=customer)
-        serializer = LoanSerializer(loans, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        application = LoanApplication.objects.create(**data)
+        transaction.on_commit(lambda: process_credit_application.delay(application.pk))
+        return Response({
+            'application_id': application.pk,
+            'status': application.status,
+            'status_url': reverse('loan-application-status', args=[application.pk], request=request),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class LoanApplicationStatusView(APIView):
+    def get(self, request, application_id):
+        try:
+            application = LoanApplication.objects.get(pk=application_id)
+        except LoanApplication.DoesNotExist:
+            return Response({'error': 'Loan application not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(application_payload(application), status=status.HTTP_200_OK)
+
+
+def metrics(request):
+    """Request and Celery task histograms in Prometheus text format."""
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 def trigger_task(request):
-    application_id = 123  # Example hardcoded ID
-    process_credit_application.delay(application_id)
+    test_task.delay()
     return HttpResponse("Task triggered! Check Celery worker logs.")
@@ -0,0 +1,108 @@
+"""
+Loan application webhooks.
+
+callback_url comes from the API client, and a Celery worker inside our
+network POSTs to it, so it must not become a way to reach internal services
+(SSRF). A URL is only called over http(s), on a host in
+WEBHOOK_ALLOWED_HOSTS when that is set, and when every address the host
+resolves to is public. The check runs when the application is submitted and
+again right before each delivery, since DNS can change in between, and the
+delivery connects to the addresses that check approved rather than resolving
+the host again, so a rebinding DNS server cannot swap in an internal one.
+TLS is still verified against the host name. Redirects are not followed.
+"""
+import http.client
+import ipaddress
+import json
+import socket
+import urllib.error
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.http.request import validate_host
+
+ALLOWED_SCHEMES = {'http': 80, 'https': 443}
+TIMEOUT_SECONDS = 10
+
+
+class UnsafeCallback(ValueError):
+    pass
+
+
+def _public(address):
+    address = ipaddress.ip_address(address.split('%')[0])
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return address.is_global
+
+
+def check_callback_url(url):
+    """
+    The addresses url's host resolves to, all public. Raises UnsafeCallback
+    unless url is a target we are willing to call; socket.gaierror (an
+    OSError) when its host does not resolve.
+    """
+    parts = urlsplit(url)
+    try:
+        port = parts.port or ALLOWED_SCHEMES.get(parts.scheme)
+    except ValueError:
+        raise UnsafeCallback('invalid port')
+    if parts.scheme not in ALLOWED_SCHEMES or not parts.hostname:
+        raise UnsafeCallback('only http and https URLs are called')
+    if settings.WEBHOOK_ALLOWED_HOSTS and not validate_host(parts.hostname, settings.WEBHOOK_ALLOWED_HOSTS):
+        raise UnsafeCallback(f'host {parts.hostname} is not in WEBHOOK_ALLOWED_HOSTS')
+    addresses = []
+    for *_, sockaddr in socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM):
+        if not _public(sockaddr[0]):
+            raise UnsafeCallback(f'host {parts.hostname} resolves to non-public address {sockaddr[0]}')
+        addresses.append(sockaddr[0])
+    return addresses
+
+
+class PinnedHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that dials `addresses` instead of looking self.host up again."""
+    addresses = ()
+
+    def connect(self):
+        error = OSError(f'no address to connect to for {self.host}')
+        for address in self.addresses:
+            try:
+                self.sock = socket.create_connection((address, self.port), self.timeout, self.source_address)
+                break
+            except OSError as e:
+                error = e
+        else:
+            raise error
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class PinnedHTTPSConnection(http.client.HTTPSConnection, PinnedHTTPConnection):
+    # HTTPSConnection.connect() opens the socket through PinnedHTTPConnection.connect(),
+    # then wraps it with the host name for SNI and certificate checks
+    pass
+
+
+def post_json(url, payload):
+    """
+    POST payload to url after check_callback_url(). Raises HTTPError for
+    any answer but 2xx (redirects included) and OSError when the connection
+    fails.
+    """
+    addresses = check_callback_url(url)
+    parts = urlsplit(url)
+    connection_class = PinnedHTTPSConnection if parts.scheme == 'https' else PinnedHTTPConnection
+    connection = connection_class(parts.hostname, parts.port, timeout=TIMEOUT_SECONDS)
+    connection.addresses = addresses
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    try:
+        connection.request(
+            'POST', path, body=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'}
+        )
+        response = connection.getresponse()
+        response.read()
+    finally:
+        connection.close()
+    if not 200 <= response.status < 300:
+        raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
@@ -13,6 +13,3 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Auto-discover tasks in installed apps
 app.autodiscover_tasks()
-
-# Broker URL (optional here if you set in settings.py, but okay to keep)
-app.conf.broker_url = 'redis://localhost:6379/0'
@@ -7,13 +7,31 @@ For more info:
 https://docs.djangoproject.com/en/5.1/topics/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-SECRET_KEY = 'django-insecure-6)%d7jk*eny*^xd41=ww(lg2tyl2*!czy64*pzwr2jn0rpbm)c'
-DEBUG = True
-ALLOWED_HOSTS = ["*"]
+
+def env_flag(name, default=False):
+    value = os.environ.get(name)
+    return default if value is None else value.lower() in ('1', 'true', 'yes')
+
+
+# DJANGO_ENV=production switches the defaults below to the production profile;
+# every setting can still be overridden on its own
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'development')
+PRODUCTION = DJANGO_ENV == 'production'
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    if PRODUCTION:
+        raise ImproperlyConfigured('DJANGO_SECRET_KEY must be set when DJANGO_ENV=production.')
+    SECRET_KEY = 'django-insecure-6)%d7jk*eny*^xd41=ww(lg2tyl2*!czy64*pzwr2jn0rpbm)c'
+DEBUG = env_flag('DJANGO_DEBUG', default=not PRODUCTION)
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', '*').split(',')
 
 
 INSTALLED_APPS = [
@@ -28,6 +46,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # removes itself unless INSTRUMENTATION_ENABLED is set
+    'core.instrumentation.InstrumentationMiddleware',
+    # removes itself unless a read replica is configured
+    'core.db_routers.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,14 +80,48 @@ TEMPLATES = [
 WSGI_APPLICATION = 'credit_approval_system.wsgi.application'
 
 
-import os
 import dj_database_url
+from celery.schedules import crontab
+
+# Connections: DB_CONN_MAX_AGE keeps one connection per worker thread open
+# between requests (health-checked before reuse). DB_POOL=true uses Django's
+# psycopg pool instead (PostgreSQL only; better for ASGI/threaded workers,
+# whose threads would each hold a persistent connection).
+DB_POOL = env_flag('DB_POOL')
 DATABASES = {
     'default': dj_database_url.config(
-        default=os.environ.get('DATABASE_URL')
+        default=os.environ.get('DATABASE_URL'),
+        conn_max_age=0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60 if PRODUCTION else 0)),
+        conn_health_checks=True,
     )
 }
 
+# Read replica: REPLICA_DATABASE_URL adds a `replica` alias. Views using
+# core.db_routers.ReplicaReadMixin read from it; writes, migrations and a
+# client's reads for REPLICA_PIN_SECONDS after a write stay on default.
+DATABASE_REPLICAS = []
+if os.environ.get('REPLICA_DATABASE_URL'):
+    DATABASES['replica'] = dj_database_url.parse(
+        os.environ['REPLICA_DATABASE_URL'],
+        conn_max_age=DATABASES['default']['CONN_MAX_AGE'],
+        conn_health_checks=True,
+    )
+    # tests read the replica alias from the test database
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['core.db_routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
+if DB_POOL:
+    for database in DATABASES.values():
+        if database.get('ENGINE') != 'django.db.backends.postgresql':
+            raise ImproperlyConfigured('DB_POOL needs PostgreSQL database URLs.')
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+
 
 # DATABASES = {
 #     'default': {
@@ -93,10 +149,104 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded ingestion files; shared with the Celery worker through the project volume
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Cache: Redis when configured (docker-compose), in-process otherwise (tests, local runs)
+if os.environ.get('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_CACHE_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a customer's credit profile stays cached; writes invalidate it earlier
+CREDIT_PROFILE_CACHE_TTL = int(os.environ.get('CREDIT_PROFILE_CACHE_TTL', 300))
+
+# How often each process checks whether another one activated a different
+# ScoringPolicy (core.policy); a switch takes effect everywhere within this
+SCORING_POLICY_CHECK_SECONDS = float(os.environ.get('SCORING_POLICY_CHECK_SECONDS', 1))
+
+# Eligibility decisions are buffered per process and written in batches (core.audit):
+# a batch goes out at this size or once its oldest record is this many seconds old
+DECISION_AUDIT_BATCH_SIZE = int(os.environ.get('DECISION_AUDIT_BATCH_SIZE', 500))
+DECISION_AUDIT_FLUSH_SECONDS = float(os.environ.get('DECISION_AUDIT_FLUSH_SECONDS', 5))
+# records kept while writes fail, before the oldest are dropped
+DECISION_AUDIT_MAX_BUFFERED = int(os.environ.get('DECISION_AUDIT_MAX_BUFFERED', 10000))
+
+# Hosts loan application webhooks may be sent to, in ALLOWED_HOSTS syntax
+# ('.partner.com' matches subdomains). Empty allows any host; either way
+# only public addresses are called (core.webhooks).
+WEBHOOK_ALLOWED_HOSTS = [host for host in os.environ.get('WEBHOOK_ALLOWED_HOSTS', '').split(',') if host]
+
+# How long POST /create-loan/ remembers an Idempotency-Key (expired by the nightly task)
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+# An ingestion chunk running this long is presumed lost with its worker, and
+# POST /ingestion/<id>/resume/ re-queues it
+INGESTION_CHUNK_STALE_SECONDS = int(os.environ.get('INGESTION_CHUNK_STALE_SECONDS', 1800))
+
+# Per-client token buckets per endpoint scope (core.throttling), kept in the
+# cache: (tokens per second, burst). THROTTLE_<SCOPE>=rate/burst overrides
+# one, e.g. THROTTLE_CHECK_ELIGIBILITY=50/100.
+def throttle_bucket(scope, rate, burst):
+    value = os.environ.get('THROTTLE_' + scope.upper().replace('-', '_'))
+    if value:
+        rate, burst = value.split('/')
+    return float(rate), int(burst)
+
+
+THROTTLE_ENABLED = env_flag('THROTTLE_ENABLED', True)
+THROTTLE_BUCKETS = {
+    scope: throttle_bucket(scope, rate, burst) for scope, rate, burst in [
+        ('check-eligibility', 20, 40),
+        ('check-eligibility-batch', 1, 5),
+        ('create-loan', 5, 20),
+        ('create-loan-bulk', 0.2, 5),
+    ]
+}
+# Eligibility computations in flight per worker process before new ones get 503.
+# gunicorn.conf.py sets it to GUNICORN_THREADS - 1 for gthread workers; the
+# default is for the async workers and runserver, which are not thread bound.
+ELIGIBILITY_MAX_IN_FLIGHT = int(os.environ.get('ELIGIBILITY_MAX_IN_FLIGHT', 32))
+ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', 1))
+
+REST_FRAMEWORK = {
+    # only throttles views with a throttle_scope
+    'DEFAULT_THROTTLE_CLASSES': ['core.throttling.TokenBucketThrottle'],
+}
+
+# Query count, DB/serializer/total time per view and Celery task: Server-Timing
+# headers and Prometheus histograms on /metrics/ (Celery workers: CELERY_METRICS_PORT)
+INSTRUMENTATION_ENABLED = env_flag('INSTRUMENTATION_ENABLED')
+# Celery pool process N serves its task metrics on CELERY_METRICS_PORT + N
+CELERY_METRICS_PORT = int(os.environ.get('CELERY_METRICS_PORT', 9808))
+
 # Celery Configuration
-CELERY_BROKER_URL = 'redis://localhost:6379/0'
-CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    # loan totals and credit scores depend on the date (active loans, current year)
+    'nightly-rebuild': {
+        'task': 'core.tasks.nightly_rebuild',
+        'schedule': crontab(hour=0, minute=15),
+    },
+    # closed loans move out of the live loan table (core.archive)
+    'archive-loans': {
+        'task': 'core.tasks.archive_loans',
+        'schedule': crontab(hour=1, minute=0),
+    },
+}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
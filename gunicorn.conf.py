@@ -0,0 +1,43 @@
+"""
+Production gunicorn settings: gunicorn -c gunicorn.conf.py
+
+GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker serves the ASGI app
+(for the async/ views); any other worker class serves WSGI.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+asgi = 'uvicorn' in worker_class
+wsgi_app = 'credit_approval_system.asgi:application' if asgi else 'credit_approval_system.wsgi:application'
+
+# The views are mostly waiting on the database: 2 x cores + 1 processes, and a
+# few threads each for gthread. Async workers multiplex on the event loop.
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1 if asgi else 4))
+
+# The eligibility limiter (core.throttling) counts per process, where a gthread
+# worker never has more than `threads` requests in flight: size it to leave
+# one thread for bookings and the other endpoints. Workers inherit the env.
+if not asgi:
+    os.environ.setdefault('ELIGIBILITY_MAX_IN_FLIGHT', str(max(threads - 1, 1)))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# recycle workers now and then so slow leaks cannot pile up
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+
+
+def worker_exit(server, worker):
+    # write out the buffered decision audit records (core.audit) before the worker goes
+    from core.audit import flush_on_shutdown
+
+    flush_on_shutdown()